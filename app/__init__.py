@@ -15,12 +15,36 @@ def create_app():
 
     app.config.from_object(Config)
 
+    # Encoder JSON (orjson si está disponible)
+    from app.json_provider import init_json
+    init_json(app)
+
     # Inicializar extensiones
     cors.init_app(app)
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
 
+    # Carriles de admisión (pos, read, report, pdf): límites de concurrencia y 503 con Retry-After
+    from app.services.admission import init_admission
+    init_admission(app)
+
+    # Presupuesto de consultas SQL por request (detecta N+1)
+    from app.services.query_budget import init_query_budget
+    init_query_budget(app)
+
+    # Tiempo de retención de conexiones del pool por endpoint
+    from app.services.pool_metrics import init_pool_metrics
+    init_pool_metrics(app)
+
+    # Compresión de respuestas JSON grandes (ETag/304 se declaran por vista)
+    from app.services.http_cache import init_http_cache
+    init_http_cache(app)
+
+    # Worker de trabajos PDF dentro del proceso (PDF_JOBS_WORKER=thread)
+    from app.services.pdf_job_service import init_pdf_jobs
+    init_pdf_jobs(app)
+
     # User loader para Flask-Login
     from app.models.user import User
     
@@ -28,6 +52,13 @@ def create_app():
     def load_user(user_id):
         return User.query.get(int(user_id))
 
+    # Filtro Jinja: timestamps almacenados (UTC) en hora de Argentina
+    from app.services.time_utils import to_ar
+
+    @app.template_filter("ar_datetime")
+    def ar_datetime(value, fmt="%d/%m/%Y %H:%M"):
+        return to_ar(value).strftime(fmt) if value else ""
+
     # Registrar Blueprints
     from app.routes.auth import auth_bp
     from app.routes.customers import customers_bp
@@ -45,6 +76,12 @@ def create_app():
     app.register_blueprint(reports_bp)  
     app.register_blueprint(changes_bp)  
 
+    # Comandos CLI (flask rollup rebuild)
+    from app.commands import rollup_cli, db_check_cli, pdf_jobs_cli
+    app.cli.add_command(rollup_cli)
+    app.cli.add_command(db_check_cli)
+    app.cli.add_command(pdf_jobs_cli)
+
     # Rutas protegidas
     @app.route("/")
     @login_required
@@ -54,12 +91,12 @@ def create_app():
     @app.route("/sales/explore")
     @login_required
     def explore_sales():
+        from sqlalchemy.orm import joinedload
         from app.models.sale import Sale
-        from app.models.customer import Customer
 
         sales = (
             Sale.query
-            .join(Customer)
+            .options(joinedload(Sale.customer))
             .order_by(Sale.created_at.desc())
             .limit(50)
             .all()
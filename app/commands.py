@@ -0,0 +1,95 @@
+# app/commands.py
+import click
+from flask.cli import AppGroup
+
+rollup_cli = AppGroup("rollup", help="Mantenimiento del rollup diario de ventas")
+
+
+@rollup_cli.command("rebuild")
+def rebuild_rollup_command():
+    """Reconstruye sales_daily_rollup desde cero a partir de sales"""
+    from app.services.rollup_service import rebuild_rollup
+
+    rows = rebuild_rollup()
+    click.echo(f"Rollup reconstruido: {rows} filas")
+
+
+db_check_cli = AppGroup("db-check", help="Chequeos de rendimiento de la base")
+
+
+@db_check_cli.command("explain")
+@click.option("--seed/--no-seed", default=True, help="Cargar datos sintéticos antes (se descartan)")
+@click.option("--customers", default=2000, show_default=True)
+@click.option("--sales", default=50000, show_default=True)
+@click.option("--only", multiple=True, help="Consultas a revisar (por nombre)")
+@click.option("-v", "--verbose", is_flag=True, help="Mostrar SQL y plan de todas las consultas")
+def explain_command(seed, customers, sales, only, verbose):
+    """
+    Revisa con EXPLAIN que las consultas calientes usen índices.
+    Sale con código 1 si alguna hace un scan completo de sales o customers.
+    """
+    from app.extensions import db
+    from app.services.explain_service import seed_sample_data, check_hot_queries
+
+    try:
+        if seed:
+            seed_sample_data(customers=customers, sales=sales)
+        results = check_hot_queries(only or None)
+    finally:
+        # Nada de esto se guarda
+        db.session.rollback()
+
+    failures = [r for r in results if r["scans"]]
+
+    for r in results:
+        status = "SCAN " + ", ".join(r["scans"]) if r["scans"] else "ok"
+        click.echo(f"{r['name']:<20} {status}")
+        if verbose or r["scans"]:
+            click.echo("    " + " ".join(r["sql"].split()))
+            for line in r["plan"]:
+                click.echo("    | " + line)
+
+    if failures:
+        click.echo(f"{len(failures)} consulta(s) sin índice", err=True)
+        raise SystemExit(1)
+
+    click.echo(f"{len(results)} consultas revisadas, todas usan índices")
+
+
+pdf_jobs_cli = AppGroup("pdf-jobs", help="Trabajos de PDF en segundo plano")
+
+
+@pdf_jobs_cli.command("worker")
+@click.option("--once", is_flag=True, help="Procesar un trabajo (si hay) y salir")
+def pdf_jobs_worker_command(once):
+    """
+    Procesa los trabajos de /pdf/jobs. Se pueden correr varios a la vez
+    (cada trabajo lo toma un solo worker); con PDF_JOBS_WORKER=external es
+    el único que los procesa.
+    """
+    from flask import current_app
+    from app.services.pdf_job_service import work_once, run_worker
+
+    app = current_app._get_current_object()
+
+    if once:
+        worked = work_once(app)
+        click.echo("Trabajo procesado" if worked else "No hay trabajos pendientes")
+        return
+
+    click.echo("Worker de PDF iniciado (Ctrl+C para salir)")
+    try:
+        run_worker(app)
+    except KeyboardInterrupt:
+        pass
+
+
+@pdf_jobs_cli.command("purge")
+@click.option("--hours", type=int, default=None, help="Antigüedad mínima (default PDF_JOB_RETENTION_HOURS)")
+def pdf_jobs_purge_command(hours):
+    """Borra trabajos terminados y sus PDFs"""
+    from flask import current_app
+    from app.services.pdf_job_service import purge_jobs
+
+    hours = hours if hours is not None else current_app.config['PDF_JOB_RETENTION_HOURS']
+    click.echo(f"Trabajos borrados: {purge_jobs(hours)}")
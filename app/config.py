@@ -24,6 +24,38 @@ class Config:
 
 
     CORS_RESOURCES = {r"/*": {"origins": "*"}}
+
+    # Encoder de respuestas JSON: 'auto' (orjson si está instalado), 'orjson' o 'stdlib'
+    JSON_ENCODER = os.environ.get("JSON_ENCODER", "auto")
+
+    # Etiquetas PDF: máximo por lote generado dentro del request (los más
+    # grandes van por /pdf/jobs) y procesos para renderizar lotes grandes (0 = en el request)
+    LABEL_BATCH_MAX = int(os.environ.get("LABEL_BATCH_MAX", 100))
+    LABEL_RENDER_PROCESSES = int(os.environ.get("LABEL_RENDER_PROCESSES", 2))
+    # PDFs generados más grandes que esto se escriben a un archivo temporal
+    PDF_SPOOL_MAX_BYTES = int(os.environ.get("PDF_SPOOL_MAX_BYTES", 2 * 1024 * 1024))
+
+    # Control de admisión por carriles (ver services/admission.py)
+    ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") != "0"
+    # Hilos por worker (igual que --threads de gunicorn) y cuántos quedan
+    # sólo para las ventas del mostrador
+    ADMISSION_THREADS = int(os.environ.get("ADMISSION_THREADS", 4))
+    ADMISSION_POS_RESERVED = int(os.environ.get("ADMISSION_POS_RESERVED", 1))
+
+    # Trabajos PDF en segundo plano: 'thread' (hilo en cada proceso web) o
+    # 'external' (sólo `flask pdf-jobs worker`)
+    PDF_JOBS_WORKER = os.environ.get("PDF_JOBS_WORKER", "thread")
+    PDF_JOB_MAX_LABELS = int(os.environ.get("PDF_JOB_MAX_LABELS", 5000))
+    PDF_JOB_POLL_SECONDS = 2
+    PDF_JOB_STALE_SECONDS = 600      # running sin avance → se reintenta
+    PDF_JOB_RETENTION_HOURS = 24
+
+    # Cola de preparación: un pedido tomado sin terminar vuelve a la cola
+    # después de estos minutos; máximo de pedidos por toma
+    FULFILLMENT_CLAIM_TTL_MINUTES = int(os.environ.get("FULFILLMENT_CLAIM_TTL_MINUTES", 30))
+    FULFILLMENT_CLAIM_MAX = 50
+    # Máximo de ventas por transición en bloque (entregar, enviar, pagar...)
+    BULK_ACTION_MAX = 200
     
     # Configuración de sesión
     SESSION_COOKIE_SECURE = os.getenv("ENV") == "production"
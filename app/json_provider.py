@@ -0,0 +1,103 @@
+# app/json_provider.py
+from datetime import datetime, date
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from app.services.time_utils import iso_utc
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se usa json de la stdlib
+    orjson = None
+
+
+# Convenciones de salida (iguales para todos los encoders):
+# - datetime naive = UTC almacenado → ISO 8601 con 'Z', precisión de segundos
+#   (mismo formato que iso_utc)
+# - date → YYYY-MM-DD
+# - Decimal → número
+
+
+def _default(obj):
+    """Tipos que json de la stdlib no serializa por sí mismo"""
+    if isinstance(obj, datetime):
+        return iso_utc(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """json de la stdlib con las convenciones de la app (fallback)"""
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = False
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = (
+        orjson.OPT_NAIVE_UTC
+        | orjson.OPT_UTC_Z
+        | orjson.OPT_OMIT_MICROSECONDS
+        | orjson.OPT_NON_STR_KEYS
+    )
+
+
+def _orjson_default(obj):
+    """Lo que orjson no maneja nativamente (Decimal, Markup, etc.)"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """
+    Encoder orjson: datetime, date, dataclasses y UUID en C, Decimal vía
+    default. Si se piden opciones de json de la stdlib (indent, cls...)
+    se delega al fallback.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_orjson_default, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = ORJSON_OPTIONS
+
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+
+        body = orjson.dumps(obj, default=_orjson_default, option=option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+PROVIDERS = {
+    'stdlib': StdlibJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+
+def init_json(app):
+    """
+    Configura el encoder JSON de la app.
+    JSON_ENCODER: 'auto' (orjson si está instalado), 'orjson' o 'stdlib'.
+    """
+    name = app.config.setdefault('JSON_ENCODER', 'auto')
+
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_ENCODER=orjson pero orjson no está instalado")
+    if name not in PROVIDERS:
+        raise RuntimeError(f"JSON_ENCODER inválido: {name}")
+
+    app.json = PROVIDERS[name](app)
@@ -0,0 +1,17 @@
+# models/data_version.py
+from datetime import datetime
+from app.extensions import db
+
+
+class DataVersion(db.Model):
+    """
+    Contador de versión por conjunto de datos.
+
+    Cada escritura incrementa la versión en la misma transacción, así
+    todos los workers detectan que sus resultados cacheados quedaron viejos.
+    """
+    __tablename__ = "data_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
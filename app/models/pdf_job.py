@@ -0,0 +1,44 @@
+# models/pdf_job.py
+from datetime import datetime
+from sqlalchemy.orm import deferred
+from app.extensions import db
+
+
+class PdfJob(db.Model):
+    """
+    Trabajo de generación de PDF en segundo plano (lotes de etiquetas).
+
+    Lo toma un worker (hilo de la app o `flask pdf-jobs worker`) con un
+    UPDATE condicional sobre status, así dos workers nunca procesan el
+    mismo trabajo. El PDF terminado queda en result.
+    """
+    __tablename__ = "pdf_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default='labels')
+    # pending → running → done | failed
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    params = db.Column(db.JSON, nullable=False)
+
+    total = db.Column(db.Integer, nullable=False, default=0)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(100))
+
+    # El PDF no se carga al consultar el estado
+    result = deferred(db.Column(db.LargeBinary))
+    result_size = db.Column(db.Integer)
+    result_name = db.Column(db.String(100))
+
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    # Heartbeat: se actualiza con cada avance
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Cola: próximos pendientes / trabajos colgados
+        db.Index("ix_pdf_jobs_status_created_at", status, created_at),
+    )
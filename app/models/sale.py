@@ -1,6 +1,90 @@
 # models/sale.py
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_property, hybrid_method
+from sqlalchemy.sql.functions import FunctionElement
 from app.extensions import db
+from app.services.time_utils import business_date_for, request_now
+
+
+# Días sin retirar / despachar para considerar vencido un pedido
+OVERDUE_DAYS = {
+    'retiro': 15,
+    'correo': 10,
+}
+
+# Horas sin recepcionar para considerar vencido un cambio
+CHANGE_OVERDUE_HOURS = 48
+
+
+# Estado de preparación (cola de trabajo de cadetería, retiro y correo):
+#   awaiting_payment → ready → claimed → done
+# ready: pagado y sin entregar (en la cola de su delivery_type)
+# claimed: tomado por un operador (claimed_by) para prepararlo
+AWAITING_PAYMENT = 'awaiting_payment'
+READY = 'ready'
+CLAIMED = 'claimed'
+DONE = 'done'
+
+FULFILLMENT_QUEUES = ('cadeteria', 'retiro', 'correo')
+
+
+def fulfillment_status_for(paid, delivered_at):
+    """Estado que corresponde a una venta no tomada (ver claims en fulfillment_service)"""
+    if delivered_at is not None:
+        return DONE
+    return READY if paid else AWAITING_PAYMENT
+
+
+def default_fulfillment_status(context):
+    params = context.get_current_parameters()
+    return fulfillment_status_for(params.get("paid"), params.get("delivered_at"))
+
+
+def overdue_cutoff(delivery_type, now):
+    """
+    created_at límite para que un pedido esté vencido (más de N días
+    completos sin entregar): vencido si created_at <= cutoff.
+    None si el tipo de entrega no vence.
+    """
+    limit = OVERDUE_DAYS.get(delivery_type)
+    if limit is None:
+        return None
+    return now - timedelta(days=limit + 1)
+
+
+def change_overdue_cutoff(now):
+    """created_at límite para un cambio vencido (vencido si created_at < cutoff)"""
+    return now - timedelta(hours=CHANGE_OVERDUE_HOURS)
+
+
+class days_between(FunctionElement):
+    """Días completos entre dos timestamps, como timedelta.days (start <= end)"""
+    type = Integer()
+    name = 'days_between'
+    inherit_cache = True
+
+
+@compiles(days_between)
+def _days_between_postgresql(element, compiler, **kw):
+    start, end = element.clauses
+    return "CAST(EXTRACT(DAY FROM (%s - %s)) AS INTEGER)" % (
+        compiler.process(end, **kw), compiler.process(start, **kw)
+    )
+
+
+@compiles(days_between, 'sqlite')
+def _days_between_sqlite(element, compiler, **kw):
+    start, end = element.clauses
+    return "CAST(julianday(%s) - julianday(%s) AS INTEGER)" % (
+        compiler.process(end, **kw), compiler.process(start, **kw)
+    )
+
+
+def default_business_date(context):
+    """business_date por defecto: día de Argentina de created_at"""
+    return business_date_for(context.get_current_parameters().get("created_at"))
 
 class Sale(db.Model):
     __tablename__ = "sales"
@@ -13,6 +97,8 @@ class Sale(db.Model):
     notes = db.Column(db.Text)
     sale_date = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Día de negocio en Argentina (timestamps se guardan en UTC naive)
+    business_date = db.Column(db.Date, nullable=False, index=True, default=default_business_date)
     ##Update logistics
     has_shipping = db.Column(db.Boolean, default=False)
     shipping_date = db.Column(db.Date, nullable=True)
@@ -28,31 +114,152 @@ class Sale(db.Model):
     shipped_at = db.Column(db.DateTime, nullable=True)    # Para correo: cuando se despachó
     completed_at = db.Column(db.DateTime, nullable=True)  # Ya existía
     
+    # 🔹 Cola de preparación (ver fulfillment_status_for)
+    fulfillment_status = db.Column(
+        db.String(20), nullable=False,
+        default=default_fulfillment_status, server_default=AWAITING_PAYMENT
+    )
+    claimed_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
     customer = db.relationship("Customer", back_populates="sales")
+
+    # 🔹 Índices de los accesos más frecuentes (ver migración c7e2b9d4f1a6).
+    # Los parciales repiten la condición tal cual la escriben los servicios,
+    # así el planner puede usarlos.
+    __table_args__ = (
+        # Ventas de un cliente / última compra (búsqueda de clientes)
+        db.Index("ix_sales_customer_id_created_at", customer_id, created_at),
+        # Listados paginados por (created_at, id)
+        db.Index("ix_sales_created_at_id", created_at, id),
+        # Ventas por turno
+        db.Index("ix_sales_sale_date", sale_date),
+        # Pendientes de retiro / correo
+        db.Index(
+            "ix_sales_pending_delivery", delivery_type, created_at,
+            postgresql_where=db.and_(delivered_at.is_(None), paid.is_(True)),
+            sqlite_where=db.and_(delivered_at.is_(None), paid.is_(True))
+        ),
+        # Calendario de envíos
+        db.Index(
+            "ix_sales_shipping_date", shipping_date,
+            postgresql_where=has_shipping.is_(True),
+            sqlite_where=has_shipping.is_(True)
+        ),
+        # Estadísticas de cambios
+        db.Index(
+            "ix_sales_changes", business_date, delivered_at,
+            postgresql_where=has_change == True,
+            sqlite_where=has_change == True
+        ),
+        # Colas de preparación: próximos a tomar por tipo de entrega y
+        # pedidos tomados (por operador / vencidos) (ver migración b3d8f2a6c190)
+        db.Index(
+            "ix_sales_fulfillment_ready", delivery_type, created_at, id,
+            postgresql_where=fulfillment_status == READY,
+            sqlite_where=fulfillment_status == READY
+        ),
+        db.Index(
+            "ix_sales_fulfillment_claimed", claimed_by, claimed_at,
+            postgresql_where=fulfillment_status == CLAIMED,
+            sqlite_where=fulfillment_status == CLAIMED
+        ),
+    )
     
-    # 🔹 NUEVO: Propiedades calculadas
+    # 🔹 Propiedades calculadas: las reglas de vencido también existen como
+    # expresiones SQL (Sale.is_overdue_at(now) en un filter), así los
+    # conteos y listados de vencidos se resuelven en la base con índices.
+    # `now` es naive UTC, como created_at.
     @property
     def is_delivered(self):
         """Retorna True si ya fue entregado/enviado"""
         return self.delivered_at is not None
-    
-    @property
-    def days_since_creation(self):
-        """Días desde que se creó la venta"""
+
+    def refresh_fulfillment_status(self):
+        """
+        Recalcula fulfillment_status después de cambiar paid/delivered_at.
+        Un pedido tomado (claimed) que sigue pendiente conserva su claim.
+        """
+        status = fulfillment_status_for(self.paid, self.delivered_at)
+        if status == READY and self.fulfillment_status == CLAIMED:
+            return
+
+        self.fulfillment_status = status
+        self.claimed_by = None
+        self.claimed_at = None
+
+    @hybrid_method
+    def days_since_creation_at(self, now):
+        """Días completos desde que se creó la venta"""
         if not self.created_at:
             return 0
-        delta = datetime.utcnow() - self.created_at
-        return delta.days
-    
-    @property
+        return (now - self.created_at).days
+
+    @days_since_creation_at.expression
+    def days_since_creation_at(cls, now):
+        return db.func.coalesce(days_between(cls.created_at, now), 0)
+
+    @hybrid_property
+    def days_since_creation(self):
+        """Días desde que se creó la venta"""
+        return self.days_since_creation_at(request_now())
+
+    @days_since_creation.expression
+    def days_since_creation(cls):
+        return cls.days_since_creation_at(request_now())
+
+    @hybrid_method
+    def is_overdue_at(self, now, delivery_type=None):
+        """
+        True si está vencido según tipo de entrega (OVERDUE_DAYS).
+        delivery_type restringe a un tipo: en SQL queda un rango sobre
+        created_at que usa ix_sales_pending_delivery.
+        """
+        if self.delivered_at is not None or self.created_at is None:
+            return False
+        if delivery_type is not None and self.delivery_type != delivery_type:
+            return False
+
+        cutoff = overdue_cutoff(self.delivery_type, now)
+        return cutoff is not None and self.created_at <= cutoff
+
+    @is_overdue_at.expression
+    def is_overdue_at(cls, now, delivery_type=None):
+        types = [delivery_type] if delivery_type else list(OVERDUE_DAYS)
+        return db.and_(
+            cls.delivered_at.is_(None),
+            db.or_(*(
+                db.and_(
+                    cls.delivery_type == t,
+                    cls.created_at <= overdue_cutoff(t, now)
+                )
+                for t in types
+            ))
+        )
+
+    @hybrid_property
     def is_overdue(self):
         """Retorna True si está vencido según tipo de entrega"""
-        if self.is_delivered:
-            return False
-            
-        if self.delivery_type == 'retiro':
-            return self.days_since_creation > 15
-        elif self.delivery_type == 'correo':
-            return self.days_since_creation > 10
-        
-        return False
+        return self.is_overdue_at(request_now())
+
+    @is_overdue.expression
+    def is_overdue(cls):
+        return cls.is_overdue_at(request_now())
+
+    @hybrid_method
+    def is_change_overdue_at(self, now):
+        """Cambio sin recepcionar hace más de CHANGE_OVERDUE_HOURS"""
+        return (
+            bool(self.has_change)
+            and self.delivered_at is None
+            and self.created_at is not None
+            and self.created_at < change_overdue_cutoff(now)
+        )
+
+    @is_change_overdue_at.expression
+    def is_change_overdue_at(cls, now):
+        return db.and_(
+            cls.has_change == True,
+            cls.delivered_at.is_(None),
+            cls.created_at < change_overdue_cutoff(now)
+        )
@@ -0,0 +1,23 @@
+# models/sales_daily_rollup.py
+from app.extensions import db
+
+
+class SalesDailyRollup(db.Model):
+    """
+    Acumulado diario de ventas para reportes.
+
+    Una fila por día (Argentina) y combinación de canal, tipo de entrega,
+    medio de pago y estado de pago. Se mantiene en la misma transacción
+    que cada escritura de ventas (ver services/rollup_service.py).
+    """
+    __tablename__ = "sales_daily_rollup"
+
+    business_date = db.Column(db.Date, primary_key=True)
+    sales_channel = db.Column(db.String(20), primary_key=True)
+    delivery_type = db.Column(db.String(20), primary_key=True)
+    payment_method = db.Column(db.String(20), primary_key=True)
+    paid = db.Column(db.Boolean, primary_key=True)
+
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    change_count = db.Column(db.Integer, nullable=False, default=0)
@@ -1,8 +1,17 @@
 # app/routes/changes_routes.py
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, render_template, jsonify, request, current_app
 from flask_login import login_required
-from app.services.reports_service import get_changes_stats, mark_change_received
-from app.serializers.sales_serializer import sales_to_dict
+from app.services.query_budget import query_budget
+from app.services.http_cache import conditional, STATS_BUCKET_SECONDS
+from app.services.cache_service import SALES, CUSTOMERS
+from app.services.reports_service import (
+    get_changes_stats,
+    mark_change_received,
+    mark_many_changes_received
+)
+from app.services.transition_service import parse_sale_ids
+from app.services.sales_services import parse_backlog_page
+from app.serializers.sales_serializer import sale_records_to_list
 
 changes_bp = Blueprint("changes", __name__, url_prefix="/changes")
 
@@ -16,28 +25,60 @@ def changes_view():
 
 @changes_bp.get("/stats")
 @login_required
+@query_budget(5)
+@conditional(SALES, CUSTOMERS, bucket_seconds=STATS_BUCKET_SECONDS)
 def get_stats():
     """API: Estadísticas de cambios"""
-    stats = get_changes_stats()
-    
+    try:
+        stats = get_changes_stats(**parse_backlog_page(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     return jsonify({
         'total_pending': stats['pending_count'],
         'total_overdue': stats['overdue_count'],
-        'pending': [sales_to_dict(s) for s in stats['pending_sales']],
-        'overdue': [sales_to_dict(s) for s in stats['overdue_sales']]
+        'pending': sale_records_to_list(stats['pending_sales']),
+        'overdue': sale_records_to_list(stats['overdue_sales']),
+        'pending_next_cursor': stats['pending_next_cursor'],
+        'overdue_next_cursor': stats['overdue_next_cursor']
     })
 
 
 @changes_bp.post("/<int:sale_id>/mark-received")
 @login_required
+@query_budget(3)
 def mark_received(sale_id):
     """API: Marcar cambio como recepcionado"""
-    sale, message = mark_change_received(sale_id)
+    updated, message = mark_change_received(sale_id)
     
-    if not sale:
+    if not updated:
         return jsonify({'error': message}), 400
     
     return jsonify({
         'message': message,
-        'sale': sales_to_dict(sale)
-    })
\ No newline at end of file
+        'id': sale_id
+    })
+
+
+@changes_bp.post("/mark-received")
+@login_required
+@query_budget(4)
+def mark_received_bulk():
+    """API: Marca varios cambios como recepcionados. Body: {"ids": [...]}"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Datos inválidos'}), 400
+
+    try:
+        ids = parse_sale_ids(data.get('ids'), current_app.config['BULK_ACTION_MAX'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    results, updated = mark_many_changes_received(ids)
+
+    return jsonify({
+        'message': f"{updated} cambio(s) marcado(s) como recepcionado(s)",
+        'updated': updated,
+        'failed': len(results) - updated,
+        'results': results
+    })
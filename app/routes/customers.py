@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request, render_template
 from flask_login import login_required
+from app.services.query_budget import query_budget
 from app.serializers.customer_serializer import(
     customer_to_dict,
     customers_to_list
@@ -23,6 +24,7 @@ def manage_customers_view():
 
 @customers_bp.get("")
 @login_required
+@query_budget(2)
 def get_customers():
     customers = get_all_customers()
     return jsonify(customers_to_list(customers)), 200
@@ -73,8 +75,10 @@ def delete_existing_customer(id):
         return jsonify({"error": "No se puede eliminar cliente con ventas asociadas"}), 400
     return jsonify({"message": "Cliente eliminado"}), 200
 
+# +1: la primera búsqueda del proceso consulta si existe customers_fts
 @customers_bp.get("/search")
 @login_required
+@query_budget(3)
 def search():
     query = request.args.get("q", "").strip()
     if not query:
@@ -83,8 +87,10 @@ def search():
     result = [customer_to_dict(c) for c in customers]
     return jsonify(result), 200
 
+# +1 por customers_fts, igual que /search
 @customers_bp.get("/paginated")
 @login_required
+@query_budget(4)
 def get_customers_paginated():
     try:
         page = int(request.args.get("page", 1))
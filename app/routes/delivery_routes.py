@@ -1,16 +1,40 @@
-from flask import Blueprint, render_template, jsonify, request
-from flask_login import login_required
+from flask import Blueprint, render_template, jsonify, request, current_app
+from flask_login import login_required, current_user
+from app.services.query_budget import query_budget
+from app.services.http_cache import conditional, STATS_BUCKET_SECONDS
+from app.services.cache_service import SALES, CUSTOMERS
 from app.services.delivery_services import (
     get_retiro_stats,
     get_correo_stats,
     mark_as_delivered,
-    mark_as_shipped
+    mark_as_shipped,
+    mark_many_delivered,
+    mark_many_shipped
 )
-from app.serializers.sales_serializer import sales_to_dict
+from app.services.sales_services import parse_backlog_page
+from app.services.fulfillment_service import claim_next, release_claims, get_claims
+from app.services.transition_service import parse_sale_ids
+from app.serializers.sales_serializer import sale_records_to_list
 
 delivery_bp = Blueprint("delivery", __name__, url_prefix="/delivery")
 
 
+def _claim_ttl():
+    """Minutos tras los que una toma de pedidos se considera abandonada"""
+    return current_app.config['FULFILLMENT_CLAIM_TTL_MINUTES']
+
+
+def stats_response(stats):
+    return jsonify({
+        'total_pending': stats['total_pending'],
+        'total_overdue': stats['total_overdue'],
+        'pending': sale_records_to_list(stats['pending_sales']),
+        'overdue': sale_records_to_list(stats['overdue_sales']),
+        'pending_next_cursor': stats['pending_next_cursor'],
+        'overdue_next_cursor': stats['overdue_next_cursor']
+    })
+
+
 @delivery_bp.get("/retiro")
 @login_required
 def retiro_view():
@@ -27,57 +51,174 @@ def correo_view():
 
 @delivery_bp.get("/retiro/stats")
 @login_required
+@query_budget(4)
+@conditional(SALES, CUSTOMERS, bucket_seconds=STATS_BUCKET_SECONDS)
 def retiro_stats():
     """API: Estadísticas de retiros"""
-    stats = get_retiro_stats()
-    
-    return jsonify({
-        'total_pending': stats['total_pending'],
-        'total_overdue': stats['total_overdue'],
-        'pending': [sales_to_dict(s) for s in stats['pending_sales']],
-        'overdue': [sales_to_dict(s) for s in stats['overdue_sales']]
-    })
+    try:
+        stats = get_retiro_stats(**parse_backlog_page(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return stats_response(stats)
 
 
 @delivery_bp.get("/correo/stats")
 @login_required
+@query_budget(4)
+@conditional(SALES, CUSTOMERS, bucket_seconds=STATS_BUCKET_SECONDS)
 def correo_stats():
     """API: Estadísticas de correo"""
-    stats = get_correo_stats()
-    
-    return jsonify({
-        'total_pending': stats['total_pending'],
-        'total_overdue': stats['total_overdue'],
-        'pending': [sales_to_dict(s) for s in stats['pending_sales']],
-        'overdue': [sales_to_dict(s) for s in stats['overdue_sales']]
-    })
+    try:
+        stats = get_correo_stats(**parse_backlog_page(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return stats_response(stats)
 
 
 @delivery_bp.post("/retiro/<int:sale_id>/mark-delivered")
 @login_required
+@query_budget(3)
 def mark_retiro_delivered(sale_id):
     """API: Marcar retiro como entregado"""
-    sale, message = mark_as_delivered(sale_id)
+    updated, message = mark_as_delivered(sale_id, current_user.id, _claim_ttl())
     
-    if not sale:
+    if not updated:
         return jsonify({'error': message}), 400
     
     return jsonify({
         'message': message,
-        'sale': sales_to_dict(sale)
+        'id': sale_id
     })
 
 
 @delivery_bp.post("/correo/<int:sale_id>/mark-shipped")
 @login_required
+@query_budget(3)
 def mark_correo_shipped(sale_id):
     """API: Marcar correo como enviado"""
-    sale, message = mark_as_shipped(sale_id)
+    updated, message = mark_as_shipped(sale_id, current_user.id, _claim_ttl())
     
-    if not sale:
+    if not updated:
         return jsonify({'error': message}), 400
     
     return jsonify({
         'message': message,
-        'sale': sales_to_dict(sale)
-    })
\ No newline at end of file
+        'id': sale_id
+    })
+
+
+@delivery_bp.post("/retiro/mark-delivered")
+@login_required
+@query_budget(4)
+def mark_retiro_delivered_bulk():
+    """
+    API: Marca varios retiros como entregados. Body: {"ids": [...]}
+    Responde el resultado de cada id (ok o error).
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Datos inválidos'}), 400
+
+    try:
+        ids = parse_sale_ids(data.get('ids'), current_app.config['BULK_ACTION_MAX'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    results, updated = mark_many_delivered(ids, current_user.id, _claim_ttl())
+
+    return jsonify({
+        'message': f"{updated} pedido(s) marcado(s) como entregado(s)",
+        'updated': updated,
+        'failed': len(results) - updated,
+        'results': results
+    })
+
+
+@delivery_bp.post("/correo/mark-shipped")
+@login_required
+@query_budget(4)
+def mark_correo_shipped_bulk():
+    """API: Marca varios pedidos de correo como enviados. Body: {"ids": [...]}"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Datos inválidos'}), 400
+
+    try:
+        ids = parse_sale_ids(data.get('ids'), current_app.config['BULK_ACTION_MAX'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    results, updated = mark_many_shipped(ids, current_user.id, _claim_ttl())
+
+    return jsonify({
+        'message': f"{updated} pedido(s) marcado(s) como enviado(s)",
+        'updated': updated,
+        'failed': len(results) - updated,
+        'results': results
+    })
+
+
+# =========================
+#   COLA DE PREPARACIÓN
+# =========================
+
+@delivery_bp.post("/<queue>/claim")
+@login_required
+@query_budget(6)
+def claim_orders(queue):
+    """
+    API: Toma los próximos pedidos listos de la cola (cadeteria, retiro,
+    correo) para el operador actual. Body opcional: {"count": N}
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Datos inválidos'}), 400
+    max_count = current_app.config['FULFILLMENT_CLAIM_MAX']
+
+    try:
+        count = min(max(int(data.get('count', 10)), 1), max_count)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Cantidad inválida'}), 400
+
+    try:
+        claimed = claim_next(queue, count, current_user.id, _claim_ttl())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'claimed': sale_records_to_list(claimed),
+        'total_claimed': len(claimed)
+    })
+
+
+@delivery_bp.post("/<queue>/release")
+@login_required
+@query_budget(3)
+def release_orders(queue):
+    """API: Devuelve a la cola pedidos tomados. Body: {"ids": [...]}"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Datos inválidos'}), 400
+
+    try:
+        ids = parse_sale_ids(data.get('ids'), current_app.config['FULFILLMENT_CLAIM_MAX'])
+        released = release_claims(queue, ids, current_user.id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'released': released})
+
+
+@delivery_bp.get("/<queue>/claims")
+@login_required
+@query_budget(2)
+def my_claims(queue):
+    """API: Pedidos de la cola que tiene tomados el operador actual"""
+    try:
+        claims = get_claims(current_user.id, queue)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'claims': sale_records_to_list(claims)})
@@ -1,396 +1,101 @@
 import os
-from datetime import datetime, date
-from io import BytesIO
+import tempfile
+from datetime import date
+from io import BytesIO, UnsupportedOperation
 from flask import Blueprint, send_file, current_app, jsonify, request
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
-from reportlab.lib.utils import ImageReader
-from reportlab.lib.colors import HexColor
+from flask_login import login_required, current_user
 from app.models.sale import Sale
-from app.models.customer import Customer
+from app.serializers.pdf_job_serializer import pdf_job_to_dict
+from app.services.pdf_job_service import (
+    parse_label_job_params, create_label_job, get_job, notify_worker, label_sales_query,
+    copy_job_result
+)
+from app.services.label_service import get_label_pdf, write_labels_pdf
+from app.services.read_models import label_records, release_connection
+from app.services.query_budget import query_budget
+from app.services.admission import admission_lane
 
 pdf_bp = Blueprint("pdf", __name__, url_prefix="/pdf")
 
 
-def get_image_paths():
-    """Retorna paths de las imágenes"""
-    static_path = os.path.abspath(
-        os.path.join(current_app.root_path, '..', 'static', 'images')
-    )
-    return {
-        'logo': os.path.join(static_path, 'logo.png'),
-        'phone': os.path.join(static_path, 'phone.png'),
-        'email': os.path.join(static_path, 'mail.png')
-    }
-
-
-def draw_header(c, width, height, sale_id, images):
-    """Dibuja el header común (logo, contacto, número)"""
-    # Número de venta
-    c.setFont("Helvetica-Bold", 12)
-    c.drawCentredString(width / 2, height - 6*mm, f"VENTA Nº{sale_id}000")
-    
-    # Logo
-    try:
-        if os.path.exists(images['logo']):
-            logo = ImageReader(images['logo'])
-            c.drawImage(
-                logo, 
-                (width - 50*mm)/2, 
-                height - 50*mm,
-                width=50*mm, 
-                height=50*mm,
-                preserveAspectRatio=True, 
-                mask='auto'
-            )
-    except Exception as e:
-        print(f"Error cargando logo: {e}")
-    
-    # Contacto
-    icon_size = 4 * mm
-    line_y = height - 55*mm
-    
-    c.setFont("Helvetica", 8)
-    
-    if os.path.exists(images['phone']):
-        c.drawImage(
-            ImageReader(images['phone']),
-            width/2 - 45*mm,
-            line_y,
-            width=icon_size,
-            height=icon_size,
-            mask='auto'
-        )
-    c.drawString(width/2 - 40*mm, line_y, "011-32651073")
-    
-    if os.path.exists(images['email']):
-        c.drawImage(
-            ImageReader(images['email']),
-            width/2 - 5*mm,
-            line_y,
-            width=icon_size,
-            height=icon_size,
-            mask='auto'
-        )
-    c.drawString(width/2 + 0*mm, line_y, "lunitavalropa@gmail.com")
-    
-    # Línea divisoria
-    c.line(5*mm, height - 60*mm, width - 5*mm, height - 60*mm)
+class SpoolFile:
+    """
+    Vista de sólo lectura de un SpooledTemporaryFile para send_file. Lee
+    sin volcar a disco (fileno() del spool lo haría aunque el PDF sea
+    chico) y sólo expone fileno() si ya está en disco, para el sendfile
+    de gunicorn. close() cierra (y borra) el spool: lo llama el file
+    wrapper del servidor al terminar la respuesta.
+    """
 
+    def __init__(self, spool, on_disk):
+        self.spool = spool
+        self.on_disk = on_disk
 
-def draw_change_badge(c, width, y):
-    """🔹 Dibuja badge de CAMBIO si corresponde"""
-    c.setFillColor(HexColor('#F59E0B'))
-    c.rect(5*mm, y - 10*mm, width - 10*mm, 10*mm, fill=1, stroke=0)
-    
-    c.setFillColor(HexColor('#000000'))
-    c.setFont("Helvetica-Bold", 14)
-    c.drawCentredString(width/2, y - 7*mm, "🔄 ES UN CAMBIO")
-    
-    c.setFillColor(HexColor('#000000'))
-    return y - 15*mm
+    def read(self, size=-1):
+        return self.spool.read(size)
 
+    def fileno(self):
+        if not self.on_disk:
+            raise UnsupportedOperation("fileno")
+        return self.spool.fileno()
+
+    def close(self):
+        self.spool.close()
+
+
+def send_spooled_pdf(write, download_name):
+    """
+    Escribe el PDF con write(archivo) en un SpooledTemporaryFile (en
+    memoria hasta PDF_SPOOL_MAX_BYTES, después en disco) y lo sirve como
+    archivo: con gunicorn un PDF en disco sale por sendfile sin pasar por
+    Python.
+    """
+    max_size = current_app.config['PDF_SPOOL_MAX_BYTES']
+    spool = tempfile.SpooledTemporaryFile(max_size=max_size)
 
-def draw_customer_info(c, customer, y_start):
-    """Dibuja información del cliente"""
-    y = y_start
-    
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(5*mm, y, "Cliente:")
-    c.setFont("Helvetica", 9)
-    c.drawString(5*mm + 25*mm, y, f"{customer.first_name} {customer.last_name}")
-    y -= 6*mm
-
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(5*mm, y, "Localidad:")
-    c.setFont("Helvetica", 9)
-    c.drawString(5*mm + 25*mm, y, f"{customer.city}")
-    y -= 6*mm
-
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(5*mm, y, "Dirección:")
-    c.setFont("Helvetica", 9)
-    c.drawString(5*mm + 25*mm, y, f"{customer.address}")
-    y -= 6*mm
-
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(5*mm, y, "Teléfono:")
-    c.setFont("Helvetica", 9)
-    c.drawString(5*mm + 25*mm, y, f"{customer.phone}")
-    y -= 6*mm
-
-    if getattr(customer, 'description', None):
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(5*mm, y, "Descripción:")
-        c.setFont("Helvetica", 9)
-        c.drawString(5*mm + 25*mm, y, f"{customer.description}")
-        y -= 6*mm
-
-    return y
-
-
-def draw_cadeteria_label(c, sale, customer, width, height, images):
-    """Etiqueta para CADETERÍA"""
-    draw_header(c, width, height, sale.id, images)
-    
-    y = height - 65*mm
-    
-    # 🔹 Badge de CAMBIO si corresponde
-    if sale.has_change:
-        y = draw_change_badge(c, width, y)
-    
-    # Info del cliente
-    y = draw_customer_info(c, customer, y)
-    
-    # Fecha
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(5*mm, y, "Fecha:")
-    c.setFont("Helvetica", 9)
-    c.drawString(5*mm + 25*mm, y, sale.created_at.strftime("%d/%m/%Y"))
-    y -= 8*mm
-
-    # Línea divisoria
-    c.line(5*mm, y, width - 5*mm, y)
-    y -= 5*mm
-
-    # Total
-    c.setFont("Helvetica-Bold", 14)
-    total_formatted = f"{sale.amount:,.0f}".replace(",", ".")
-    c.drawCentredString(width/2, y, f"Total: ${total_formatted}")
-    y -= 10*mm
-    
-    # Indicador de pago
-    if not sale.paid:
-        c.setFillColor(HexColor('#B91C1C'))
-        c.setFont("Helvetica-Bold", 12)
-        c.drawCentredString(width/2, y, "⚠️ PENDIENTE DE PAGO")
-        c.setFillColor(HexColor('#000000'))
-        y -= 8*mm
-    else:
-        y -= 5*mm
-    
-    # Recuadro de notas
-    notes_height = 25*mm
-    c.setStrokeColorRGB(0, 0, 0)
-    c.setLineWidth(1)
-    c.rect(5*mm, y - notes_height, width - 10*mm, notes_height, stroke=1, fill=0)
-
-    c.setFont("Helvetica", 9)
-    text_y = y - 4*mm
-    if sale.notes:
-        lines = sale.notes.split('\n')
-        for line in lines:
-            if text_y > (y - notes_height + 2*mm):
-                c.drawString(7*mm, text_y, line[:60])
-                text_y -= 4*mm
-
-
-def draw_retiro_label(c, sale, customer, width, height, images):
-    """Etiqueta para RETIRO"""
-    # Banner RETIRO
-    c.setFillColor(HexColor('#4A90E2'))
-    c.rect(0, height - 35*mm, width, 25*mm, fill=1, stroke=0)
-    
-    c.setFillColor(HexColor('#FFFFFF'))
-    c.setFont("Helvetica-Bold", 32)
-    c.drawCentredString(width/2, height - 25*mm, "RETIRO")
-    
-    c.setFont("Helvetica-Bold", 14)
-    c.drawCentredString(width/2, height - 32*mm, f"Venta #{sale.id}000")
-    
-    c.setFillColor(HexColor('#000000'))
-    
-    # Logo
-    try:
-        if os.path.exists(images['logo']):
-            logo = ImageReader(images['logo'])
-            c.drawImage(
-                logo,
-                (width - 35*mm)/2,
-                height - 68*mm,
-                width=35*mm,
-                height=35*mm,
-                preserveAspectRatio=True,
-                mask='auto'
-            )
-    except:
-        pass
-    
-    y = height - 75*mm
-    
-    # 🔹 Badge de CAMBIO
-    if sale.has_change:
-        y = draw_change_badge(c, width, y)
-    
-    # Info cliente
-    c.setFont("Helvetica-Bold", 16)
-    c.drawCentredString(width/2, y, f"{customer.first_name} {customer.last_name}")
-    y -= 10*mm
-    
-    c.setFont("Helvetica", 12)
-    c.drawCentredString(width/2, y, f"Tel: {customer.phone}")
-    y -= 15*mm
-    
-    # Total
-    c.setFont("Helvetica-Bold", 24)
-    total_formatted = f"{sale.amount:,.0f}".replace(",", ".")
-    c.drawCentredString(width/2, y, f"$ {total_formatted}")
-    y -= 10*mm
-    
-    # Fecha
-    c.setFont("Helvetica", 10)
-    c.drawCentredString(width/2, y, f"Fecha: {sale.created_at.strftime('%d/%m/%Y')}")
-    y -= 10*mm
-    
-    # Advertencia
-    c.setFont("Helvetica-Bold", 12)
-    c.setFillColor(HexColor('#B91C1C'))
-    c.drawCentredString(width/2, y, "⚠️ Válido 15 días desde la fecha de venta")
-    c.setFillColor(HexColor('#000000'))
-    y -= 15*mm
-
-    if not sale.paid:
-        c.setFillColor(HexColor('#B91C1C'))
-        c.setFont("Helvetica-Bold", 12)
-        c.drawCentredString(width/2, y, "⚠️ PENDIENTE DE PAGO")
-        c.setFillColor(HexColor('#000000'))
-    
-    # Notas
-    if sale.notes:
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(5*mm, y, "Notas:")
-        y -= 5*mm
-        
-        c.setFont("Helvetica", 9)
-        lines = sale.notes.split('\n')
-        for line in lines[:3]:
-            c.drawString(5*mm, y, line[:80])
-            y -= 4*mm
-
-
-def draw_correo_label(c, sale, customer, width, height, images):
-    """Etiqueta para CORREO"""
-    # Banner CORREO
-    c.setFillColor(HexColor('#F59E0B'))
-    c.rect(0, height - 35*mm, width, 25*mm, fill=1, stroke=0)
-    
-    c.setFillColor(HexColor('#000000'))
-    c.setFont("Helvetica-Bold", 32)
-    c.drawCentredString(width/2, height - 25*mm, "CORREO")
-    
-    c.setFont("Helvetica-Bold", 14)
-    c.drawCentredString(width/2, height - 32*mm, f"Venta #{sale.id}000")
-    
-    c.setFillColor(HexColor('#000000'))
-    
-    # Logo
     try:
-        if os.path.exists(images['logo']):
-            logo = ImageReader(images['logo'])
-            c.drawImage(
-                logo,
-                5*mm,
-                height - 60*mm,
-                width=25*mm,
-                height=25*mm,
-                preserveAspectRatio=True,
-                mask='auto'
-            )
-    except:
-        pass
-    
-    y = height - 70*mm
-    
-    # 🔹 Badge de CAMBIO
-    if sale.has_change:
-        y = draw_change_badge(c, width, y)
-    
-    # Dirección de envío
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(5*mm, y, "ENVIAR A:")
-    y -= 8*mm
-    
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(5*mm, y, f"{customer.first_name} {customer.last_name}")
-    y -= 8*mm
-    
-    c.setFont("Helvetica", 12)
-    c.drawString(5*mm, y, f"{customer.address}")
-    y -= 6*mm
-    
-    c.drawString(5*mm, y, f"{customer.city}")
-    y -= 6*mm
-    
-    c.drawString(5*mm, y, f"Tel: {customer.phone}")
-    y -= 12*mm
-    
-    # Total
-    c.setFont("Helvetica-Bold", 18)
-    total_formatted = f"{sale.amount:,.0f}".replace(",", ".")
-    c.drawString(5*mm, y, f"Total: $ {total_formatted}")
-    y -= 8*mm
-    
-    # Indicador de pago
-    if not sale.paid:
-        c.setFillColor(HexColor('#B91C1C'))
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(5*mm, y, "⚠️ PENDIENTE DE PAGO")
-        c.setFillColor(HexColor('#000000'))
-        y -= 8*mm
-    
-    # Fecha
-    c.setFont("Helvetica", 10)
-    c.drawString(5*mm, y, f"Fecha: {sale.created_at.strftime('%d/%m/%Y')}")
-    y -= 12*mm
-    
-    # Recuadro de descripción
-    c.setStrokeColorRGB(0, 0, 0)
-    c.setLineWidth(1)
-    c.rect(5*mm, y - 20*mm, width - 10*mm, 20*mm, stroke=1, fill=0)
-    
-    c.setFont("Helvetica-Bold", 9)
-    c.drawString(7*mm, y - 4*mm, "Descripción / Notas:")
-    
-    if sale.notes:
-        c.setFont("Helvetica", 8)
-        text_y = y - 8*mm
-        lines = sale.notes.split('\n')
-        for line in lines[:2]:
-            c.drawString(7*mm, text_y, line[:70])
-            text_y -= 4*mm
+        write(spool)
+        size = spool.seek(0, os.SEEK_END)
+        spool.seek(0)
+
+        # El spool pasa a disco apenas lo escrito supera max_size
+        response = send_file(
+            SpoolFile(spool, on_disk=size > max_size),
+            as_attachment=True,
+            download_name=download_name,
+            mimetype="application/pdf"
+        )
+    except Exception:
+        spool.close()
+        raise
+
+    response.content_length = size
+    return response
+
+
+def send_labels_pdf(labels, download_name):
+    """PDF de las etiquetas, generado directo en el spool"""
+    processes = current_app.config['LABEL_RENDER_PROCESSES']
+    return send_spooled_pdf(lambda spool: write_labels_pdf(labels, spool, processes), download_name)
 
 
 @pdf_bp.get("/sale/<int:sale_id>/label")
+@query_budget(2)
 def download_sale_label(sale_id):
     """Genera etiqueta según tipo de entrega"""
-    sale = Sale.query.get(sale_id)
-    if not sale:
+    records = label_records(Sale.query.filter(Sale.id == sale_id))
+    # El render no usa la base: la conexión vuelve al pool antes
+    release_connection()
+
+    if not records:
         return jsonify({"error": "Venta no encontrada"}), 404
 
-    customer = Customer.query.get(sale.customer_id)
+    sale, customer = records[0]
     if not customer:
         return jsonify({"error": "Cliente no encontrado"}), 404
 
-    # Crear PDF
-    buffer = BytesIO()
-    width, height = 100 * mm, 150 * mm
-    c = canvas.Canvas(buffer, pagesize=(width, height))
-
-    images = get_image_paths()
-
-    # Seleccionar diseño según tipo de entrega
-    if sale.delivery_type == 'cadeteria':
-        draw_cadeteria_label(c, sale, customer, width, height, images)
-    elif sale.delivery_type == 'retiro':
-        draw_retiro_label(c, sale, customer, width, height, images)
-    elif sale.delivery_type == 'correo':
-        draw_correo_label(c, sale, customer, width, height, images)
-    else:
-        draw_cadeteria_label(c, sale, customer, width, height, images)
-
-    c.showPage()
-    c.save()
-    buffer.seek(0)
+    # Etiqueta cacheada por versión de la venta
+    buffer = BytesIO(get_label_pdf(sale, customer))
 
     return send_file(
         buffer,
@@ -401,6 +106,8 @@ def download_sale_label(sale_id):
 
 
 @pdf_bp.get("/shipments/day/<shipping_date>/labels")
+@query_budget(2)
+@admission_lane('pdf')
 def download_labels_by_day(shipping_date):
     """Genera todas las etiquetas del día (solo cadetería)"""
     try:
@@ -408,46 +115,19 @@ def download_labels_by_day(shipping_date):
     except ValueError:
         return jsonify({"error": "Fecha inválida"}), 400
 
-    sales = (
-        Sale.query
-        .filter(
-            Sale.delivery_type == 'cadeteria',
-            Sale.has_shipping.is_(True),
-            Sale.shipping_date == ship_date
-        )
-        .order_by(Sale.id.asc())
-        .all()
-    )
+    records = label_records(label_sales_query({'shipping_date': ship_date.isoformat()}))
+    release_connection()
 
-    if not sales:
+    if not records:
         return jsonify({"error": "No hay envíos ese día"}), 404
 
-    buffer = BytesIO()
-    width, height = 100 * mm, 150 * mm
-    c = canvas.Canvas(buffer, pagesize=(width, height))
-
-    images = get_image_paths()
-
-    for sale in sales:
-        customer = Customer.query.get(sale.customer_id)
-        if not customer:
-            continue
-
-        draw_cadeteria_label(c, sale, customer, width, height, images)
-        c.showPage()
-
-    c.save()
-    buffer.seek(0)
-
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"etiquetas_{shipping_date}.pdf",
-        mimetype="application/pdf"
-    )
+    labels = [(sale, customer) for sale, customer in records if customer]
+    return send_labels_pdf(labels, f"etiquetas_{shipping_date}.pdf")
 
 
 @pdf_bp.get("/batch-labels")
+@query_budget(2)
+@admission_lane('pdf')
 def download_batch_labels():
     """Genera PDF con múltiples etiquetas seleccionadas"""
     ids_param = request.args.get('ids', '')
@@ -460,42 +140,73 @@ def download_batch_labels():
     except ValueError:
         return jsonify({"error": "IDs inválidos"}), 400
     
-    if len(sale_ids) > 100:
-        return jsonify({"error": "Máximo 100 etiquetas por lote"}), 400
+    batch_max = current_app.config['LABEL_BATCH_MAX']
+    if len(sale_ids) > batch_max:
+        return jsonify({"error": f"Máximo {batch_max} etiquetas por lote (para más usar /pdf/jobs)"}), 400
     
-    sales = Sale.query.filter(Sale.id.in_(sale_ids)).order_by(Sale.id.asc()).all()
+    records = label_records(label_sales_query({'ids': sale_ids}))
+    release_connection()
     
-    if not sales:
+    if not records:
         return jsonify({"error": "No se encontraron ventas"}), 404
     
-    buffer = BytesIO()
-    width, height = 100 * mm, 150 * mm
-    c = canvas.Canvas(buffer, pagesize=(width, height))
-    
-    images = get_image_paths()
-    
-    for sale in sales:
-        customer = Customer.query.get(sale.customer_id)
-        if not customer:
-            continue
-        
-        if sale.delivery_type == 'cadeteria':
-            draw_cadeteria_label(c, sale, customer, width, height, images)
-        elif sale.delivery_type == 'retiro':
-            draw_retiro_label(c, sale, customer, width, height, images)
-        elif sale.delivery_type == 'correo':
-            draw_correo_label(c, sale, customer, width, height, images)
-        else:
-            draw_cadeteria_label(c, sale, customer, width, height, images)
-        
-        c.showPage()
-    
-    c.save()
-    buffer.seek(0)
-    
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"etiquetas_lote_{len(sales)}.pdf",
-        mimetype="application/pdf"
-    )
\ No newline at end of file
+    labels = [(sale, customer) for sale, customer in records if customer]
+    return send_labels_pdf(labels, f"etiquetas_lote_{len(records)}.pdf")
+
+
+# =========================
+#   TRABAJOS EN SEGUNDO PLANO
+# =========================
+
+@pdf_bp.post("/jobs")
+@login_required
+@query_budget(4)
+def create_pdf_job():
+    """
+    Encola un lote de etiquetas (ids, shipping_date o date_from/date_to).
+    Responde enseguida; el progreso se consulta en /pdf/jobs/<id>.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No se recibió data"}), 400
+
+    try:
+        params = parse_label_job_params(data, current_app.config['PDF_JOB_MAX_LABELS'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job = create_label_job(params, current_user.id)
+    notify_worker(current_app._get_current_object())
+
+    return jsonify(pdf_job_to_dict(job)), 202
+
+
+@pdf_bp.get("/jobs/<int:job_id>")
+@login_required
+@query_budget(2)
+def get_pdf_job(job_id):
+    """Estado y progreso de un trabajo"""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+
+    return jsonify(pdf_job_to_dict(job)), 200
+
+
+@pdf_bp.get("/jobs/<int:job_id>/download")
+@login_required
+@query_budget(3)
+def download_pdf_job(job_id):
+    """PDF de un trabajo terminado"""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+
+    if job.status != 'done':
+        return jsonify({"error": "El trabajo no terminó", "status": job.status}), 409
+
+    def write(spool):
+        copy_job_result(job, spool)
+        release_connection()
+
+    return send_spooled_pdf(write, job.result_name)
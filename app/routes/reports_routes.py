@@ -1,26 +1,33 @@
 # app/routes/reports_routes.py
 from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required
+from app.services.query_budget import query_budget
+from app.services.admission import admission_lane
+from app.services.http_cache import conditional, STATS_BUCKET_SECONDS
+from app.services.cache_service import SALES, CUSTOMERS
 from datetime import datetime, timedelta
 from app.services.reports_service import (
-    get_sales_summary,
     get_sales_by_channel,
     get_sales_by_delivery_type,
     get_daily_sales,
+    get_period_reports,
     get_top_customers,
     compare_periods,
-    get_changes_stats,
+    get_changes_counts,
     get_monthly_changes_trend,
     mark_change_received
 )
 from app.services.sales_services import today_ar
-from app.serializers.sales_serializer import sales_to_dict
+from app.services.cache_service import report_cache, cache_key
 
 reports_bp = Blueprint("reports", __name__, url_prefix="/reports")
 
 # PIN de acceso (debería estar en variables de entorno)
 REPORTS_PIN = "1234"  # 🔹 Cambiar en producción
 
+# Máximo de períodos por request en /reports/periods
+MAX_PERIODS = 12
+
 
 @reports_bp.get("/")
 @login_required
@@ -42,12 +49,8 @@ def verify_pin():
     return jsonify({'valid': False, 'message': 'PIN incorrecto'}), 401
 
 
-@reports_bp.get("/dashboard")
-@login_required
-def get_dashboard():
-    """Datos principales del dashboard"""
-    today = today_ar()
-    
+def build_dashboard(today):
+    """Arma los datos del dashboard para el día dado"""
     # Mes actual vs mes anterior
     current_month_start = today.replace(day=1)
     current_month_end = today
@@ -65,17 +68,38 @@ def get_dashboard():
         previous_month_start, previous_month_end
     )
     
-    return jsonify({
+    return {
         'comparison': comparison,
         'channels': get_sales_by_channel(current_month_start, current_month_end),
         'delivery_types': get_sales_by_delivery_type(current_month_start, current_month_end),
         'daily_sales': get_daily_sales(today - timedelta(days=30), today),
         'top_customers': get_top_customers(current_month_start, current_month_end, limit=5)
-    })
+    }
+
+
+@reports_bp.get("/dashboard")
+@login_required
+@query_budget(8)
+@admission_lane('report')
+@conditional(SALES, CUSTOMERS)
+def get_dashboard():
+    """Datos principales del dashboard (cacheados hasta la próxima venta)"""
+    today = today_ar()
+    
+    data = report_cache.get_or_compute(
+        cache_key('dashboard', today=today),
+        lambda: build_dashboard(today),
+        depends=(CUSTOMERS,)
+    )
+    
+    return jsonify(data)
 
 
 @reports_bp.get("/sales-summary")
 @login_required
+@query_budget(3)
+@admission_lane('report')
+@conditional(SALES)
 def sales_summary():
     """Resumen de ventas con filtros"""
     start_date_str = request.args.get('start_date')
@@ -84,39 +108,71 @@ def sales_summary():
     start_date = datetime.fromisoformat(start_date_str).date() if start_date_str else None
     end_date = datetime.fromisoformat(end_date_str).date() if end_date_str else None
     
-    summary = get_sales_summary(start_date, end_date)
-    channels = get_sales_by_channel(start_date, end_date)
-    delivery = get_sales_by_delivery_type(start_date, end_date)
+    if not start_date:
+        start_date = today_ar().replace(day=1)
+    if not end_date:
+        end_date = today_ar()
     
-    return jsonify({
-        'summary': summary,
-        'by_channel': channels,
-        'by_delivery': delivery
-    })
+    # Resumen y desgloses en una sola consulta (o desde cache)
+    data = get_period_reports({'period': (start_date, end_date)})['period']
+    
+    return jsonify(data)
+
+
+@reports_bp.post("/periods")
+@login_required
+@query_budget(3)
+@admission_lane('report')
+def period_reports():
+    """
+    Resúmenes de varios períodos en un solo request.
+    Body: {"periods": [{"name": "mes", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}, ...]}
+    """
+    data = request.get_json(silent=True)
+    
+    if not isinstance(data, dict) or not isinstance(data.get('periods'), list):
+        return jsonify({'error': 'Debe enviar una lista de períodos'}), 400
+    
+    if not data['periods'] or len(data['periods']) > MAX_PERIODS:
+        return jsonify({'error': f'Debe enviar entre 1 y {MAX_PERIODS} períodos'}), 400
+    
+    periods = {}
+    try:
+        for p in data['periods']:
+            name = str(p['name'])
+            start_date = datetime.fromisoformat(p['start_date']).date()
+            end_date = datetime.fromisoformat(p['end_date']).date()
+            
+            if start_date > end_date:
+                return jsonify({'error': f'Rango inválido en {name}'}), 400
+            if name in periods:
+                return jsonify({'error': f'Período repetido: {name}'}), 400
+            
+            periods[name] = (start_date, end_date)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Formato de período inválido'}), 400
+    
+    return jsonify(get_period_reports(periods))
 
 
 @reports_bp.get("/changes-stats")
 @login_required
+@query_budget(4)
+@admission_lane('report')
+@conditional(SALES, bucket_seconds=STATS_BUCKET_SECONDS)
 def changes_stats():
-    """Estadísticas de cambios"""
-    stats = get_changes_stats()
-    trend = get_monthly_changes_trend(months=6)
-    
+    """Estadísticas de cambios (sólo conteos y tendencia; los listados están en /changes/stats)"""
     return jsonify({
-        'stats': {
-            'total_changes': stats['total_changes'],
-            'pending_count': stats['pending_count'],
-            'overdue_count': stats['overdue_count'],
-            'changes_this_month': stats['changes_this_month']
-        },
-        'trend': trend,
-        'pending': [sales_to_dict(s) for s in stats['pending_sales']],
-        'overdue': [sales_to_dict(s) for s in stats['overdue_sales']]
+        'stats': get_changes_counts(),
+        'trend': get_monthly_changes_trend(months=6)
     })
 
 
 @reports_bp.get("/top-customers")
 @login_required
+@query_budget(3)
+@admission_lane('report')
+@conditional(SALES, CUSTOMERS)
 def top_customers():
     """Top clientes con filtros"""
     start_date_str = request.args.get('start_date')
@@ -126,6 +182,11 @@ def top_customers():
     start_date = datetime.fromisoformat(start_date_str).date() if start_date_str else None
     end_date = datetime.fromisoformat(end_date_str).date() if end_date_str else None
     
-    customers = get_top_customers(start_date, end_date, limit)
+    customers = report_cache.get_or_compute(
+        cache_key('top_customers', start=start_date, end=end_date, limit=limit),
+        lambda: get_top_customers(start_date, end_date, limit),
+        past_only=end_date is not None and end_date < today_ar(),
+        depends=(CUSTOMERS,)
+    )
     
     return jsonify(customers)
\ No newline at end of file
@@ -1,46 +1,84 @@
 # routes/sales.py
-from flask import Blueprint, jsonify, request, render_template, redirect, url_for
+from flask import (
+    Blueprint, jsonify, request, render_template, redirect, url_for,
+    Response, stream_with_context, current_app
+)
+from sqlalchemy.orm import joinedload
 from app.models.sale import Sale 
+from app.services.time_utils import iso_utc, request_now
 from flask_login import login_required
+from app.services.query_budget import query_budget
+from app.services.http_cache import conditional
+from app.services.cache_service import SALES, CUSTOMERS
+from app.services.transition_service import parse_sale_ids
 from app.services.sales_services import(
     last_sales_service, create_sale, update_sale, delete_sale, 
-    get_sale_by_id, filter_sales, mark_sale_paid, explore_sales, 
-    get_sales_by_turn, get_shipments_by_day, get_shipping_calendar, update_shipment
+    get_sale_by_id, filter_sales, mark_sale_paid, mark_many_paid, explore_sales, 
+    get_sales_by_turn, get_shipments_by_day, get_shipping_calendar, update_shipment,
+    sales_list_query, get_sales_page, iter_sales
 )
 
 from app.serializers.sales_serializer import(
     sales_to_dict,
-    sales_to_list
+    sale_record_to_dict,
+    sale_records_to_list
 )
 
 sales_bp = Blueprint("sales", __name__, url_prefix="/sales")
 
+# Tamaño máximo de página en GET /sales
+MAX_PAGE_SIZE = 500
+
 @sales_bp.get("/shipments")
 def shipments_view():
     return render_template("shipments.html")
 
 
-# GET /sales → listado de últimas ventas
+# GET /sales → listado de ventas paginado por cursor
 @sales_bp.get("")
 @login_required
+@query_budget(3)
 def list_sales():
+    """
+    Query params:
+    - sales_channel, has_shipping: filtros opcionales
+    - limit: tamaño de página (default 50, máx 500)
+    - cursor: next_cursor de la página anterior
+    - stream=1: devuelve TODAS las ventas como NDJSON, en lotes
+    """
+    query = sales_list_query(
+        sales_channel=request.args.get("sales_channel"),
+        has_shipping=request.args.get("has_shipping")
+    )
 
-    query = Sale.query
-
-    sales_channel = request.args.get("sales_channel")
-    has_shipping = request.args.get("has_shipping")
+    if request.args.get("stream") == "1":
+        now = request_now()
 
-    if sales_channel:
-        query = query.filter(Sale.sales_channel == sales_channel)
+        def generate():
+            for record in iter_sales(query):
+                yield current_app.json.dumps(sale_record_to_dict(record, now)) + "\n"
 
-    if has_shipping is not None:
-        query = query.filter(
-            Sale.has_shipping == (has_shipping.lower() == "true")
+        return Response(
+            stream_with_context(generate()),
+            mimetype="application/x-ndjson"
         )
 
-    sales = query.order_by(Sale.created_at.desc()).all()
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Parámetro limit inválido"}), 400
 
-    return jsonify(sales_to_list(sales)), 200
+    try:
+        sales, next_cursor = get_sales_page(
+            query, limit=limit, cursor=request.args.get("cursor")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "sales": sale_records_to_list(sales),
+        "next_cursor": next_cursor
+    }), 200
 
 # GET /sales/<id> → traer venta por ID
 @sales_bp.get("/<int:id>")
@@ -103,6 +141,7 @@ def delete_existing_sale(id):
 
 @sales_bp.get("/explore")
 @login_required
+@query_budget(6)
 def explore_sales_page():
     # Obtener filtros de la query string
     filters = {
@@ -111,10 +150,15 @@ def explore_sales_page():
         "paid": request.args.get("paid", ""),
         "date_from": request.args.get("date_from", ""),
         "date_to": request.args.get("date_to", ""),
-        "page": int(request.args.get("page", 1))
+        "page": request.args.get("page", 1, type=int),
+        "after": request.args.get("after"),
+        "before": request.args.get("before")
     }
     
-    data = explore_sales(filters)
+    try:
+        data = explore_sales(filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     return render_template(
         "explore_sales.html",
@@ -123,12 +167,15 @@ def explore_sales_page():
         per_page=data["per_page"],
         total_sales=data["total_sales"],
         total_pages=data["total_pages"],
+        next_cursor=data["next_cursor"],
+        prev_cursor=data["prev_cursor"],
         filters=filters
     )
 
 
 @sales_bp.get("/print-labels")
 @login_required
+@query_budget(3)
 def print_labels_view():
     """Vista para impresión masiva de etiquetas"""
     page = int(request.args.get('page', 1))
@@ -137,6 +184,7 @@ def print_labels_view():
     # Últimas ventas ordenadas por fecha
     pagination = (
         Sale.query
+        .options(joinedload(Sale.customer))
         .order_by(Sale.created_at.desc())
         .paginate(page=page, per_page=per_page, error_out=False)
     )
@@ -151,20 +199,46 @@ def print_labels_view():
 # Endpoint para marcar venta como pagada
 @sales_bp.post("/<int:sale_id>/mark_paid")
 @login_required
+@query_budget(4)
 def mark_sale_paid_endpoint(sale_id):
     sale, message = mark_sale_paid(sale_id)
     if not sale:
         return jsonify({"error": message}), 400
     return jsonify({"message": message}), 200
 
+# Endpoint para marcar varias ventas como pagadas
+@sales_bp.post("/mark_paid")
+@login_required
+@query_budget(6)
+def mark_many_paid_endpoint():
+    """Body: {"ids": [...]}. Responde el resultado de cada id"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Datos inválidos"}), 400
+
+    try:
+        ids = parse_sale_ids(data.get("ids"), current_app.config["BULK_ACTION_MAX"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    results, updated = mark_many_paid(ids)
+
+    return jsonify({
+        "message": f"{updated} venta(s) marcada(s) como pagada(s)",
+        "updated": updated,
+        "failed": len(results) - updated,
+        "results": results
+    }), 200
+
 @sales_bp.get("/last_sales")
 @login_required
+@query_budget(2)
 def get_last_sales():
     sales = last_sales_service(10)
     return jsonify([
         {
             "id": s.id,
-            "sale_date": s.created_at.isoformat(),
+            "sale_date": iso_utc(s.created_at),
             "customer_first_name": s.customer.first_name,
             "customer_last_name": s.customer.last_name,
             "amount": s.amount,
@@ -176,6 +250,7 @@ def get_last_sales():
 
 @sales_bp.route("/turn", methods=["GET"])
 @login_required
+@query_budget(2)
 def sales_by_turn():
     """
     Endpoint: /sales/turn?start=YYYY-MM-DDTHH:MM&end=YYYY-MM-DDTHH:MM
@@ -195,7 +270,7 @@ def sales_by_turn():
         return jsonify({"error": "Formato de fecha inválido. Use ISO 8601"}), 400
 
     sales = get_sales_by_turn(start_dt, end_dt)
-    sales_list = sales_to_list(sales)
+    sales_list = sale_records_to_list(sales)
 
     return jsonify(sales_list)
 
@@ -203,6 +278,8 @@ def sales_by_turn():
 # 🔹 CORREGIDO: Calendario con parámetros configurables
 @sales_bp.get("/shipments/calendar")
 @login_required
+@query_budget(3)
+@conditional(SALES)
 def shipments_calendar():
     """
     Retorna cantidad de envíos por día
@@ -221,6 +298,8 @@ def shipments_calendar():
 # 🔹 CORREGIDO: Envíos de un día específico
 @sales_bp.get("/shipments/day/<shipping_date>")
 @login_required
+@query_budget(3)
+@conditional(SALES, CUSTOMERS)
 def shipments_by_day(shipping_date):
     """
     Retorna los envíos de una fecha específica
@@ -228,14 +307,22 @@ def shipments_by_day(shipping_date):
         shipping_date: formato YYYY-MM-DD
     """
     sales = get_shipments_by_day(shipping_date)
-    return jsonify([sales_to_dict(s) for s in sales]), 200
+    return jsonify(sale_records_to_list(sales)), 200
 
 
 @sales_bp.put("/shipments/<int:sale_id>")
 @login_required
 def update_shipment_endpoint(sale_id):
-    sale = Sale.query.get_or_404(sale_id)
-    data = request.json
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Datos inválidos"}), 400
+
+    try:
+        found = update_shipment(sale_id, data)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Fecha de envío inválida"}), 400
+
+    if not found:
+        return jsonify({"error": "Venta no encontrada"}), 404
 
-    update_shipment(sale, data)
     return jsonify({"ok": True})
\ No newline at end of file
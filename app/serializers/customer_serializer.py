@@ -1,4 +1,5 @@
 from app.models.customer import Customer
+from app.services.time_utils import iso_utc
 
 
 def customer_to_dict(customer):
@@ -10,7 +11,7 @@ def customer_to_dict(customer):
         "city": customer.city,
         "phone": customer.phone,
         "description": customer.description,
-        "created_at": customer.created_at.isoformat()
+        "created_at": iso_utc(customer.created_at)
     }
 
 def customers_to_list(customers):
@@ -0,0 +1,21 @@
+from flask import url_for
+from app.services.time_utils import iso_utc
+
+
+def pdf_job_to_dict(job):
+    done = job.status == 'done'
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "total": job.total,
+        "progress": job.progress,
+        "percent": round(job.progress * 100 / job.total) if job.total else 0,
+        "error": job.error,
+        "created_at": iso_utc(job.created_at),
+        "started_at": iso_utc(job.started_at),
+        "finished_at": iso_utc(job.finished_at),
+        "size": job.result_size,
+        "status_url": url_for("pdf.get_pdf_job", job_id=job.id),
+        "download_url": url_for("pdf.download_pdf_job", job_id=job.id) if done else None
+    }
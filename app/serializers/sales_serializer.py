@@ -1,4 +1,5 @@
 from app.models.sale import Sale
+from app.services.time_utils import iso_utc, request_now
 
 
 def sales_to_dict(sale):
@@ -12,8 +13,12 @@ def sales_to_dict(sale):
         "customer_address": customer.address if customer else "",
         "customer_city": customer.city if customer else "",
 
-        "sale_date": sale.sale_date.isoformat() if sale.sale_date else None,
-        "created_at": sale.created_at.isoformat() if sale.created_at else None,
+        "sale_date": iso_utc(sale.sale_date),
+        "created_at": iso_utc(sale.created_at),
+        "business_date": (
+            sale.business_date.isoformat()
+            if sale.business_date else None
+        ),
 
         "amount": float(sale.amount),
         "payment_method": sale.payment_method,
@@ -30,20 +35,16 @@ def sales_to_dict(sale):
         "is_cash": sale.is_cash,
         "has_change": sale.has_change,
         "delivery_type": sale.delivery_type,
-        "completed_at": sale.completed_at,
+        "completed_at": iso_utc(sale.completed_at),
         
         # 🔹 NUEVO: Campos de entrega
-        "delivered_at": (
-            sale.delivered_at.isoformat()
-            if sale.delivered_at else None
-        ),
-        "shipped_at": (
-            sale.shipped_at.isoformat()
-            if sale.shipped_at else None
-        ),
+        "delivered_at": iso_utc(sale.delivered_at),
+        "shipped_at": iso_utc(sale.shipped_at),
         "is_delivered": sale.is_delivered,
         "days_since_creation": sale.days_since_creation,
         "is_overdue": sale.is_overdue,
+        "fulfillment_status": sale.fulfillment_status,
+        "claimed_by": sale.claimed_by,
         
         # Info del customer (para evitar queries adicionales)
         "customer_phone": customer.phone if customer else None
@@ -52,4 +53,52 @@ def sales_to_dict(sale):
     }
 
 def sales_to_list(sales):
-    return [sales_to_dict(s) for s in sales]
\ No newline at end of file
+    return [sales_to_dict(s) for s in sales]
+
+def sale_record_to_dict(record, now):
+    """
+    Mismo JSON que sales_to_dict, a partir de un SaleRecord.
+    Fechas y montos van sin convertir: los formatea el encoder JSON de la
+    app (ver app/json_provider.py).
+    """
+    return {
+        "id": record.id,
+        "customer_id": record.customer_id,
+        "customer_first_name": record.customer_first_name or "",
+        "customer_last_name": record.customer_last_name or "",
+        "customer_address": record.customer_address or "",
+        "customer_city": record.customer_city or "",
+
+        "sale_date": record.sale_date,
+        "created_at": record.created_at,
+        "business_date": record.business_date,
+
+        "amount": record.amount,
+        "payment_method": record.payment_method,
+        "paid": record.paid,
+        "notes": record.notes or "",
+
+        "has_shipping": record.has_shipping,
+        "shipping_date": record.shipping_date,
+        "sales_channel": record.sales_channel,
+        "is_cash": record.is_cash,
+        "has_change": record.has_change,
+        "delivery_type": record.delivery_type,
+        "completed_at": record.completed_at,
+
+        "delivered_at": record.delivered_at,
+        "shipped_at": record.shipped_at,
+        "is_delivered": record.is_delivered,
+        "days_since_creation": record.days_since_creation(now),
+        "is_overdue": record.is_overdue(now),
+        "fulfillment_status": record.fulfillment_status,
+        "claimed_by": record.claimed_by,
+
+        "customer_phone": record.customer_phone
+    }
+
+
+def sale_records_to_list(records):
+    """Serializa SaleRecords con un único now para todo el request"""
+    now = request_now()
+    return [sale_record_to_dict(r, now) for r in records]
@@ -0,0 +1,236 @@
+# app/services/admission.py
+import math
+import threading
+import time
+from flask import g, request, current_app, jsonify
+
+
+# Carriles por defecto según los hilos del worker de gunicorn:
+#   carril: (concurrentes, en cola, espera máxima en segundos)
+# Un request en cola también ocupa un hilo, así que por defecto nadie
+# espera: si el carril está lleno se responde 503 en el momento. Los
+# carriles que no son 'pos' comparten además un tope de hilos (todos
+# menos los reservados para el mostrador), contando los que esperan.
+def default_lanes(threads, pos_reserved):
+    shared = max(threads - pos_reserved, 1)
+    return {
+        'pos': (threads, 0, 0),
+        'read': (shared, 0, 0),
+        'report': (1, 0, 0),
+        'pdf': (1, 0, 0),
+    }
+
+
+# Endpoints que no pasan por el control de admisión
+EXEMPT_ENDPOINTS = {'static'}
+
+
+def admission_lane(name):
+    """
+    Decorador de vistas: carril de admisión del endpoint. Sin decorador,
+    GET/HEAD van a 'read' y el resto (escrituras) a 'pos'.
+    """
+    def decorator(view):
+        # functools.wraps (login_required) copia el atributo al wrapper
+        view.admission_lane = name
+        return view
+
+    return decorator
+
+
+class LaneFull(Exception):
+    """El carril no tiene lugar (cola llena o se agotó la espera)"""
+
+
+class Lane:
+    """
+    Semáforo con cola acotada: hasta `limit` requests a la vez, hasta
+    `queue_size` esperando (cada uno como mucho `max_wait` segundos).
+    Con `parent` el request además ocupa un lugar del carril padre (sin
+    esperar) desde que entra, en cola o corriendo.
+    Lleva métricas de espera en cola.
+    """
+
+    def __init__(self, name, limit, queue_size, max_wait, parent=None):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.parent = parent
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.queued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def acquire(self):
+        """
+        Entra al carril. Returns: segundos de espera en cola.
+        Raises: LaneFull
+        """
+        if self.parent is not None:
+            self.parent.acquire()
+        try:
+            return self._acquire()
+        except LaneFull:
+            if self.parent is not None:
+                self.parent.release()
+            raise
+
+    def _acquire(self):
+        start = time.perf_counter()
+
+        with self._cond:
+            if self._active < self.limit and not self._waiting:
+                self._active += 1
+                self.admitted += 1
+                return 0.0
+
+            if self._waiting >= self.queue_size:
+                self.rejected += 1
+                raise LaneFull(self.name)
+
+            self._waiting += 1
+            self.queued += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self._active < self.limit, self.max_wait)
+            finally:
+                self._waiting -= 1
+
+            waited = time.perf_counter() - start
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+            if not admitted:
+                self.timed_out += 1
+                raise LaneFull(self.name)
+
+            self._active += 1
+            self.admitted += 1
+            return waited
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+        if self.parent is not None:
+            self.parent.release()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'queue_size': self.queue_size,
+                'active': self._active,
+                'waiting': self._waiting,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'wait_avg': self.wait_total / self.queued if self.queued else 0.0,
+                'wait_max': self.wait_max,
+            }
+
+
+def lane_for_request():
+    """Carril del request actual, o None si está exento"""
+    if request.endpoint is None or request.endpoint in EXEMPT_ENDPOINTS:
+        return None
+
+    view = current_app.view_functions.get(request.endpoint)
+    name = getattr(view, 'admission_lane', None)
+    if name:
+        return name
+    return 'read' if request.method in ('GET', 'HEAD', 'OPTIONS') else 'pos'
+
+
+def _admit():
+    lanes = current_app.extensions.get('admission_lanes')
+    name = lane_for_request()
+    if not lanes or name is None:
+        return None
+
+    lane = lanes[name]
+    try:
+        waited = lane.acquire()
+    except LaneFull:
+        response = jsonify({"error": "Servidor ocupado, reintentar en unos segundos"})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max(1, math.ceil(lane.max_wait)))
+        return response
+
+    g._admission_lane = lane
+    g._admission_wait = waited
+    return None
+
+
+def _add_timing(response):
+    waited = g.get('_admission_wait')
+    if waited is not None:
+        response.headers.add('Server-Timing', f'queue;desc="{g._admission_lane.name}";dur={waited * 1000:.1f}')
+        if waited > 1:
+            current_app.logger.warning(
+                "Request %s esperó %.2fs en el carril %s", request.path, waited, g._admission_lane.name
+            )
+    return response
+
+
+def _release(exc=None):
+    lane = g.pop('_admission_lane', None)
+    if lane is not None:
+        lane.release()
+
+
+def admission_stats(app):
+    """Métricas de cada carril en este proceso (esperas en segundos)"""
+    lanes = app.extensions.get('admission_lanes') or {}
+    stats = {name: lane.stats() for name, lane in lanes.items()}
+    shared = next((lane.parent for lane in lanes.values() if lane.parent), None)
+    if shared is not None:
+        stats[shared.name] = shared.stats()
+    return stats
+
+
+def init_admission(app):
+    """
+    Control de admisión por carriles (pos, read, report, pdf): cada carril
+    tiene su límite de requests concurrentes y una cola acotada; si la cola
+    está llena o la espera supera el máximo se responde 503 con
+    Retry-After. read, report y pdf comparten 'shared', que deja
+    ADMISSION_POS_RESERVED hilos libres para las ventas del mostrador.
+
+    ADMISSION_ENABLED: activa/desactiva el control.
+    ADMISSION_THREADS: hilos por worker (--threads de gunicorn).
+    ADMISSION_POS_RESERVED: hilos que sólo puede usar 'pos'.
+    ADMISSION_LANES: {carril: (concurrentes, en cola, espera máx.)}
+    """
+    app.config.setdefault('ADMISSION_ENABLED', True)
+    app.config.setdefault('ADMISSION_THREADS', 4)
+    app.config.setdefault('ADMISSION_POS_RESERVED', 1)
+
+    threads = app.config['ADMISSION_THREADS']
+    pos_reserved = min(app.config['ADMISSION_POS_RESERVED'], threads - 1)
+    lanes = {
+        **default_lanes(threads, pos_reserved),
+        **app.config.get('ADMISSION_LANES', {})
+    }
+    app.config['ADMISSION_LANES'] = lanes
+
+    if not app.config['ADMISSION_ENABLED']:
+        return
+
+    shared = Lane('shared', max(threads - pos_reserved, 1), 0, 0)
+    app.extensions['admission_lanes'] = {
+        name: Lane(name, *settings, parent=None if name == 'pos' else shared)
+        for name, settings in lanes.items()
+    }
+
+    app.before_request(_admit)
+    app.after_request(_add_timing)
+    app.teardown_request(_release)
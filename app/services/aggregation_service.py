@@ -0,0 +1,217 @@
+# app/services/aggregation_service.py
+from sqlalchemy import func, case, literal, select, union_all, Date, String
+from app.models.sales_daily_rollup import SalesDailyRollup as Rollup
+from app.extensions import db
+
+
+def range_filter(start_date, end_date):
+    """Condición de rango de días (inclusive) sobre el rollup diario"""
+    return Rollup.business_date.between(start_date, end_date)
+
+
+def summary_columns():
+    """
+    Medidas del resumen como agregados condicionales sobre el rollup.
+    Todas se resuelven en un único SELECT (SUM ... FILTER).
+    """
+    paid = Rollup.paid.is_(True)
+    unpaid = Rollup.paid.is_(False)
+
+    return [
+        func.coalesce(func.sum(Rollup.sale_count), 0).label('total_sales'),
+        func.coalesce(func.sum(Rollup.total_amount), 0).label('total_amount'),
+        func.coalesce(func.sum(Rollup.sale_count).filter(paid), 0).label('paid_sales'),
+        func.coalesce(func.sum(Rollup.total_amount).filter(paid), 0).label('paid_amount'),
+        func.coalesce(func.sum(Rollup.sale_count).filter(unpaid), 0).label('unpaid_sales'),
+        func.coalesce(func.sum(Rollup.total_amount).filter(unpaid), 0).label('unpaid_amount'),
+    ]
+
+
+def row_to_summary(row):
+    """Convierte una fila de summary_columns() al dict del resumen"""
+    if row is None:
+        return empty_summary()
+
+    total_sales = row.total_sales or 0
+    total_amount = row.total_amount or 0
+    avg_ticket = total_amount / total_sales if total_sales > 0 else 0
+
+    return {
+        'total_sales': total_sales,
+        'total_amount': float(total_amount),
+        'paid_sales': row.paid_sales or 0,
+        'paid_amount': float(row.paid_amount or 0),
+        'unpaid_sales': row.unpaid_sales or 0,
+        'unpaid_amount': float(row.unpaid_amount or 0),
+        'avg_ticket': float(avg_ticket)
+    }
+
+
+def empty_summary():
+    return {
+        'total_sales': 0,
+        'total_amount': 0.0,
+        'paid_sales': 0,
+        'paid_amount': 0.0,
+        'unpaid_sales': 0,
+        'unpaid_amount': 0.0,
+        'avg_ticket': 0.0
+    }
+
+
+def aggregate_sales(start_date, end_date, group_by=None):
+    """
+    Calcula todas las medidas del resumen en una sola consulta.
+    El costo depende de la cantidad de días del rango, no de ventas.
+
+    Args:
+        start_date, end_date: rango de fechas (inclusive)
+        group_by: columna opcional del rollup (ej: Rollup.sales_channel)
+
+    Returns:
+        Una fila si no se agrupa, o lista de filas (la columna de
+        agrupación va primero, con su nombre original)
+    """
+    if group_by is None:
+        return (
+            db.session.query(*summary_columns())
+            .filter(range_filter(start_date, end_date))
+            .one()
+        )
+
+    return (
+        db.session.query(group_by, *summary_columns())
+        .filter(range_filter(start_date, end_date))
+        .group_by(group_by)
+        .all()
+    )
+
+
+def summarize_periods(periods):
+    """
+    Resumen de varios períodos en un solo round trip.
+
+    Cada fila se asigna a su período con un CASE sobre los rangos y se
+    agrupa por ese período. Los períodos no deben superponerse: una
+    venta cuenta sólo para el primer período que la contiene.
+
+    Args:
+        periods: dict {nombre: (start_date, end_date)}
+
+    Returns:
+        Dict {nombre: resumen} con todos los períodos (vacíos incluidos)
+    """
+    if not periods:
+        return {}
+
+    period = case(
+        *[
+            (range_filter(start, end), literal(name))
+            for name, (start, end) in periods.items()
+        ],
+        else_=None
+    ).label('period')
+
+    rows = (
+        db.session.query(period, *summary_columns())
+        .filter(db.or_(*[
+            range_filter(start, end) for start, end in periods.values()
+        ]))
+        .group_by(period)
+        .all()
+    )
+
+    by_period = {r.period: row_to_summary(r) for r in rows}
+    return {name: by_period.get(name, empty_summary()) for name in periods}
+
+
+def periods_table(periods):
+    """
+    CTE con un registro (name, start_date, end_date) por período,
+    para unir contra el rollup.
+    """
+    selects = [
+        select(
+            literal(name, String).label('name'),
+            literal(start, Date).label('start_date'),
+            literal(end, Date).label('end_date')
+        )
+        for name, (start, end) in periods.items()
+    ]
+    source = union_all(*selects) if len(selects) > 1 else selects[0]
+    return source.cte('periods')
+
+
+def summarize_periods_with_breakdowns(periods):
+    """
+    Resumen, ventas por canal y por tipo de entrega de varios períodos,
+    todo en una sola consulta agrupada.
+
+    Los rangos se unen como tabla (JOIN ... BETWEEN) en lugar de un CASE
+    para que períodos superpuestos (ej: el mes y su última semana) vean
+    cada uno todas sus filas.
+
+    Args:
+        periods: dict {nombre: (start_date, end_date)}
+
+    Returns:
+        Dict {nombre: {'summary', 'by_channel', 'by_delivery'}}
+    """
+    if not periods:
+        return {}
+
+    p = periods_table(periods)
+
+    rows = (
+        db.session.query(
+            p.c.name,
+            Rollup.sales_channel,
+            Rollup.delivery_type,
+            Rollup.paid,
+            func.sum(Rollup.sale_count).label('sale_count'),
+            func.sum(Rollup.total_amount).label('total_amount')
+        )
+        .select_from(Rollup)
+        .join(p, Rollup.business_date.between(p.c.start_date, p.c.end_date))
+        .group_by(p.c.name, Rollup.sales_channel, Rollup.delivery_type, Rollup.paid)
+        .all()
+    )
+
+    totals = {name: empty_summary() for name in periods}
+    channels = {name: {} for name in periods}
+    deliveries = {name: {} for name in periods}
+
+    for r in rows:
+        count = r.sale_count or 0
+        amount = float(r.total_amount or 0)
+
+        summary = totals[r.name]
+        summary['total_sales'] += count
+        summary['total_amount'] += amount
+        prefix = 'paid' if r.paid else 'unpaid'
+        summary[f'{prefix}_sales'] += count
+        summary[f'{prefix}_amount'] += amount
+
+        for bucket, key in ((channels, r.sales_channel), (deliveries, r.delivery_type)):
+            entry = bucket[r.name].setdefault(key, {'count': 0, 'total': 0.0})
+            entry['count'] += count
+            entry['total'] += amount
+
+    result = {}
+    for name, summary in totals.items():
+        if summary['total_sales'] > 0:
+            summary['avg_ticket'] = summary['total_amount'] / summary['total_sales']
+
+        result[name] = {
+            'summary': summary,
+            'by_channel': [
+                {'channel': k, 'count': v['count'], 'total': v['total']}
+                for k, v in sorted(channels[name].items())
+            ],
+            'by_delivery': [
+                {'type': k, 'count': v['count'], 'total': v['total']}
+                for k, v in sorted(deliveries[name].items())
+            ]
+        }
+
+    return result
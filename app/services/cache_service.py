@@ -0,0 +1,159 @@
+# app/services/cache_service.py
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from flask import g, has_request_context
+from sqlalchemy import update
+from app.models.data_version import DataVersion
+from app.extensions import db
+from app.services.time_utils import today_ar
+
+
+# Versión de cualquier escritura sobre ventas
+SALES = 'sales'
+# Versión de escrituras que tocan días ya cerrados (anteriores a hoy)
+SALES_HISTORY = 'sales_history'
+# Versión de escrituras sobre clientes (nombres en listados y reportes)
+CUSTOMERS = 'customers'
+
+
+# =========================
+#   VERSIONES DE DATOS
+# =========================
+
+def bump_versions(*names):
+    """
+    Incrementa las versiones dentro de la transacción actual. En
+    PostgreSQL/SQLite es un único upsert: si la fila no existe se crea
+    sin que dos workers puedan chocar en la clave primaria.
+    """
+    now = datetime.utcnow()
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+
+        stmt = upsert(DataVersion).values([
+            {'name': name, 'version': 1, 'updated_at': now} for name in dict.fromkeys(names)
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'version': DataVersion.version + 1, 'updated_at': stmt.excluded.updated_at}
+        )
+        db.session.execute(stmt)
+    else:
+        # Otros motores: las filas las crea la migración
+        for name in names:
+            result = db.session.execute(
+                update(DataVersion)
+                .where(DataVersion.name == name)
+                .values(version=DataVersion.version + 1, updated_at=now)
+            )
+            if result.rowcount == 0:
+                db.session.add(DataVersion(name=name, version=1))
+
+    if has_request_context():
+        g.pop('_data_versions', None)
+
+
+def touch_sales(*business_dates):
+    """
+    Registra una escritura sobre ventas.
+
+    Args:
+        business_dates: días de negocio afectados; si alguno es anterior
+            a hoy también se invalida lo cacheado de períodos cerrados
+    """
+    today = today_ar()
+    if any(d is not None and d < today for d in business_dates):
+        bump_versions(SALES, SALES_HISTORY)
+    else:
+        bump_versions(SALES)
+
+
+def get_versions():
+    """Versiones actuales {nombre: versión}, una consulta por request"""
+    if has_request_context() and '_data_versions' in g:
+        return g._data_versions
+
+    versions = dict(db.session.query(DataVersion.name, DataVersion.version).all())
+
+    if has_request_context():
+        g._data_versions = versions
+    return versions
+
+
+# =========================
+#   CACHE DE RESULTADOS
+# =========================
+
+MISSING = object()
+
+
+class ResultCache:
+    """
+    Cache en memoria (por proceso) de resultados de reportes.
+
+    Cada entrada guarda la versión de datos con la que se calculó y sólo
+    se usa mientras esa versión siga vigente en la base. Las entradas de
+    períodos cerrados (past_only) dependen únicamente de SALES_HISTORY,
+    así que sobreviven a las ventas del día. Las que además muestran datos
+    de clientes pasan depends=(CUSTOMERS,) y se invalidan al editar uno.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _versioned(key, past_only, depends):
+        """Clave completa y versiones vigentes de las que depende la entrada"""
+        names = (SALES_HISTORY if past_only else SALES,) + tuple(depends)
+        versions = get_versions()
+        return names + tuple(key), tuple(versions.get(name, 0) for name in names)
+
+    def get(self, key, past_only=False, depends=()):
+        """Retorna el valor cacheado vigente o MISSING"""
+        full_key, version = self._versioned(key, past_only, depends)
+
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None or entry[0] != version:
+                return MISSING
+            self._entries.move_to_end(full_key)
+            return entry[1]
+
+    def set(self, key, value, past_only=False, depends=()):
+        full_key, version = self._versioned(key, past_only, depends)
+
+        with self._lock:
+            self._entries[full_key] = (version, value)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute, past_only=False, depends=()):
+        value = self.get(key, past_only, depends)
+        if value is MISSING:
+            value = compute()
+            self.set(key, value, past_only, depends)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+report_cache = ResultCache()
+
+
+def cache_key(endpoint, **params):
+    """Clave estable a partir del endpoint y sus parámetros"""
+    return (endpoint,) + tuple(sorted(
+        (k, v.isoformat() if hasattr(v, 'isoformat') else v)
+        for k, v in params.items()
+    ))
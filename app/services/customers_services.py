@@ -2,6 +2,8 @@
 import re
 from app.models.customer import Customer
 from app.extensions import db
+from app.services.search_service import customer_search_query
+from app.services.cache_service import bump_versions, CUSTOMERS
 
 
 def get_all_customers():
@@ -41,6 +43,7 @@ def create_customer(data):
     )
     
     db.session.add(customer)
+    bump_versions(CUSTOMERS)
     db.session.commit()
     return customer
 
@@ -54,6 +57,7 @@ def update_customer(customer, data):
         if field in data:
             setattr(customer, field, data[field])
 
+    bump_versions(CUSTOMERS)
     db.session.commit()
     return customer
 
@@ -63,31 +67,21 @@ def delete_customer(customer):
         raise ValueError("CUSTOMER_HAS_SALES")
 
     db.session.delete(customer)
+    bump_versions(CUSTOMERS)
     db.session.commit()
 
 
 def search_customers(query, limit=10):
-    return (
-        Customer.query
-        .filter(
-            (Customer.first_name.ilike(f"%{query}%")) |
-            (Customer.last_name.ilike(f"%{query}%"))
-        )
-        .limit(limit)
-        .all()
-    )
-def get_customers_paginated_service(page=1, per_page=10, query=""):
-    base_query = Customer.query
+    """Clientes por nombre, rankeados por similitud y compra reciente"""
+    return customer_search_query(query).limit(limit).all()
+
 
+def get_customers_paginated_service(page=1, per_page=10, query=""):
     if query:
-        q = query.lower()
-        base_query = base_query.filter(
-            db.or_(
-                db.func.lower(Customer.first_name).like(f"%{q}%"),
-                db.func.lower(Customer.last_name).like(f"%{q}%")
-            )
-        )
-
-    base_query = base_query.order_by(Customer.first_name.asc(), Customer.last_name.asc())
+        # Con búsqueda se respeta el ranking del índice de nombres
+        base_query = customer_search_query(query)
+    else:
+        base_query = Customer.query.order_by(Customer.first_name.asc(), Customer.last_name.asc())
+
     pagination = base_query.paginate(page=page, per_page=per_page, error_out=False)
-    return pagination
\ No newline at end of file
+    return pagination
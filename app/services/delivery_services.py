@@ -1,110 +1,209 @@
-from datetime import datetime
-from sqlalchemy import and_
-from app.models.sale import Sale
+from sqlalchemy import and_, func, case
+from app.models.sale import Sale, DONE, CLAIMED
 from app.extensions import db
+from app.services.cache_service import touch_sales
+from app.services.time_utils import utc_now, request_now
+from app.services.read_models import sale_records
+from app.services.sales_services import get_backlog_list, BACKLOG_PAGE_SIZE
+from app.services.transition_service import apply_transition, outcomes, not_claimed_by_other
+
+
+def pending_query(delivery_type):
+    """Pedidos pendientes de un tipo (no entregados Y pagados)"""
+    return Sale.query.filter(
+        Sale.delivery_type == delivery_type,
+        Sale.delivered_at.is_(None),
+        Sale.paid.is_(True)  # 🔹 SOLO PAGADOS
+    )
+
+
+def overdue_query(delivery_type, now):
+    """Pendientes vencidos: el filtro de vencido lo resuelve la base"""
+    return pending_query(delivery_type).filter(Sale.is_overdue_at(now, delivery_type))
 
 
 def get_retiro_pending():
     """Obtiene pedidos de retiro pendientes (no entregados Y pagados)"""
-    return (
-        Sale.query
-        .filter(
-            Sale.delivery_type == 'retiro',
-            Sale.delivered_at.is_(None),
-            Sale.paid.is_(True)  # 🔹 SOLO PAGADOS
-        )
-        .order_by(Sale.created_at.asc())
-        .all()
-    )
+    return sale_records(pending_query('retiro').order_by(Sale.created_at.asc()))
 
 
 def get_retiro_overdue():
     """Obtiene pedidos de retiro vencidos (>15 días sin retirar)"""
-    sales = get_retiro_pending()
-    return [s for s in sales if s.is_overdue]
+    return sale_records(
+        overdue_query('retiro', request_now()).order_by(Sale.created_at.asc())
+    )
 
 
 def get_correo_pending():
     """Obtiene pedidos de correo pendientes (no enviados Y pagados)"""
-    return (
-        Sale.query
-        .filter(
-            Sale.delivery_type == 'correo',
-            Sale.delivered_at.is_(None),
-            Sale.paid.is_(True)  # 🔹 SOLO PAGADOS
-        )
-        .order_by(Sale.created_at.asc())
-        .all()
-    )
+    return sale_records(pending_query('correo').order_by(Sale.created_at.asc()))
 
 
 def get_correo_overdue():
     """Obtiene pedidos de correo vencidos (>10 días sin enviar)"""
-    sales = get_correo_pending()
-    return [s for s in sales if s.is_overdue]
-
-
-def mark_as_delivered(sale_id):
-    """Marca un pedido como entregado"""
-    sale = Sale.query.get(sale_id)
-    
-    if not sale:
-        return None, "Venta no encontrada"
-    
-    if sale.is_delivered:
-        return None, "El pedido ya fue entregado"
-    
-    sale.delivered_at = datetime.utcnow()
-    sale.completed_at = datetime.utcnow()
-    
+    return sale_records(
+        overdue_query('correo', request_now()).order_by(Sale.created_at.asc())
+    )
+
+
+def mark_as_delivered(sale_id, user_id=None, ttl_minutes=None):
+    """
+    Marca un pedido como entregado: un solo UPDATE condicional (ver
+    mark_many_delivered), así dos operadores no pueden entregarlo ambos.
+
+    Returns:
+        (id, mensaje) o (None, error)
+    """
+    (result,), _ = mark_many_delivered([sale_id], user_id, ttl_minutes)
+
+    if not result['ok']:
+        return None, result['error']
+
+    return sale_id, "Pedido marcado como entregado"
+
+
+def mark_as_shipped(sale_id, user_id=None, ttl_minutes=None):
+    """Marca un pedido de correo como enviado (ver mark_as_delivered)"""
+    (result,), _ = mark_many_shipped([sale_id], user_id, ttl_minutes)
+
+    if not result['ok']:
+        return None, result['error']
+
+    return sale_id, "Pedido marcado como enviado"
+
+
+# =========================
+#   TRANSICIONES EN BLOQUE
+# =========================
+
+def done_values(now):
+    """Valores de una venta entregada / enviada / recepcionada"""
+    return {
+        'delivered_at': now,
+        'completed_at': now,
+        'fulfillment_status': DONE,
+        'claimed_by': None,
+        'claimed_at': None,
+    }
+
+
+def _claimed_reason(row, user_id):
+    if user_id is not None and row.fulfillment_status == CLAIMED and row.claimed_by != user_id:
+        return "El pedido lo tomó otro operador"
+    return None
+
+
+def mark_many_delivered(ids, user_id=None, ttl_minutes=None):
+    """
+    Marca varios pedidos como entregados con un solo UPDATE condicional.
+    Los tomados por otro operador hace menos de ttl_minutes se rechazan.
+
+    Returns:
+        (resultado por id, cantidad marcada)
+    """
+    rows = apply_transition(
+        ids,
+        [Sale.delivered_at.is_(None), not_claimed_by_other(user_id, ttl_minutes)],
+        done_values(utc_now())
+    )
+
+    def reason(row):
+        if row.delivered_at is not None:
+            return "El pedido ya fue entregado"
+        return _claimed_reason(row, user_id)
+
+    results, updated = outcomes(ids, [row.id for row in rows], reason)
+    if updated:
+        touch_sales()
     db.session.commit()
-    
-    return sale, "Pedido marcado como entregado"
-
-
-def mark_as_shipped(sale_id):
-    """Marca un pedido de correo como enviado"""
-    sale = Sale.query.get(sale_id)
-    
-    if not sale:
-        return None, "Venta no encontrada"
-    
-    if sale.delivery_type != 'correo':
-        return None, "Solo pedidos de correo pueden marcarse como enviados"
-    
-    if sale.is_delivered:
-        return None, "El pedido ya fue enviado"
-    
-    sale.shipped_at = datetime.utcnow()
-    sale.delivered_at = datetime.utcnow()
-    sale.completed_at = datetime.utcnow()
-    
+
+    return results, updated
+
+
+def mark_many_shipped(ids, user_id=None, ttl_minutes=None):
+    """Marca varios pedidos de correo como enviados (ver mark_many_delivered)"""
+    now = utc_now()
+    rows = apply_transition(
+        ids,
+        [
+            Sale.delivery_type == 'correo',
+            Sale.delivered_at.is_(None),
+            not_claimed_by_other(user_id, ttl_minutes)
+        ],
+        {**done_values(now), 'shipped_at': now}
+    )
+
+    def reason(row):
+        if row.delivery_type != 'correo':
+            return "Solo pedidos de correo pueden marcarse como enviados"
+        if row.delivered_at is not None:
+            return "El pedido ya fue enviado"
+        return _claimed_reason(row, user_id)
+
+    results, updated = outcomes(ids, [row.id for row in rows], reason)
+    if updated:
+        touch_sales()
     db.session.commit()
-    
-    return sale, "Pedido marcado como enviado"
 
+    return results, updated
+
+
+def count_backlog(delivery_type, now):
+    """(pendientes, vencidos) de un tipo de entrega en una sola consulta"""
+    total, overdue = (
+        pending_query(delivery_type)
+        .with_entities(
+            func.count(Sale.id),
+            func.count(case((Sale.is_overdue_at(now, delivery_type), 1)))
+        )
+        .one()
+    )
+    return total, overdue
+
+
+def get_delivery_stats(delivery_type, limit=BACKLOG_PAGE_SIZE, pending_cursor=None, overdue_cursor=None):
+    """
+    Conteos (una consulta agregada) y una página keyset de pendientes y
+    de vencidos. En la primera carga (sin cursores) los vencidos salen de
+    la página de pendientes: son los más viejos, así que van primero en
+    el mismo orden. Con cursor ("cargar más") sólo se trae esa lista.
+    """
+    now = request_now()
+    total_pending, total_overdue = count_backlog(delivery_type, now)
+    first_load = not pending_cursor and not overdue_cursor
+
+    pending, pending_next = [], None
+    overdue, overdue_next = [], None
+
+    if first_load or pending_cursor:
+        pending, pending_next = get_backlog_list(
+            pending_query(delivery_type), limit, pending_cursor
+        )
+
+    if first_load:
+        overdue = [s for s in pending if s.is_overdue(now)]
+        # Si no entraron todos, la página entera es de vencidos y su cursor sirve
+        overdue_next = pending_next if len(overdue) < total_overdue else None
+    elif overdue_cursor:
+        overdue, overdue_next = get_backlog_list(
+            overdue_query(delivery_type, now), limit, overdue_cursor
+        )
 
-def get_retiro_stats():
-    """Estadísticas de retiros"""
-    pending = get_retiro_pending()
-    overdue = [s for s in pending if s.is_overdue]
-    
     return {
-        'total_pending': len(pending),
-        'total_overdue': len(overdue),
+        'total_pending': total_pending,
+        'total_overdue': total_overdue,
         'pending_sales': pending,
-        'overdue_sales': overdue
+        'overdue_sales': overdue,
+        'pending_next_cursor': pending_next,
+        'overdue_next_cursor': overdue_next
     }
 
 
-def get_correo_stats():
+def get_retiro_stats(**page):
+    """Estadísticas de retiros"""
+    return get_delivery_stats('retiro', **page)
+
+
+def get_correo_stats(**page):
     """Estadísticas de correo"""
-    pending = get_correo_pending()
-    overdue = [s for s in pending if s.is_overdue]
-    
-    return {
-        'total_pending': len(pending),
-        'total_overdue': len(overdue),
-        'pending_sales': pending,
-        'overdue_sales': overdue
-    }
\ No newline at end of file
+    return get_delivery_stats('correo', **page)
@@ -0,0 +1,212 @@
+# app/services/explain_service.py
+import json
+import random
+import re
+from datetime import timedelta
+from decimal import Decimal
+from sqlalchemy import event, insert
+from app.models.customer import Customer
+from app.models.sale import Sale
+from app.extensions import db
+from app.services.time_utils import utc_now, business_date_for, today_ar
+
+
+# Tablas grandes: un scan completo sobre ellas es una regresión
+HOT_TABLES = ("sales", "customers")
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+# =========================
+#   CONSULTAS CALIENTES
+# =========================
+
+def hot_queries():
+    """
+    {nombre: función} con las consultas de servicios que deben usar índice.
+    Los imports van acá para no cargar todos los servicios al importar el módulo.
+    """
+    from app.services import sales_services, delivery_services, reports_service, fulfillment_service
+    from app.services.customers_services import search_customers
+
+    today = today_ar()
+
+    return {
+        "last_sales": lambda: sales_services.last_sales_service(10),
+        "sales_page": lambda: sales_services.get_sales_page(
+            sales_services.sales_list_query(), limit=50
+        ),
+        "explore_customer": lambda: sales_services.explore_sales({"customer": "ana"}),
+        "filter_sales_dates": lambda: sales_services.filter_sales(
+            paid="si", date_from=(today - timedelta(days=7)).isoformat()
+        ),
+        "sales_by_turn": lambda: sales_services.get_sales_by_turn(
+            *_turn_bounds()
+        ),
+        "shipping_calendar": lambda: sales_services.get_shipping_calendar(),
+        "shipments_by_day": lambda: sales_services.get_shipments_by_day(today.isoformat()),
+        "retiro_pending": delivery_services.get_retiro_pending,
+        "correo_pending": delivery_services.get_correo_pending,
+        "retiro_stats": lambda: delivery_services.get_retiro_stats(limit=50),
+        "correo_overdue": delivery_services.get_correo_overdue,
+        "changes_stats": reports_service.get_changes_stats,
+        "fulfillment_claims": lambda: fulfillment_service.get_claims(1, "retiro"),
+        "top_customers": lambda: reports_service.get_top_customers(
+            today - timedelta(days=30), today, limit=5
+        ),
+        "customer_search": lambda: search_customers("ana"),
+        "customer_by_phone": lambda: Customer.query.filter_by(phone="1100000042").first(),
+    }
+
+
+def _turn_bounds():
+    from app.services.time_utils import now_ar
+
+    end = now_ar().replace(tzinfo=None)
+    return end - timedelta(hours=8), end
+
+
+# =========================
+#   DATOS DE PRUEBA
+# =========================
+
+def seed_sample_data(customers=2000, sales=50000):
+    """
+    Inserta datos sintéticos (sin commit) para que el planner vea tablas
+    de tamaño realista. Pensado para correr dentro de una transacción que
+    después se descarta.
+    """
+    rng = random.Random(42)
+    now = utc_now()
+    first_id = (db.session.query(db.func.max(Customer.id)).scalar() or 0) + 1
+
+    db.session.execute(insert(Customer), [
+        {
+            "id": first_id + i,
+            "first_name": rng.choice(["Ana", "Juan", "Lucía", "Pedro", "María", "Sofía"]) + f" {i}",
+            "last_name": rng.choice(["Gómez", "Pérez", "López", "Díaz", "Romero"]),
+            "address": "-",
+            "city": "-",
+            "phone": f"11{first_id + i:08d}",
+            "created_at": now,
+        }
+        for i in range(customers)
+    ])
+
+    rows = []
+    for _ in range(sales):
+        created_at = now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+        delivery_type = rng.choice(["retiro", "correo", "cadeteria"])
+        delivered = rng.random() < 0.95
+        rows.append({
+            "customer_id": first_id + rng.randrange(customers),
+            "amount": Decimal(rng.randint(1000, 90000)),
+            "payment_method": rng.choice(["efectivo", "transferencia"]),
+            "paid": rng.random() < 0.9,
+            "sale_date": created_at,
+            "created_at": created_at,
+            "business_date": business_date_for(created_at),
+            "has_shipping": delivery_type == "cadeteria",
+            "shipping_date": business_date_for(created_at) if delivery_type == "cadeteria" else None,
+            "sales_channel": rng.choice(["local", "web", "instagram"]),
+            "is_cash": False,
+            "has_change": rng.random() < 0.05,
+            "delivery_type": delivery_type,
+            "delivered_at": created_at if delivered else None,
+        })
+    db.session.execute(insert(Sale), rows)
+
+    if db.session.get_bind().dialect.name == "sqlite":
+        db.session.execute(db.text("ANALYZE"))
+    else:
+        db.session.execute(db.text("ANALYZE sales"))
+        db.session.execute(db.text("ANALYZE customers"))
+
+
+# =========================
+#   PLANES
+# =========================
+
+def capture_statements(fn):
+    """Ejecuta fn y retorna los (sql, parámetros) de los SELECT que emitió"""
+    captured = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    engine = db.session.get_bind()
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    return captured
+
+
+def explain(statement, parameters):
+    """
+    Plan de una sentencia y los scans completos sobre HOT_TABLES.
+
+    Returns:
+        (líneas del plan, lista de tablas con scan completo)
+    """
+    connection = db.session.connection()
+
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + statement, parameters
+        ).fetchall()
+        lines = [row[3] for row in rows]
+        scans = [
+            m.group(1) for m in (_SQLITE_SCAN.match(line) for line in lines)
+            if m and m.group(1) in HOT_TABLES
+        ]
+        return lines, scans
+
+    # PostgreSQL: con seqscan desactivado sólo queda un Seq Scan si no hay
+    # ningún índice que sirva para la consulta
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    raw = connection.exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + statement, parameters
+    ).scalar()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+
+    lines, scans = [], []
+
+    def walk(node, depth):
+        relation = node.get("Relation Name")
+        lines.append("  " * depth + node["Node Type"] + (f" on {relation}" if relation else ""))
+        if node["Node Type"] == "Seq Scan" and relation in HOT_TABLES:
+            scans.append(relation)
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(plan, 0)
+    return lines, scans
+
+
+def check_hot_queries(names=None):
+    """
+    Corre las consultas calientes y analiza sus planes.
+
+    Returns:
+        Lista de dicts {name, sql, plan, scans} (uno por SELECT emitido)
+    """
+    queries = hot_queries()
+    results = []
+
+    for name, fn in queries.items():
+        if names and name not in names:
+            continue
+        for statement, parameters in capture_statements(fn):
+            plan, scans = explain(statement, parameters)
+            results.append({
+                "name": name,
+                "sql": statement,
+                "plan": plan,
+                "scans": scans
+            })
+
+    return results
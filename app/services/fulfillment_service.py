@@ -0,0 +1,125 @@
+# app/services/fulfillment_service.py
+from datetime import timedelta
+from sqlalchemy import select, update
+from app.models.sale import Sale, READY, CLAIMED, FULFILLMENT_QUEUES
+from app.extensions import db
+from app.services.cache_service import touch_sales
+from app.services.read_models import sale_records
+from app.services.time_utils import utc_now
+
+
+# =========================
+#   TOMA DE PEDIDOS
+# =========================
+
+def _check_queue(delivery_type):
+    if delivery_type not in FULFILLMENT_QUEUES:
+        raise ValueError("Cola inválida")
+
+
+def release_stale_claims(ttl_minutes):
+    """Devuelve a la cola los pedidos tomados hace más de ttl_minutes"""
+    result = db.session.execute(
+        update(Sale)
+        .where(
+            Sale.fulfillment_status == CLAIMED,
+            Sale.claimed_at < utc_now() - timedelta(minutes=ttl_minutes)
+        )
+        .values(fulfillment_status=READY, claimed_by=None, claimed_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def claim_next(delivery_type, count, user_id, ttl_minutes):
+    """
+    Toma los próximos `count` pedidos listos de una cola (más viejos
+    primero) para un operador, en un solo UPDATE ... RETURNING.
+
+    En PostgreSQL la subconsulta usa FOR UPDATE SKIP LOCKED: operadores
+    que toman a la vez se saltean las filas que otro está tomando en vez
+    de esperarlo, y nunca reciben el mismo pedido. SQLite serializa las
+    escrituras, así que el mismo UPDATE ya es atómico.
+
+    Returns:
+        SaleRecords tomados (puede ser menos que count o vacío)
+    """
+    _check_queue(delivery_type)
+
+    release_stale_claims(ttl_minutes)
+
+    candidates = (
+        select(Sale.id)
+        .where(Sale.fulfillment_status == READY, Sale.delivery_type == delivery_type)
+        .order_by(Sale.created_at.asc(), Sale.id.asc())
+        .limit(count)
+    )
+    if db.session.get_bind().dialect.name == 'postgresql':
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    result = db.session.execute(
+        update(Sale)
+        .where(Sale.id.in_(candidates.scalar_subquery()), Sale.fulfillment_status == READY)
+        .values(fulfillment_status=CLAIMED, claimed_by=user_id, claimed_at=utc_now())
+        .returning(Sale.id)
+        .execution_options(synchronize_session=False)
+    )
+    ids = [sale_id for (sale_id,) in result]
+
+    if ids:
+        touch_sales()
+    db.session.commit()
+
+    if not ids:
+        return []
+
+    return sale_records(
+        Sale.query
+        .filter(Sale.id.in_(ids))
+        .order_by(Sale.created_at.asc(), Sale.id.asc())
+    )
+
+
+def release_claims(delivery_type, ids, user_id):
+    """
+    Devuelve a la cola pedidos tomados por el operador.
+
+    Returns:
+        ids liberados (los que no eran suyos, de otra cola o ya no estaban
+        tomados se ignoran)
+    """
+    _check_queue(delivery_type)
+
+    result = db.session.execute(
+        update(Sale)
+        .where(
+            Sale.id.in_(ids),
+            Sale.delivery_type == delivery_type,
+            Sale.fulfillment_status == CLAIMED,
+            Sale.claimed_by == user_id
+        )
+        .values(fulfillment_status=READY, claimed_by=None, claimed_at=None)
+        .returning(Sale.id)
+        .execution_options(synchronize_session=False)
+    )
+    released = [sale_id for (sale_id,) in result]
+
+    if released:
+        touch_sales()
+    db.session.commit()
+
+    return released
+
+
+def get_claims(user_id, delivery_type=None):
+    """Pedidos que el operador tiene tomados (más viejos primero)"""
+    query = Sale.query.filter(
+        Sale.fulfillment_status == CLAIMED,
+        Sale.claimed_by == user_id
+    )
+    if delivery_type is not None:
+        _check_queue(delivery_type)
+        query = query.filter(Sale.delivery_type == delivery_type)
+
+    return sale_records(query.order_by(Sale.claimed_at.asc(), Sale.id.asc()))
+
@@ -0,0 +1,143 @@
+# app/services/http_cache.py
+import gzip
+import hashlib
+import time
+from functools import wraps
+from flask import request, current_app
+from app.services.cache_service import get_versions
+from app.services.time_utils import today_ar
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli sólo se usa gzip
+    brotli = None
+
+
+# Respuestas JSON más chicas que esto no se comprimen
+MIN_COMPRESS_SIZE = 1024
+
+# Ventana para stats que dependen del reloj (vencidos, días desde creación)
+STATS_BUCKET_SECONDS = 300
+
+# Sufijo de ETag por codificación (una representación distinta por variante)
+ENCODING_SUFFIXES = {'br': '-br', 'gzip': '-gzip'}
+
+
+# =========================
+#   ETAG / 304
+# =========================
+
+def compute_etag(version_names, bucket_seconds=None):
+    """
+    ETag fuerte a partir de las versiones de datos (no del cuerpo), así un
+    304 no necesita calcular la respuesta. Incluye endpoint, parámetros y
+    el día actual (los reportes dependen de "hoy"); bucket_seconds agrega
+    una ventana de tiempo para respuestas que cambian con el reloj
+    (vencidos, días desde creación).
+    """
+    versions = get_versions()
+    parts = [
+        request.endpoint or '',
+        request.path,
+        repr(sorted(request.args.items(multi=True))),
+        today_ar().isoformat(),
+    ]
+    parts += [f"{name}={versions.get(name, 0)}" for name in version_names]
+
+    if bucket_seconds:
+        parts.append(str(int(time.time() // bucket_seconds)))
+
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+def _matching_etag(etag):
+    """Variante del ETag (sin comprimir, -gzip, -br) que tiene el cliente, o None"""
+    for suffix in ('',) + tuple(ENCODING_SUFFIXES.values()):
+        if request.if_none_match.contains(etag + suffix):
+            return etag + suffix
+    return None
+
+
+def conditional(*version_names, bucket_seconds=None):
+    """
+    Decorador de vistas GET: responde 304 Not Modified sin ejecutar la
+    vista si el cliente ya tiene la versión vigente (If-None-Match).
+
+    Args:
+        version_names: versiones de data_versions de las que depende la respuesta
+        bucket_seconds: ventana de tiempo para respuestas dependientes del reloj
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = compute_etag(version_names, bucket_seconds)
+            client_etag = _matching_etag(etag)
+
+            if client_etag:
+                response = current_app.response_class(status=304)
+                etag = client_etag
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            # El navegador debe revalidar siempre (los datos cambian con cada venta)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# =========================
+#   COMPRESIÓN
+# =========================
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """Comprime respuestas JSON grandes con brotli (si está instalado) o gzip"""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.mimetype != 'application/json'
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=5))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=6))
+
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + ENCODING_SUFFIXES[encoding], weak=weak)
+
+    return response
+
+
+def init_http_cache(app):
+    app.after_request(compress_response)
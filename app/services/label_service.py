@@ -0,0 +1,697 @@
+# app/services/label_service.py
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from dataclasses import dataclass, astuple
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+from flask import current_app
+from pypdf import PdfReader, PdfWriter
+from reportlab.pdfgen import canvas
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.lib.colors import HexColor
+from reportlab import rl_config
+
+
+# Subir cuando cambie el diseño de las etiquetas (invalida el cache)
+LAYOUT_VERSION = 2
+
+LABEL_SIZE = (100 * mm, 150 * mm)
+
+# PDF binario: sin la capa ASCII85 (se codifica en Python puro y ocupa ~25% más)
+rl_config.useA85 = 0
+
+STATIC_IMAGES = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'images')
+)
+
+# Form XObjects compartidos por todas las etiquetas de un documento
+LOGO_FORM = 'LabelLogo'
+CONTACT_FORM = 'LabelContact'
+LOGO_FORM_SIZE = 50 * mm
+ICON_SIZE = 4 * mm
+
+# Lotes con menos etiquetas sin cachear se renderizan en el mismo proceso
+PARALLEL_MIN_LABELS = 20
+
+# Máximo de etiquetas por tarea enviada al pool
+RENDER_CHUNK_SIZE = 50
+
+
+# =========================
+#   DATOS DE LA ETIQUETA
+# =========================
+
+@dataclass(frozen=True, slots=True)
+class LabelSale:
+    """Campos de la venta que se imprimen en la etiqueta"""
+    id: int
+    delivery_type: str
+    has_change: bool
+    business_date: date
+    amount: Decimal
+    paid: bool
+    notes: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class LabelCustomer:
+    """Campos del cliente que se imprimen en la etiqueta"""
+    first_name: str
+    last_name: str
+    city: str
+    address: str
+    phone: str
+    description: str | None
+
+
+def label_digest(sale, customer):
+    """Hash del contenido de la etiqueta: datos impresos + versión del diseño"""
+    raw = repr((LAYOUT_VERSION, astuple(sale), astuple(customer)))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+# =========================
+#   DIBUJO
+# =========================
+
+def get_image_paths():
+    """Retorna paths de las imágenes"""
+    return {
+        'logo': os.path.join(STATIC_IMAGES, 'logo.png'),
+        'phone': os.path.join(STATIC_IMAGES, 'phone.png'),
+        'email': os.path.join(STATIC_IMAGES, 'mail.png')
+    }
+
+
+@lru_cache(maxsize=None)
+def load_assets():
+    """
+    Imágenes de las etiquetas, leídas y decodificadas una vez por proceso.
+    Las que faltan o no se pueden leer quedan en None.
+    """
+    assets = {}
+    for name, path in get_image_paths().items():
+        try:
+            if os.path.exists(path):
+                image = ImageReader(path)
+                image.getRGBData()
+                assets[name] = image
+            else:
+                assets[name] = None
+        except Exception as e:
+            print(f"Error cargando {path}: {e}")
+            assets[name] = None
+    return assets
+
+
+def define_logo_form(c, assets):
+    """Logo en un recuadro de LOGO_FORM_SIZE (se escala al usarlo)"""
+    c.beginForm(LOGO_FORM, 0, 0, LOGO_FORM_SIZE, LOGO_FORM_SIZE)
+    if assets['logo']:
+        c.drawImage(
+            assets['logo'],
+            0,
+            0,
+            width=LOGO_FORM_SIZE,
+            height=LOGO_FORM_SIZE,
+            preserveAspectRatio=True,
+            mask='auto'
+        )
+    c.endForm()
+
+
+def define_contact_form(c, assets):
+    """Teléfono y mail (header de cadetería); origen en el ícono del teléfono"""
+    c.beginForm(CONTACT_FORM, 0, -2*mm, 90*mm, ICON_SIZE)
+    c.saveState()
+    c.setFont("Helvetica", 8)
+    if assets['phone']:
+        c.drawImage(assets['phone'], 0, 0, width=ICON_SIZE, height=ICON_SIZE, mask='auto')
+    c.drawString(5*mm, 0, "011-32651073")
+    if assets['email']:
+        c.drawImage(assets['email'], 40*mm, 0, width=ICON_SIZE, height=ICON_SIZE, mask='auto')
+    c.drawString(45*mm, 0, "lunitavalropa@gmail.com")
+    c.restoreState()
+    c.endForm()
+
+
+FORMS = {
+    LOGO_FORM: define_logo_form,
+    CONTACT_FORM: define_contact_form,
+}
+
+
+def draw_form(c, name, x, y, scale=1):
+    """
+    Ubica un form XObject (logo, contacto) en (x, y), opcionalmente escalado.
+    El form se define la primera vez que se usa en el documento; las páginas
+    siguientes sólo lo referencian en lugar de volver a embeber las imágenes.
+    """
+    if not c.hasForm(name):
+        FORMS[name](c, load_assets())
+
+    c.saveState()
+    c.translate(x, y)
+    c.scale(scale, scale)
+    c.doForm(name)
+    c.restoreState()
+
+
+def draw_logo(c, x, y, size):
+    """Logo en un recuadro de size x size con esquina inferior izquierda en (x, y)"""
+    draw_form(c, LOGO_FORM, x, y, size / LOGO_FORM_SIZE)
+
+
+def draw_header(c, width, height, sale_id):
+    """Dibuja el header común (logo, contacto, número)"""
+    # Número de venta
+    c.setFont("Helvetica-Bold", 12)
+    c.drawCentredString(width / 2, height - 6*mm, f"VENTA Nº{sale_id}000")
+    
+    # Logo
+    draw_logo(c, (width - 50*mm)/2, height - 50*mm, 50*mm)
+    
+    # Contacto
+    draw_form(c, CONTACT_FORM, width/2 - 45*mm, height - 55*mm)
+    
+    # Línea divisoria
+    c.line(5*mm, height - 60*mm, width - 5*mm, height - 60*mm)
+
+
+def draw_change_badge(c, width, y):
+    """🔹 Dibuja badge de CAMBIO si corresponde"""
+    c.setFillColor(HexColor('#F59E0B'))
+    c.rect(5*mm, y - 10*mm, width - 10*mm, 10*mm, fill=1, stroke=0)
+    
+    c.setFillColor(HexColor('#000000'))
+    c.setFont("Helvetica-Bold", 14)
+    c.drawCentredString(width/2, y - 7*mm, "🔄 ES UN CAMBIO")
+    
+    c.setFillColor(HexColor('#000000'))
+    return y - 15*mm
+
+
+def draw_customer_info(c, customer, y_start):
+    """Dibuja información del cliente"""
+    y = y_start
+    
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(5*mm, y, "Cliente:")
+    c.setFont("Helvetica", 9)
+    c.drawString(5*mm + 25*mm, y, f"{customer.first_name} {customer.last_name}")
+    y -= 6*mm
+
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(5*mm, y, "Localidad:")
+    c.setFont("Helvetica", 9)
+    c.drawString(5*mm + 25*mm, y, f"{customer.city}")
+    y -= 6*mm
+
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(5*mm, y, "Dirección:")
+    c.setFont("Helvetica", 9)
+    c.drawString(5*mm + 25*mm, y, f"{customer.address}")
+    y -= 6*mm
+
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(5*mm, y, "Teléfono:")
+    c.setFont("Helvetica", 9)
+    c.drawString(5*mm + 25*mm, y, f"{customer.phone}")
+    y -= 6*mm
+
+    if getattr(customer, 'description', None):
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(5*mm, y, "Descripción:")
+        c.setFont("Helvetica", 9)
+        c.drawString(5*mm + 25*mm, y, f"{customer.description}")
+        y -= 6*mm
+
+    return y
+
+
+def draw_cadeteria_label(c, sale, customer, width, height):
+    """Etiqueta para CADETERÍA"""
+    draw_header(c, width, height, sale.id)
+    
+    y = height - 65*mm
+    
+    # 🔹 Badge de CAMBIO si corresponde
+    if sale.has_change:
+        y = draw_change_badge(c, width, y)
+    
+    # Info del cliente
+    y = draw_customer_info(c, customer, y)
+    
+    # Fecha
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(5*mm, y, "Fecha:")
+    c.setFont("Helvetica", 9)
+    c.drawString(5*mm + 25*mm, y, sale.business_date.strftime("%d/%m/%Y"))
+    y -= 8*mm
+
+    # Línea divisoria
+    c.line(5*mm, y, width - 5*mm, y)
+    y -= 5*mm
+
+    # Total
+    c.setFont("Helvetica-Bold", 14)
+    total_formatted = f"{sale.amount:,.0f}".replace(",", ".")
+    c.drawCentredString(width/2, y, f"Total: ${total_formatted}")
+    y -= 10*mm
+    
+    # Indicador de pago
+    if not sale.paid:
+        c.setFillColor(HexColor('#B91C1C'))
+        c.setFont("Helvetica-Bold", 12)
+        c.drawCentredString(width/2, y, "⚠️ PENDIENTE DE PAGO")
+        c.setFillColor(HexColor('#000000'))
+        y -= 8*mm
+    else:
+        y -= 5*mm
+    
+    # Recuadro de notas
+    notes_height = 25*mm
+    c.setStrokeColorRGB(0, 0, 0)
+    c.setLineWidth(1)
+    c.rect(5*mm, y - notes_height, width - 10*mm, notes_height, stroke=1, fill=0)
+
+    c.setFont("Helvetica", 9)
+    text_y = y - 4*mm
+    if sale.notes:
+        lines = sale.notes.split('\n')
+        for line in lines:
+            if text_y > (y - notes_height + 2*mm):
+                c.drawString(7*mm, text_y, line[:60])
+                text_y -= 4*mm
+
+
+def draw_retiro_label(c, sale, customer, width, height):
+    """Etiqueta para RETIRO"""
+    # Banner RETIRO
+    c.setFillColor(HexColor('#4A90E2'))
+    c.rect(0, height - 35*mm, width, 25*mm, fill=1, stroke=0)
+    
+    c.setFillColor(HexColor('#FFFFFF'))
+    c.setFont("Helvetica-Bold", 32)
+    c.drawCentredString(width/2, height - 25*mm, "RETIRO")
+    
+    c.setFont("Helvetica-Bold", 14)
+    c.drawCentredString(width/2, height - 32*mm, f"Venta #{sale.id}000")
+    
+    c.setFillColor(HexColor('#000000'))
+    
+    # Logo
+    draw_logo(c, (width - 35*mm)/2, height - 68*mm, 35*mm)
+    
+    y = height - 75*mm
+    
+    # 🔹 Badge de CAMBIO
+    if sale.has_change:
+        y = draw_change_badge(c, width, y)
+    
+    # Info cliente
+    c.setFont("Helvetica-Bold", 16)
+    c.drawCentredString(width/2, y, f"{customer.first_name} {customer.last_name}")
+    y -= 10*mm
+    
+    c.setFont("Helvetica", 12)
+    c.drawCentredString(width/2, y, f"Tel: {customer.phone}")
+    y -= 15*mm
+    
+    # Total
+    c.setFont("Helvetica-Bold", 24)
+    total_formatted = f"{sale.amount:,.0f}".replace(",", ".")
+    c.drawCentredString(width/2, y, f"$ {total_formatted}")
+    y -= 10*mm
+    
+    # Fecha
+    c.setFont("Helvetica", 10)
+    c.drawCentredString(width/2, y, f"Fecha: {sale.business_date.strftime('%d/%m/%Y')}")
+    y -= 10*mm
+    
+    # Advertencia
+    c.setFont("Helvetica-Bold", 12)
+    c.setFillColor(HexColor('#B91C1C'))
+    c.drawCentredString(width/2, y, "⚠️ Válido 15 días desde la fecha de venta")
+    c.setFillColor(HexColor('#000000'))
+    y -= 15*mm
+
+    if not sale.paid:
+        c.setFillColor(HexColor('#B91C1C'))
+        c.setFont("Helvetica-Bold", 12)
+        c.drawCentredString(width/2, y, "⚠️ PENDIENTE DE PAGO")
+        c.setFillColor(HexColor('#000000'))
+    
+    # Notas
+    if sale.notes:
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(5*mm, y, "Notas:")
+        y -= 5*mm
+        
+        c.setFont("Helvetica", 9)
+        lines = sale.notes.split('\n')
+        for line in lines[:3]:
+            c.drawString(5*mm, y, line[:80])
+            y -= 4*mm
+
+
+def draw_correo_label(c, sale, customer, width, height):
+    """Etiqueta para CORREO"""
+    # Banner CORREO
+    c.setFillColor(HexColor('#F59E0B'))
+    c.rect(0, height - 35*mm, width, 25*mm, fill=1, stroke=0)
+    
+    c.setFillColor(HexColor('#000000'))
+    c.setFont("Helvetica-Bold", 32)
+    c.drawCentredString(width/2, height - 25*mm, "CORREO")
+    
+    c.setFont("Helvetica-Bold", 14)
+    c.drawCentredString(width/2, height - 32*mm, f"Venta #{sale.id}000")
+    
+    c.setFillColor(HexColor('#000000'))
+    
+    # Logo
+    draw_logo(c, 5*mm, height - 60*mm, 25*mm)
+    
+    y = height - 70*mm
+    
+    # 🔹 Badge de CAMBIO
+    if sale.has_change:
+        y = draw_change_badge(c, width, y)
+    
+    # Dirección de envío
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(5*mm, y, "ENVIAR A:")
+    y -= 8*mm
+    
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(5*mm, y, f"{customer.first_name} {customer.last_name}")
+    y -= 8*mm
+    
+    c.setFont("Helvetica", 12)
+    c.drawString(5*mm, y, f"{customer.address}")
+    y -= 6*mm
+    
+    c.drawString(5*mm, y, f"{customer.city}")
+    y -= 6*mm
+    
+    c.drawString(5*mm, y, f"Tel: {customer.phone}")
+    y -= 12*mm
+    
+    # Total
+    c.setFont("Helvetica-Bold", 18)
+    total_formatted = f"{sale.amount:,.0f}".replace(",", ".")
+    c.drawString(5*mm, y, f"Total: $ {total_formatted}")
+    y -= 8*mm
+    
+    # Indicador de pago
+    if not sale.paid:
+        c.setFillColor(HexColor('#B91C1C'))
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(5*mm, y, "⚠️ PENDIENTE DE PAGO")
+        c.setFillColor(HexColor('#000000'))
+        y -= 8*mm
+    
+    # Fecha
+    c.setFont("Helvetica", 10)
+    c.drawString(5*mm, y, f"Fecha: {sale.business_date.strftime('%d/%m/%Y')}")
+    y -= 12*mm
+    
+    # Recuadro de descripción
+    c.setStrokeColorRGB(0, 0, 0)
+    c.setLineWidth(1)
+    c.rect(5*mm, y - 20*mm, width - 10*mm, 20*mm, stroke=1, fill=0)
+    
+    c.setFont("Helvetica-Bold", 9)
+    c.drawString(7*mm, y - 4*mm, "Descripción / Notas:")
+    
+    if sale.notes:
+        c.setFont("Helvetica", 8)
+        text_y = y - 8*mm
+        lines = sale.notes.split('\n')
+        for line in lines[:2]:
+            c.drawString(7*mm, text_y, line[:70])
+            text_y -= 4*mm
+
+
+def draw_label(c, sale, customer, width, height):
+    """Dibuja la etiqueta según tipo de entrega"""
+    if sale.delivery_type == 'retiro':
+        draw_retiro_label(c, sale, customer, width, height)
+    elif sale.delivery_type == 'correo':
+        draw_correo_label(c, sale, customer, width, height)
+    else:
+        draw_cadeteria_label(c, sale, customer, width, height)
+
+
+def render_label(sale, customer):
+    """PDF de una página con la etiqueta (bytes)"""
+    buffer = BytesIO()
+    width, height = LABEL_SIZE
+    c = canvas.Canvas(buffer, pagesize=LABEL_SIZE)
+
+    draw_label(c, sale, customer, width, height)
+
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+# =========================
+#   CACHE DE ETIQUETAS
+# =========================
+
+class LabelCache:
+    """
+    Cache LRU en memoria (por proceso) de etiquetas renderizadas.
+
+    La clave es (id de venta, hash del contenido): si cambia cualquier dato
+    impreso o LAYOUT_VERSION la etiqueta se vuelve a renderizar. Se guarda
+    sólo la última versión de cada venta.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._digests = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, sale_id, digest):
+        with self._lock:
+            data = self._entries.get((sale_id, digest))
+            if data is not None:
+                self._entries.move_to_end((sale_id, digest))
+            return data
+
+    def set(self, sale_id, digest, data):
+        with self._lock:
+            # Versión anterior de la misma venta: ya no sirve
+            old_digest = self._digests.get(sale_id)
+            if old_digest is not None:
+                self._drop((sale_id, old_digest))
+
+            self._entries[(sale_id, digest)] = data
+            self._digests[sale_id] = digest
+            self._size += len(data)
+
+            while self._size > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        data = self._entries.pop(key, None)
+        if data is not None:
+            self._size -= len(data)
+            if self._digests.get(key[0]) == key[1]:
+                del self._digests[key[0]]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+            self._size = 0
+
+
+label_cache = LabelCache()
+
+
+def get_label_pdf(sale, customer):
+    """PDF de una etiqueta, desde cache o renderizado"""
+    digest = label_digest(sale, customer)
+    data = label_cache.get(sale.id, digest)
+
+    if data is None:
+        data = render_label(sale, customer)
+        label_cache.set(sale.id, digest, data)
+
+    return data
+
+
+def _xobjects(page):
+    """Diccionario /XObject de los recursos de una página (o None)"""
+    resources = page.get('/Resources')
+    if resources is None:
+        return None
+    xobjects = resources.get_object().get('/XObject')
+    return xobjects.get_object() if xobjects is not None else None
+
+
+def write_merged_pdf(documents, output):
+    """
+    Une PDFs (bytes) en orden en un solo documento y lo escribe en output
+    (archivo binario abierto).
+
+    Todas las páginas referencian la misma copia de cada form XObject: los
+    nombres de los forms son fijos (LabelLogo, LabelContact) y los de las
+    imágenes que genera ReportLab son el hash de su contenido, así que mismo
+    nombre = mismo objeto. Las copias de los documentos siguientes ni
+    siquiera se copian, por lo que el logo y los íconos quedan embebidos una
+    sola vez.
+    """
+    writer = PdfWriter()
+    shared = {}
+
+    for data in documents:
+        for page in PdfReader(BytesIO(data)).pages:
+            xobjects = _xobjects(page)
+            reused = []
+            if xobjects is not None:
+                for name in list(xobjects.keys()):
+                    if name in shared:
+                        del xobjects[name]
+                        reused.append(name)
+
+            added = writer.add_page(page)
+
+            xobjects = _xobjects(added)
+            if xobjects is None:
+                continue
+            for name in xobjects.keys():
+                shared.setdefault(name, xobjects.raw_get(name))
+            for name in reused:
+                xobjects[name] = shared[name]
+
+    writer.write(output)
+
+
+def merge_pdfs(documents):
+    """Como write_merged_pdf, pero devuelve el PDF como bytes"""
+    output = BytesIO()
+    write_merged_pdf(documents, output)
+    return output.getvalue()
+
+
+# =========================
+#   RENDER EN PARALELO
+# =========================
+
+_pool = None
+_pool_processes = 0
+_pool_lock = threading.Lock()
+
+
+def _mp_context():
+    """
+    forkserver donde existe (Linux), si no spawn. Nunca fork: el worker de
+    gunicorn tiene hilos y conexiones abiertas que no deben copiarse.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def get_render_pool(processes):
+    """Pool de procesos de render (uno por proceso de la app, creado al primer uso)"""
+    global _pool, _pool_processes
+
+    with _pool_lock:
+        if _pool is None or _pool_processes != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=_mp_context(),
+                initializer=load_assets
+            )
+            _pool_processes = processes
+        return _pool
+
+
+def shutdown_render_pool():
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def render_chunk(labels):
+    """Tarea del pool: una página PDF (bytes) por etiqueta, en orden"""
+    return [render_label(sale, customer) for sale, customer in labels]
+
+
+def render_labels(labels, processes=0):
+    """
+    Renderiza las etiquetas (una página por etiqueta, en orden).
+    Con processes > 1 y suficientes etiquetas reparte el trabajo en chunks
+    entre procesos, así un lote grande no ocupa el GIL del worker web.
+    """
+    if processes < 2 or len(labels) < PARALLEL_MIN_LABELS:
+        return render_chunk(labels)
+
+    chunk_size = min(RENDER_CHUNK_SIZE, -(-len(labels) // processes))
+    chunks = [labels[i:i + chunk_size] for i in range(0, len(labels), chunk_size)]
+
+    try:
+        results = get_render_pool(processes).map(render_chunk, chunks)
+        return [page for chunk in results for page in chunk]
+    except BrokenProcessPool as e:
+        # Un proceso del pool murió: se recrea en el próximo lote
+        current_app.logger.warning("Pool de etiquetas caído, render en serie: %s", e)
+        shutdown_render_pool()
+        return render_chunk(labels)
+
+
+def label_pages(labels, processes=0):
+    """
+    Una página PDF (bytes) por etiqueta, en orden: las cacheadas se reusan
+    y el resto se renderiza (en paralelo si processes > 1) y se cachea.
+    """
+    digests = [label_digest(sale, customer) for sale, customer in labels]
+    pages = [
+        label_cache.get(sale.id, digest)
+        for (sale, _), digest in zip(labels, digests)
+    ]
+
+    missing = [i for i, page in enumerate(pages) if page is None]
+    rendered = render_labels([labels[i] for i in missing], processes)
+
+    for i, data in zip(missing, rendered):
+        pages[i] = data
+        label_cache.set(labels[i][0].id, digests[i], data)
+
+    return pages
+
+
+def build_labels_pdf(labels, processes=0):
+    """
+    PDF con una etiqueta por página.
+
+    Args:
+        labels: lista de (LabelSale, LabelCustomer) en el orden de impresión
+        processes: procesos para renderizar las etiquetas que no están en cache
+    """
+    return merge_pdfs(label_pages(labels, processes))
+
+
+def write_labels_pdf(labels, output, processes=0):
+    """Como build_labels_pdf, pero escribe el PDF en output (archivo binario)"""
+    write_merged_pdf(label_pages(labels, processes), output)
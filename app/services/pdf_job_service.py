@@ -0,0 +1,407 @@
+# app/services/pdf_job_service.py
+import os
+import socket
+import threading
+import time
+from datetime import date, timedelta
+from sqlalchemy import update, delete, or_, and_, select, func, literal, union_all
+from app.extensions import db
+from app.models.pdf_job import PdfJob
+from app.models.sale import Sale
+from app.services.label_service import label_pages, merge_pdfs
+from app.services.read_models import label_records, release_connection
+from app.services.time_utils import utc_now
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Etiquetas por tramo: el progreso se guarda al terminar cada uno
+PROGRESS_CHUNK = 50
+
+# Tramos en que se lee de la base el PDF de un trabajo terminado
+RESULT_CHUNK_BYTES = 1024 * 1024
+
+# Intentos antes de marcar como fallido un trabajo que quedó colgado
+MAX_ATTEMPTS = 3
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+# =========================
+#   ALTA Y CONSULTA
+# =========================
+
+def _parse_date(value, field):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} inválida")
+
+
+def parse_label_job_params(data, max_labels):
+    """
+    Valida el pedido de un lote de etiquetas. Uno de:
+        {"ids": [1, 2, ...]}
+        {"shipping_date": "YYYY-MM-DD"}                    (cadetería del día)
+        {"date_from": "...", "date_to": "...", "delivery_type": opcional}
+
+    Returns:
+        params normalizados (JSON) para guardar en el trabajo
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Datos inválidos")
+
+    if data.get('ids') is not None:
+        ids = data['ids']
+        if isinstance(ids, str):
+            ids = ids.split(',')
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            raise ValueError("IDs inválidos")
+        if not ids:
+            raise ValueError("No se proporcionaron IDs")
+        if len(ids) > max_labels:
+            raise ValueError(f"Máximo {max_labels} etiquetas por trabajo")
+        return {'ids': ids}
+
+    if data.get('shipping_date'):
+        return {'shipping_date': _parse_date(data['shipping_date'], "Fecha de envío").isoformat()}
+
+    if data.get('date_from') or data.get('date_to'):
+        date_from = _parse_date(data.get('date_from'), "Fecha desde")
+        date_to = _parse_date(data.get('date_to'), "Fecha hasta")
+        if date_from > date_to:
+            raise ValueError("Rango de fechas inválido")
+
+        params = {'date_from': date_from.isoformat(), 'date_to': date_to.isoformat()}
+        if data.get('delivery_type'):
+            if data['delivery_type'] not in ('cadeteria', 'retiro', 'correo'):
+                raise ValueError("Tipo de entrega inválido")
+            params['delivery_type'] = data['delivery_type']
+        return params
+
+    raise ValueError("Indicar ids, shipping_date o date_from/date_to")
+
+
+def label_sales_query(params):
+    """
+    Query de las ventas de un lote de etiquetas (mismos params que
+    parse_label_job_params), en el orden de impresión. La usan los
+    trabajos y las descargas directas.
+    """
+    query = Sale.query
+
+    if 'ids' in params:
+        return query.filter(Sale.id.in_(params['ids'])).order_by(Sale.id.asc())
+
+    if 'shipping_date' in params:
+        return query.filter(
+            Sale.delivery_type == 'cadeteria',
+            Sale.has_shipping.is_(True),
+            Sale.shipping_date == date.fromisoformat(params['shipping_date'])
+        ).order_by(Sale.id.asc())
+
+    query = query.filter(
+        Sale.business_date >= date.fromisoformat(params['date_from']),
+        Sale.business_date <= date.fromisoformat(params['date_to'])
+    )
+    if 'delivery_type' in params:
+        query = query.filter(Sale.delivery_type == params['delivery_type'])
+    return query.order_by(Sale.created_at.asc(), Sale.id.asc())
+
+
+def result_name_for(params):
+    if 'shipping_date' in params:
+        return f"etiquetas_{params['shipping_date']}.pdf"
+    if 'date_from' in params:
+        return f"etiquetas_{params['date_from']}_{params['date_to']}.pdf"
+    return f"etiquetas_lote_{len(params['ids'])}.pdf"
+
+
+def create_label_job(params, user_id=None):
+    job = PdfJob(
+        kind='labels',
+        status=PENDING,
+        params=params,
+        result_name=result_name_for(params),
+        created_by=user_id
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def get_job(job_id):
+    return db.session.get(PdfJob, job_id)
+
+
+def copy_job_result(job, output):
+    """
+    Copia el PDF de un trabajo terminado a output (archivo binario) en
+    tramos de RESULT_CHUNK_BYTES. Es una sola consulta (un tramo por fila)
+    que se lee fila a fila, así el PDF completo nunca está en memoria.
+    """
+    chunks = [
+        select(
+            literal(start).label('start'),
+            func.substr(PdfJob.result, start + 1, RESULT_CHUNK_BYTES).label('chunk')
+        ).where(PdfJob.id == job.id)
+        for start in range(0, job.result_size or 0, RESULT_CHUNK_BYTES)
+    ]
+    if not chunks:
+        return
+
+    stmt = union_all(*chunks) if len(chunks) > 1 else chunks[0]
+    rows = db.session.execute(stmt.execution_options(stream_results=True, max_row_buffer=1))
+    for start, chunk in rows:
+        # El orden de las filas no está garantizado: cada tramo va a su lugar
+        output.seek(start)
+        output.write(chunk)
+
+
+# =========================
+#   WORKER
+# =========================
+
+def claim_next_job(worker, stale_seconds):
+    """
+    Toma el próximo trabajo pendiente (o uno colgado: running sin avance
+    hace más de stale_seconds). El UPDATE sólo afecta la fila si sigue en
+    el estado leído, así que si otro worker la tomó antes se prueba con la
+    siguiente.
+
+    Returns:
+        id del trabajo tomado o None
+    """
+    now = utc_now()
+    claimable = or_(
+        PdfJob.status == PENDING,
+        and_(PdfJob.status == RUNNING, PdfJob.updated_at < now - timedelta(seconds=stale_seconds))
+    )
+
+    candidates = (
+        db.session.query(PdfJob.id)
+        .filter(claimable)
+        .order_by(PdfJob.created_at.asc(), PdfJob.id.asc())
+        .limit(5)
+        .all()
+    )
+
+    for (job_id,) in candidates:
+        result = db.session.execute(
+            update(PdfJob)
+            .where(PdfJob.id == job_id, claimable)
+            .values(
+                status=RUNNING,
+                worker=worker,
+                attempts=PdfJob.attempts + 1,
+                started_at=now,
+                updated_at=now,
+                progress=0,
+                error=None
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        if result.rowcount == 1:
+            return job_id
+
+    return None
+
+
+def _set_job(job_id, attempt, **values):
+    """
+    Actualiza el trabajo con su propia transacción (también sirve de
+    heartbeat). Sólo escribe si el trabajo sigue en el intento `attempt`:
+    si se lo dio por colgado y otro worker lo volvió a tomar, este ya no
+    lo pisa.
+
+    Returns:
+        True si el trabajo sigue siendo de este intento
+    """
+    values.setdefault('updated_at', utc_now())
+    result = db.session.execute(
+        update(PdfJob)
+        .where(PdfJob.id == job_id, PdfJob.attempts == attempt)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def run_job(job_id, processes=0):
+    """Genera el PDF de un trabajo ya tomado y lo guarda en result"""
+    job = get_job(job_id)
+    attempt = job.attempts
+
+    if attempt > MAX_ATTEMPTS:
+        _set_job(job_id, attempt, status=FAILED, error="Demasiados intentos", finished_at=utc_now())
+        return
+
+    try:
+        params = job.params
+        labels = [
+            (sale, customer)
+            for sale, customer in label_records(label_sales_query(params))
+            if customer
+        ]
+        # Fin de la lectura: no se retiene la conexión mientras se renderiza
+        release_connection()
+
+        if not labels:
+            _set_job(job_id, attempt, status=FAILED, error="No se encontraron ventas", finished_at=utc_now())
+            return
+
+        if not _set_job(job_id, attempt, total=len(labels)):
+            return
+
+        pages = []
+        for start in range(0, len(labels), PROGRESS_CHUNK):
+            pages += label_pages(labels[start:start + PROGRESS_CHUNK], processes)
+            # Otro worker lo retomó: se abandona sin escribir el resultado
+            if not _set_job(job_id, attempt, progress=len(pages)):
+                return
+
+        pdf = merge_pdfs(pages)
+        _set_job(
+            job_id,
+            attempt,
+            status=DONE,
+            result=pdf,
+            result_size=len(pdf),
+            finished_at=utc_now()
+        )
+    except Exception as e:
+        db.session.rollback()
+        _set_job(job_id, attempt, status=FAILED, error=str(e) or e.__class__.__name__, finished_at=utc_now())
+        raise
+
+
+def purge_jobs(max_age_hours):
+    """Borra trabajos terminados (y su PDF) con más de max_age_hours"""
+    result = db.session.execute(
+        delete(PdfJob)
+        .where(
+            PdfJob.status.in_((DONE, FAILED)),
+            PdfJob.finished_at < utc_now() - timedelta(hours=max_age_hours)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def work_once(app, worker=None):
+    """
+    Procesa un trabajo si hay alguno pendiente.
+
+    Returns:
+        True si procesó uno
+    """
+    config = app.config
+    worker = worker or worker_name()
+
+    try:
+        job_id = claim_next_job(worker, config['PDF_JOB_STALE_SECONDS'])
+        if job_id is None:
+            return False
+
+        try:
+            run_job(job_id, config['LABEL_RENDER_PROCESSES'])
+        except Exception:
+            app.logger.exception("Trabajo PDF %s falló", job_id)
+        return True
+    finally:
+        db.session.remove()
+
+
+def run_worker(app, stop_event=None, wake_event=None):
+    """
+    Loop del worker: procesa trabajos mientras haya y si no espera
+    PDF_JOB_POLL_SECONDS (o a que wake_event avise de uno nuevo).
+    Una vez por hora purga los trabajos viejos.
+    """
+    stop_event = stop_event or threading.Event()
+    wake_event = wake_event or threading.Event()
+    worker = worker_name()
+    last_purge = 0
+
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                worked = work_once(app, worker)
+
+                if time.monotonic() - last_purge > 3600:
+                    purge_jobs(app.config['PDF_JOB_RETENTION_HOURS'])
+                    last_purge = time.monotonic()
+            except Exception:
+                # Base caída, etc.: se reintenta en el próximo ciclo
+                app.logger.exception("Error en el worker de PDF")
+                db.session.remove()
+                worked = False
+
+        if not worked:
+            wake_event.wait(app.config['PDF_JOB_POLL_SECONDS'])
+            wake_event.clear()
+
+
+# =========================
+#   HILO DENTRO DE LA APP
+# =========================
+
+_thread = None
+_wake = threading.Event()
+_thread_lock = threading.Lock()
+
+
+def ensure_worker(app):
+    """Arranca el hilo worker de este proceso si no está corriendo"""
+    global _thread
+
+    if _thread is not None and _thread.is_alive():
+        return
+
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(
+                target=run_worker,
+                args=(app,),
+                kwargs={'wake_event': _wake},
+                name="pdf-jobs-worker",
+                daemon=True
+            )
+            _thread.start()
+
+
+def notify_worker(app):
+    """
+    Avisa que hay un trabajo nuevo. Con PDF_JOBS_WORKER='thread' lo
+    procesa el hilo worker de este proceso; con 'external' los procesa
+    `flask pdf-jobs worker`.
+    """
+    if app.config['PDF_JOBS_WORKER'] != 'thread':
+        return
+
+    ensure_worker(app)
+    _wake.set()
+
+
+def init_pdf_jobs(app):
+    """
+    Con PDF_JOBS_WORKER='thread' el hilo worker arranca con el primer
+    request del proceso (no en los comandos CLI), así los trabajos que
+    quedaron pendientes o colgados de antes de un reinicio se retoman sin
+    esperar a que alguien pida uno nuevo.
+    """
+    if app.config['PDF_JOBS_WORKER'] != 'thread':
+        return
+
+    app.before_request(lambda: ensure_worker(app))
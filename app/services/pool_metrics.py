@@ -0,0 +1,76 @@
+# app/services/pool_metrics.py
+import threading
+import time
+from flask import request, current_app, has_app_context, has_request_context
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+
+# Retener una conexión más que esto se loguea como warning
+DEFAULT_HOLD_WARN_SECONDS = 1.0
+
+# Dueño de las conexiones tomadas fuera de un request (worker de PDF, CLI)
+BACKGROUND = '(background)'
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _on_checkout(dbapi_connection, record, proxy):
+    record.info['checked_out_at'] = time.perf_counter()
+    record.info['held_by'] = request.endpoint if has_request_context() else BACKGROUND
+
+
+def _on_checkin(dbapi_connection, record):
+    start = record.info.pop('checked_out_at', None)
+    if start is None:
+        return
+
+    held = time.perf_counter() - start
+    owner = record.info.pop('held_by', BACKGROUND)
+
+    with _stats_lock:
+        stats = _stats.setdefault(owner, {'checkouts': 0, 'total': 0.0, 'max': 0.0})
+        stats['checkouts'] += 1
+        stats['total'] += held
+        stats['max'] = max(stats['max'], held)
+
+    # El checkin de un request ocurre en el teardown (sigue el app context)
+    if has_app_context():
+        limit = current_app.config.get('POOL_HOLD_WARN_SECONDS', DEFAULT_HOLD_WARN_SECONDS)
+        if held > limit:
+            current_app.logger.warning("Conexión retenida %.2fs por %s", held, owner)
+
+
+def hold_stats():
+    """
+    Tiempo que cada endpoint retuvo conexiones del pool (desde el checkout
+    hasta el checkin), acumulado en este proceso.
+
+    Returns:
+        {endpoint: {'checkouts', 'total', 'max', 'avg'}} (segundos)
+    """
+    with _stats_lock:
+        return {
+            owner: {**stats, 'avg': stats['total'] / stats['checkouts']}
+            for owner, stats in _stats.items()
+        }
+
+
+def reset_hold_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def init_pool_metrics(app):
+    """
+    Mide cuánto retiene cada request su conexión del pool (eventos
+    checkout/checkin). Retenciones mayores a POOL_HOLD_WARN_SECONDS se
+    loguean: un handler que trabaja sin soltar la conexión puede agotar el
+    pool y frenar las escrituras del POS.
+    """
+    app.config.setdefault('POOL_HOLD_WARN_SECONDS', DEFAULT_HOLD_WARN_SECONDS)
+
+    if not event.contains(Pool, 'checkout', _on_checkout):
+        event.listen(Pool, 'checkout', _on_checkout)
+        event.listen(Pool, 'checkin', _on_checkin)
@@ -0,0 +1,64 @@
+# app/services/query_budget.py
+from flask import g, request, current_app, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Presupuesto para endpoints sin @query_budget
+DEFAULT_QUERY_BUDGET = 25
+
+
+class QueryBudgetExceeded(Exception):
+    """Un request ejecutó más consultas SQL que su presupuesto"""
+
+
+def query_budget(max_queries):
+    """
+    Decorador de vistas: máximo de consultas SQL por request.
+    Incluye la carga del usuario de Flask-Login y la de versiones de datos.
+    """
+    def decorator(view):
+        # functools.wraps (login_required) copia el atributo al wrapper
+        view.query_budget = max_queries
+        return view
+
+    return decorator
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g._query_count = g.get('_query_count', 0) + 1
+
+
+def _reset_count():
+    g._query_count = 0
+
+
+def _check_budget(response):
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', current_app.config['QUERY_BUDGET_DEFAULT'])
+    count = g.get('_query_count', 0)
+
+    if count > budget:
+        message = f"{request.method} {request.path} ({request.endpoint}): {count} consultas, presupuesto {budget}"
+
+        if current_app.config.get('TESTING') or current_app.config.get('QUERY_BUDGET_STRICT'):
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning("Presupuesto de consultas excedido: %s", message)
+
+    return response
+
+
+def init_query_budget(app):
+    """
+    Cuenta las consultas SQL de cada request (evento before_cursor_execute)
+    y las compara con el presupuesto del endpoint: en tests (TESTING) un
+    exceso lanza QueryBudgetExceeded, en producción se loguea.
+    """
+    app.config.setdefault('QUERY_BUDGET_DEFAULT', DEFAULT_QUERY_BUDGET)
+
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+
+    app.before_request(_reset_count)
+    app.after_request(_check_budget)
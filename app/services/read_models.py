@@ -0,0 +1,190 @@
+# app/services/read_models.py
+from dataclasses import dataclass
+from datetime import datetime, date
+from decimal import Decimal
+from app.models.sale import Sale, overdue_cutoff
+from app.models.customer import Customer
+from app.extensions import db
+from app.services.label_service import LabelSale, LabelCustomer
+
+
+# =========================
+#   VENTA (LECTURA)
+# =========================
+
+@dataclass(slots=True)
+class SaleRecord:
+    """
+    Venta para listados JSON: sólo las columnas que se serializan, leídas
+    como tuplas (sin objetos ORM ni identity map).
+    """
+    id: int
+    customer_id: int | None
+    customer_first_name: str | None
+    customer_last_name: str | None
+    customer_address: str | None
+    customer_city: str | None
+    customer_phone: str | None
+    sale_date: datetime | None
+    created_at: datetime | None
+    business_date: date | None
+    amount: Decimal
+    payment_method: str
+    paid: bool
+    notes: str | None
+    has_shipping: bool
+    shipping_date: date | None
+    sales_channel: str
+    is_cash: bool
+    has_change: bool
+    delivery_type: str
+    completed_at: datetime | None
+    delivered_at: datetime | None
+    shipped_at: datetime | None
+    fulfillment_status: str
+    claimed_by: int | None
+
+    @property
+    def is_delivered(self):
+        return self.delivered_at is not None
+
+    def days_since_creation(self, now):
+        """Días desde que se creó la venta (now: naive UTC)"""
+        if not self.created_at:
+            return 0
+        return (now - self.created_at).days
+
+    def is_overdue(self, now):
+        """Misma regla que Sale.is_overdue_at(now)"""
+        if self.delivered_at is not None or self.created_at is None:
+            return False
+
+        cutoff = overdue_cutoff(self.delivery_type, now)
+        return cutoff is not None and self.created_at <= cutoff
+
+
+# Mismo orden que los campos de SaleRecord
+SALE_RECORD_COLUMNS = (
+    Sale.id,
+    Customer.id,
+    Customer.first_name,
+    Customer.last_name,
+    Customer.address,
+    Customer.city,
+    Customer.phone,
+    Sale.sale_date,
+    Sale.created_at,
+    Sale.business_date,
+    Sale.amount,
+    Sale.payment_method,
+    Sale.paid,
+    Sale.notes,
+    Sale.has_shipping,
+    Sale.shipping_date,
+    Sale.sales_channel,
+    Sale.is_cash,
+    Sale.has_change,
+    Sale.delivery_type,
+    Sale.completed_at,
+    Sale.delivered_at,
+    Sale.shipped_at,
+    Sale.fulfillment_status,
+    Sale.claimed_by,
+)
+
+
+def project_sales(query):
+    """
+    Convierte una query de Sale (filtros y orden, sin limit) en la
+    proyección de columnas de SaleRecord, con el cliente en el mismo SELECT.
+    """
+    return (
+        query
+        .outerjoin(Customer, Sale.customer_id == Customer.id)
+        .with_entities(*SALE_RECORD_COLUMNS)
+    )
+
+
+def fetch_sale_records(query):
+    """Lista de SaleRecord para una query ya proyectada (ver project_sales)"""
+    return [SaleRecord(*row) for row in db.session.execute(query.statement)]
+
+
+def sale_records(query):
+    """Atajo: proyecta y trae la query completa"""
+    return fetch_sale_records(project_sales(query))
+
+
+def iter_sale_records(query, batch_size=500):
+    """Recorre la proyección en lotes (yield_per) sin cargarla completa"""
+    statement = project_sales(query).statement.execution_options(yield_per=batch_size)
+    for row in db.session.execute(statement):
+        yield SaleRecord(*row)
+
+
+# =========================
+#   ETIQUETAS (LECTURA)
+# =========================
+
+LABEL_SALE_COLUMNS = (
+    Sale.id,
+    Sale.delivery_type,
+    Sale.has_change,
+    Sale.business_date,
+    Sale.amount,
+    Sale.paid,
+    Sale.notes,
+)
+
+LABEL_CUSTOMER_COLUMNS = (
+    Customer.id,
+    Customer.first_name,
+    Customer.last_name,
+    Customer.city,
+    Customer.address,
+    Customer.phone,
+    Customer.description,
+)
+
+
+def label_records(query):
+    """
+    (LabelSale, LabelCustomer) de cada venta de una query de Sale, en un
+    solo SELECT de columnas. LabelCustomer es None si la venta no tiene
+    cliente.
+    """
+    statement = (
+        query
+        .outerjoin(Customer, Sale.customer_id == Customer.id)
+        .with_entities(*LABEL_SALE_COLUMNS, *LABEL_CUSTOMER_COLUMNS)
+        .statement
+    )
+
+    records = []
+    for (
+        sale_id, delivery_type, has_change, business_date, amount, paid, notes,
+        customer_id, *customer
+    ) in db.session.execute(statement):
+        records.append((
+            LabelSale(
+                id=sale_id,
+                delivery_type=delivery_type,
+                has_change=bool(has_change),
+                business_date=business_date,
+                amount=amount,
+                paid=bool(paid),
+                notes=notes
+            ),
+            LabelCustomer(*customer) if customer_id is not None else None
+        ))
+
+    return records
+
+
+def release_connection():
+    """
+    Termina la transacción de lectura y devuelve la conexión al pool.
+    Llamarla antes de trabajo largo que ya no usa la base (render de PDFs):
+    los objetos cargados quedan desvinculados de la sesión.
+    """
+    db.session.close()
@@ -1,10 +1,22 @@
 # app/services/reports_service.py
-from datetime import datetime, timedelta
-from sqlalchemy import func, extract
-from app.models.sale import Sale
+from datetime import timedelta
+from sqlalchemy import func, extract, case, and_
+from app.models.sale import Sale, change_overdue_cutoff
 from app.models.customer import Customer
+from app.models.sales_daily_rollup import SalesDailyRollup as Rollup
 from app.extensions import db
-from app.services.sales_services import now_ar, today_ar
+from app.services.sales_services import today_ar, get_backlog_list, BACKLOG_PAGE_SIZE
+from app.services.time_utils import utc_now, request_now
+from app.services.aggregation_service import (
+    aggregate_sales,
+    row_to_summary,
+    summarize_periods,
+    summarize_periods_with_breakdowns
+)
+from app.services.timeseries_service import time_series
+from app.services.cache_service import report_cache, cache_key, touch_sales, MISSING
+from app.services.transition_service import apply_transition, outcomes
+from app.services.delivery_services import done_values
 
 
 def get_date_range(period='month'):
@@ -28,50 +40,14 @@ def get_date_range(period='month'):
 
 def get_sales_summary(start_date=None, end_date=None):
     """
-    Resumen general de ventas
+    Resumen general de ventas (una sola consulta)
     """
     if not start_date:
         start_date = today_ar().replace(day=1)  # Primer día del mes
     if not end_date:
         end_date = today_ar()
     
-    query = Sale.query.filter(
-        Sale.created_at >= datetime.combine(start_date, datetime.min.time()),
-        Sale.created_at <= datetime.combine(end_date, datetime.max.time())
-    )
-    
-    total_sales = query.count()
-    total_amount = db.session.query(func.sum(Sale.amount)).filter(
-        Sale.created_at >= datetime.combine(start_date, datetime.min.time()),
-        Sale.created_at <= datetime.combine(end_date, datetime.max.time())
-    ).scalar() or 0
-    
-    paid_sales = query.filter(Sale.paid == True).count()
-    unpaid_sales = query.filter(Sale.paid == False).count()
-    
-    paid_amount = db.session.query(func.sum(Sale.amount)).filter(
-        Sale.created_at >= datetime.combine(start_date, datetime.min.time()),
-        Sale.created_at <= datetime.combine(end_date, datetime.max.time()),
-        Sale.paid == True
-    ).scalar() or 0
-    
-    unpaid_amount = db.session.query(func.sum(Sale.amount)).filter(
-        Sale.created_at >= datetime.combine(start_date, datetime.min.time()),
-        Sale.created_at <= datetime.combine(end_date, datetime.max.time()),
-        Sale.paid == False
-    ).scalar() or 0
-    
-    avg_ticket = total_amount / total_sales if total_sales > 0 else 0
-    
-    return {
-        'total_sales': total_sales,
-        'total_amount': float(total_amount),
-        'paid_sales': paid_sales,
-        'paid_amount': float(paid_amount),
-        'unpaid_sales': unpaid_sales,
-        'unpaid_amount': float(unpaid_amount),
-        'avg_ticket': float(avg_ticket)
-    }
+    return row_to_summary(aggregate_sales(start_date, end_date))
 
 
 def get_sales_by_channel(start_date=None, end_date=None):
@@ -81,25 +57,13 @@ def get_sales_by_channel(start_date=None, end_date=None):
     if not end_date:
         end_date = today_ar()
     
-    results = (
-        db.session.query(
-            Sale.sales_channel,
-            func.count(Sale.id).label('count'),
-            func.sum(Sale.amount).label('total')
-        )
-        .filter(
-            Sale.created_at >= datetime.combine(start_date, datetime.min.time()),
-            Sale.created_at <= datetime.combine(end_date, datetime.max.time())
-        )
-        .group_by(Sale.sales_channel)
-        .all()
-    )
+    results = aggregate_sales(start_date, end_date, group_by=Rollup.sales_channel)
     
     return [
         {
             'channel': r.sales_channel,
-            'count': r.count,
-            'total': float(r.total or 0)
+            'count': r.total_sales,
+            'total': float(r.total_amount or 0)
         }
         for r in results
     ]
@@ -112,25 +76,13 @@ def get_sales_by_delivery_type(start_date=None, end_date=None):
     if not end_date:
         end_date = today_ar()
     
-    results = (
-        db.session.query(
-            Sale.delivery_type,
-            func.count(Sale.id).label('count'),
-            func.sum(Sale.amount).label('total')
-        )
-        .filter(
-            Sale.created_at >= datetime.combine(start_date, datetime.min.time()),
-            Sale.created_at <= datetime.combine(end_date, datetime.max.time())
-        )
-        .group_by(Sale.delivery_type)
-        .all()
-    )
+    results = aggregate_sales(start_date, end_date, group_by=Rollup.delivery_type)
     
     return [
         {
             'type': r.delivery_type,
-            'count': r.count,
-            'total': float(r.total or 0)
+            'count': r.total_sales,
+            'total': float(r.total_amount or 0)
         }
         for r in results
     ]
@@ -143,28 +95,21 @@ def get_daily_sales(start_date=None, end_date=None):
     if not end_date:
         end_date = today_ar()
     
-    results = (
-        db.session.query(
-            func.date(Sale.created_at).label('date'),
-            func.count(Sale.id).label('count'),
-            func.sum(Sale.amount).label('total')
-        )
-        .filter(
-            Sale.created_at >= datetime.combine(start_date, datetime.min.time()),
-            Sale.created_at <= datetime.combine(end_date, datetime.max.time())
-        )
-        .group_by(func.date(Sale.created_at))
-        .order_by(func.date(Sale.created_at))
-        .all()
+    series = time_series(
+        {
+            'count': func.sum(Rollup.sale_count),
+            'total': func.sum(Rollup.total_amount)
+        },
+        start_date, end_date, grain='day'
     )
     
     return [
         {
-            'date': r.date.isoformat(),
-            'count': r.count,
-            'total': float(r.total or 0)
+            'date': p['bucket'].isoformat(),
+            'count': p['count'],
+            'total': float(p['total'])
         }
-        for r in results
+        for p in series
     ]
 
 
@@ -185,8 +130,7 @@ def get_top_customers(start_date=None, end_date=None, limit=10):
         )
         .join(Sale)
         .filter(
-            Sale.created_at >= datetime.combine(start_date, datetime.min.time()),
-            Sale.created_at <= datetime.combine(end_date, datetime.max.time())
+            Sale.business_date.between(start_date, end_date)
         )
         .group_by(Customer.id, Customer.first_name, Customer.last_name)
         .order_by(func.sum(Sale.amount).desc())
@@ -205,10 +149,79 @@ def get_top_customers(start_date=None, end_date=None, limit=10):
     ]
 
 
+def get_period_summaries(periods):
+    """
+    Resúmenes de varios períodos.
+    Los que no están en cache se calculan juntos en un solo round trip;
+    los períodos ya cerrados (fin anterior a hoy) quedan cacheados hasta
+    que se modifique una venta de esos días.
+    """
+    today = today_ar()
+    summaries = {}
+    missing = {}
+    
+    for name, (start, end) in periods.items():
+        cached = report_cache.get(
+            cache_key('sales_summary', start=start, end=end),
+            past_only=end < today
+        )
+        if cached is MISSING:
+            missing[name] = (start, end)
+        else:
+            summaries[name] = cached
+    
+    for name, summary in summarize_periods(missing).items():
+        start, end = missing[name]
+        report_cache.set(
+            cache_key('sales_summary', start=start, end=end),
+            summary,
+            past_only=end < today
+        )
+        summaries[name] = summary
+    
+    return summaries
+
+
+def get_period_reports(periods):
+    """
+    Resumen y desgloses (canal / entrega) de varios períodos con nombre.
+    Los períodos que no están en cache se calculan en una sola consulta.
+    """
+    today = today_ar()
+    reports = {}
+    missing = {}
+    
+    for name, (start, end) in periods.items():
+        cached = report_cache.get(
+            cache_key('period_report', start=start, end=end),
+            past_only=end < today
+        )
+        if cached is MISSING:
+            missing[name] = (start, end)
+        else:
+            reports[name] = cached
+    
+    for name, report in summarize_periods_with_breakdowns(missing).items():
+        start, end = missing[name]
+        report_cache.set(
+            cache_key('period_report', start=start, end=end),
+            report,
+            past_only=end < today
+        )
+        reports[name] = report
+    
+    return reports
+
+
 def compare_periods(current_start, current_end, previous_start, previous_end):
     """Comparar dos períodos"""
-    current = get_sales_summary(current_start, current_end)
-    previous = get_sales_summary(previous_start, previous_end)
+    # Ambos períodos en un solo round trip (o desde cache)
+    summaries = get_period_summaries({
+        'current': (current_start, current_end),
+        'previous': (previous_start, previous_end)
+    })
+    current = summaries['current']
+    previous = summaries['previous']
     
     def calc_change(current_val, previous_val):
         if previous_val == 0:
@@ -226,117 +239,134 @@ def compare_periods(current_start, current_end, previous_start, previous_end):
     }
 
 
-def get_changes_stats():
+def changes_query():
+    """Cambios sin recepcionar (has_change=True, no entregados)"""
+    return Sale.query.filter(
+        Sale.has_change == True,
+        Sale.delivered_at.is_(None)
+    )
+
+
+def get_changes_counts(now=None):
     """
-    Estadísticas de cambios (has_change=True)
+    Conteos de cambios (has_change=True) en una sola consulta agregada;
+    vencido = más de 48 horas sin recepcionar (Sale.is_change_overdue_at).
     """
-    # Cambios totales
-    total_changes = Sale.query.filter(Sale.has_change == True).count()
-    
-    # Cambios pendientes (no entregados y no vencidos)
-    pending_changes = (
-        Sale.query
-        .filter(
-            Sale.has_change == True,
-            Sale.delivered_at.is_(None)
+    now = now or request_now()
+    cutoff = change_overdue_cutoff(now)
+    start_of_month = today_ar().replace(day=1)
+
+    total_changes, pending_count, overdue_count, changes_this_month = (
+        db.session.query(
+            func.count(Sale.id),
+            func.count(case((and_(Sale.delivered_at.is_(None), Sale.created_at >= cutoff), 1))),
+            func.count(case((Sale.is_change_overdue_at(now), 1))),
+            func.count(case((Sale.business_date >= start_of_month, 1)))
         )
-        .all()
+        .filter(Sale.has_change == True)
+        .one()
     )
-    
-    # Filtrar vencidos (>48 horas)
-    now = now_ar()
-    overdue = []
-    pending = []
-    
-    for sale in pending_changes:
-        sale_created = sale.created_at
 
-        # Si viene naive, asumimos UTC y lo llevamos a AR usando now_ar como referencia
-        if sale_created.tzinfo is None:
-            sale_created = sale_created.replace(tzinfo=now.tzinfo)
+    return {
+        'total_changes': total_changes,
+        'pending_count': pending_count,
+        'overdue_count': overdue_count,
+        'changes_this_month': changes_this_month
+    }
 
-        hours_since = (now - sale_created).total_seconds() / 3600
 
-        if hours_since > 48:
-            overdue.append(sale)
-        else:
-            pending.append(sale)
-        
-        if hours_since > 48:
-            overdue.append(sale)
-        else:
-            pending.append(sale)
-    
-    # Cambios del mes
-    start_of_month = today_ar().replace(day=1)
-    changes_this_month = (
-        Sale.query
-        .filter(
-            Sale.has_change == True,
-            Sale.created_at >= datetime.combine(start_of_month, datetime.min.time())
+def get_changes_stats(limit=BACKLOG_PAGE_SIZE, pending_cursor=None, overdue_cursor=None):
+    """
+    Conteos (get_changes_counts) y una página keyset de cambios pendientes
+    y de vencidos. Con cursor ("cargar más") sólo se trae esa lista.
+    """
+    now = request_now()
+    cutoff = change_overdue_cutoff(now)
+    first_load = not pending_cursor and not overdue_cursor
+
+    pending_sales, pending_next = [], None
+    overdue_sales, overdue_next = [], None
+
+    if first_load or pending_cursor:
+        pending_sales, pending_next = get_backlog_list(
+            changes_query().filter(Sale.created_at >= cutoff), limit, pending_cursor
         )
-        .count()
-    )
-    
+    if first_load or overdue_cursor:
+        overdue_sales, overdue_next = get_backlog_list(
+            changes_query().filter(Sale.created_at < cutoff), limit, overdue_cursor
+        )
+
     return {
-        'total_changes': total_changes,
-        'pending_count': len(pending),
-        'overdue_count': len(overdue),
-        'changes_this_month': changes_this_month,
-        'pending_sales': pending,
-        'overdue_sales': overdue
+        **get_changes_counts(now),
+        'pending_sales': pending_sales,
+        'overdue_sales': overdue_sales,
+        'pending_next_cursor': pending_next,
+        'overdue_next_cursor': overdue_next
     }
 
 
 def get_monthly_changes_trend(months=6):
-    """Tendencia de cambios por mes"""
-    today = today_ar()
-    results = []
+    """Tendencia de cambios por mes calendario (una sola consulta)"""
+    end = today_ar()
+    start = end.replace(day=1)
     
-    for i in range(months):
-        target_month = today - timedelta(days=30 * i)
-        start = target_month.replace(day=1)
-        
-        # Último día del mes
-        if start.month == 12:
-            end = start.replace(year=start.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            end = start.replace(month=start.month + 1, day=1) - timedelta(days=1)
-        
-        count = (
-            Sale.query
-            .filter(
-                Sale.has_change == True,
-                Sale.created_at >= datetime.combine(start, datetime.min.time()),
-                Sale.created_at <= datetime.combine(end, datetime.max.time())
-            )
-            .count()
-        )
-        
-        results.append({
-            'month': start.strftime('%b %Y'),
-            'count': count
-        })
+    # Retroceder (months - 1) meses calendario
+    for _ in range(months - 1):
+        start = (start - timedelta(days=1)).replace(day=1)
+    
+    series = time_series(
+        {'count': func.sum(Rollup.change_count)},
+        start, end, grain='month'
+    )
     
-    return list(reversed(results))
+    return [
+        {
+            'month': p['bucket'].strftime('%b %Y'),
+            'count': p['count']
+        }
+        for p in series
+    ]
 
 
 def mark_change_received(sale_id):
-    """Marcar cambio como recibido"""
-    sale = Sale.query.get(sale_id)
-    
-    if not sale:
-        return None, "Venta no encontrada"
-    
-    if not sale.has_change:
-        return None, "Esta venta no es un cambio"
-    
-    if sale.delivered_at:
-        return None, "El cambio ya fue recepcionado"
-    
-    sale.delivered_at = now_ar()
-    sale.completed_at = now_ar()
-    
+    """
+    Marcar cambio como recibido, con un solo UPDATE condicional (ver
+    mark_many_changes_received).
+
+    Returns:
+        (id, mensaje) o (None, error)
+    """
+    (result,), _ = mark_many_changes_received([sale_id])
+
+    if not result['ok']:
+        return None, result['error']
+
+    return sale_id, "Cambio marcado como recepcionado"
+
+
+def mark_many_changes_received(ids):
+    """
+    Marca varios cambios como recepcionados con un solo UPDATE condicional.
+
+    Returns:
+        (resultado por id, cantidad marcada)
+    """
+    rows = apply_transition(
+        ids,
+        [Sale.has_change == True, Sale.delivered_at.is_(None)],
+        done_values(utc_now())
+    )
+
+    def reason(row):
+        if not row.has_change:
+            return "Esta venta no es un cambio"
+        if row.delivered_at is not None:
+            return "El cambio ya fue recepcionado"
+        return None
+
+    results, updated = outcomes(ids, [row.id for row in rows], reason)
+    if updated:
+        touch_sales()
     db.session.commit()
-    
-    return sale, "Cambio marcado como recepcionado"
\ No newline at end of file
+
+    return results, updated
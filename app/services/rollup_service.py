@@ -0,0 +1,186 @@
+# app/services/rollup_service.py
+from decimal import Decimal
+from sqlalchemy import func, case, false, insert
+from app.models.sale import Sale
+from app.models.sales_daily_rollup import SalesDailyRollup
+from app.extensions import db
+from app.services.time_utils import business_date_for
+from app.services.cache_service import touch_sales, bump_versions, SALES, SALES_HISTORY
+
+
+KEY_COLUMNS = ('business_date', 'sales_channel', 'delivery_type', 'payment_method', 'paid')
+
+
+def sale_snapshot(sale):
+    """
+    Clave y medidas con las que una venta aporta al rollup.
+    Tomarla ANTES de modificar la venta para poder descontarla luego.
+    """
+    return {
+        'business_date': sale.business_date or business_date_for(sale.created_at),
+        'sales_channel': sale.sales_channel,
+        'delivery_type': sale.delivery_type,
+        'payment_method': sale.payment_method,
+        'paid': bool(sale.paid),
+        'amount': Decimal(str(sale.amount or 0)),
+        'has_change': bool(sale.has_change)
+    }
+
+
+def _apply(snapshot, sign):
+    """Suma (sign=1) o resta (sign=-1) una venta en su fila del rollup"""
+    _apply_delta(
+        {k: snapshot[k] for k in KEY_COLUMNS},
+        {
+            'sale_count': sign,
+            'total_amount': snapshot['amount'] * sign,
+            'change_count': sign if snapshot['has_change'] else 0
+        }
+    )
+
+
+def _apply_delta(key, delta):
+    """Suma delta (sale_count, total_amount, change_count) a la fila key del rollup"""
+    _apply_deltas([(key, delta)])
+
+
+def _apply_deltas(deltas):
+    """
+    Suma varios (key, delta) al rollup. En PostgreSQL/SQLite es un único
+    upsert multi-fila (las claves no pueden repetirse).
+    """
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+
+        stmt = upsert(SalesDailyRollup).values([{**key, **delta} for key, delta in deltas])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS),
+            set_={
+                col: getattr(SalesDailyRollup, col) + getattr(stmt.excluded, col)
+                for col in ('sale_count', 'total_amount', 'change_count')
+            }
+        )
+        db.session.execute(stmt)
+        return
+
+    # Otros motores: leer y modificar dentro de la misma transacción
+    for key, delta in deltas:
+        row = db.session.get(SalesDailyRollup, tuple(key[k] for k in KEY_COLUMNS))
+        if row is None:
+            row = SalesDailyRollup(**key, sale_count=0, total_amount=0, change_count=0)
+            db.session.add(row)
+        for col, value in delta.items():
+            setattr(row, col, (getattr(row, col) or 0) + value)
+
+
+def record_sale_created(sale):
+    snapshot = sale_snapshot(sale)
+    _apply(snapshot, 1)
+    touch_sales(snapshot['business_date'])
+
+
+def record_sale_deleted(sale):
+    snapshot = sale_snapshot(sale)
+    _apply(snapshot, -1)
+    touch_sales(snapshot['business_date'])
+
+
+def record_sale_changed(before, sale):
+    """
+    Mueve el aporte de una venta modificada.
+
+    Args:
+        before: sale_snapshot() tomado antes de modificarla
+        sale: la venta ya modificada
+    """
+    after = sale_snapshot(sale)
+    if after == before:
+        # No cambia ningún acumulado (ej: sólo notas)
+        touch_sales()
+        return
+
+    _apply(before, -1)
+    _apply(after, 1)
+    touch_sales(before['business_date'], after['business_date'])
+
+
+def record_sales_changed(changes):
+    """
+    Como record_sale_changed para muchas ventas a la vez (transiciones en
+    bloque): agrupa los movimientos por fila del rollup y los aplica en un
+    solo upsert, no dos por venta.
+
+    Args:
+        changes: pares (before, after) de sale_snapshot()
+    """
+    deltas = {}
+    business_dates = set()
+
+    for before, after in changes:
+        if after == before:
+            continue
+        for snapshot, sign in ((before, -1), (after, 1)):
+            key = tuple(snapshot[k] for k in KEY_COLUMNS)
+            delta = deltas.setdefault(
+                key, {'sale_count': 0, 'total_amount': Decimal(0), 'change_count': 0}
+            )
+            delta['sale_count'] += sign
+            delta['total_amount'] += snapshot['amount'] * sign
+            delta['change_count'] += sign if snapshot['has_change'] else 0
+            business_dates.add(snapshot['business_date'])
+
+    rows = [
+        (dict(zip(KEY_COLUMNS, key)), delta)
+        for key, delta in deltas.items()
+        if any(delta.values())
+    ]
+    if rows:
+        _apply_deltas(rows)
+
+    touch_sales(*business_dates)
+
+
+def rebuild_rollup():
+    """
+    Reconstruye el rollup completo desde la tabla sales.
+    Retorna la cantidad de filas generadas.
+    """
+    business_date = Sale.business_date
+    paid = func.coalesce(Sale.paid, false())
+
+    source = (
+        db.session.query(
+            business_date,
+            Sale.sales_channel,
+            Sale.delivery_type,
+            Sale.payment_method,
+            paid,
+            func.count(Sale.id),
+            func.sum(Sale.amount),
+            func.sum(case((Sale.has_change.is_(True), 1), else_=0))
+        )
+        .group_by(
+            business_date,
+            Sale.sales_channel,
+            Sale.delivery_type,
+            Sale.payment_method,
+            paid
+        )
+    )
+
+    db.session.query(SalesDailyRollup).delete(synchronize_session=False)
+    db.session.execute(
+        insert(SalesDailyRollup).from_select(
+            list(KEY_COLUMNS) + ['sale_count', 'total_amount', 'change_count'],
+            source.statement
+        )
+    )
+    bump_versions(SALES, SALES_HISTORY)
+    db.session.commit()
+
+    return db.session.query(func.count()).select_from(SalesDailyRollup).scalar()
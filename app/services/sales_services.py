@@ -1,39 +1,22 @@
+import base64
+import json
 from datetime import datetime, date, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, tuple_, case, update
 from sqlalchemy.orm import joinedload
-from zoneinfo import ZoneInfo
 
-from app.models.sale import Sale
-from app.models.customer import Customer
+from app.models.sale import Sale, READY, DONE
 from app.extensions import db
-
-
-# 🔹 Zona horaria de Argentina
-TIMEZONE = ZoneInfo("America/Argentina/Buenos_Aires")
-
-
-def now_ar():
-    """Retorna datetime actual en zona horaria de Argentina"""
-    return datetime.now(TIMEZONE)
-
-
-def today_ar():
-    """Retorna date de hoy en Argentina (sin hora)"""
-    return now_ar().date()
-
-
-def to_ar_date(iso_string):
-    """Convierte string ISO a date de Argentina"""
-    if not iso_string:
-        return None
-    
-    # Si es solo fecha (YYYY-MM-DD), parsearlo directamente
-    if len(iso_string) == 10:
-        return date.fromisoformat(iso_string)
-    
-    # Si tiene timestamp, convertir a zona horaria
-    dt = datetime.fromisoformat(iso_string.replace('Z', '+00:00'))
-    return dt.astimezone(TIMEZONE).date()
+from app.services import rollup_service
+from app.models.sales_daily_rollup import SalesDailyRollup as Rollup
+from app.services.cache_service import touch_sales, report_cache, cache_key, CUSTOMERS
+from app.services.search_service import matching_customer_ids
+from app.services.transition_service import apply_transition, outcomes
+from app.services.read_models import (
+    project_sales, fetch_sale_records, sale_records, iter_sale_records
+)
+from app.services.time_utils import (
+    today_ar, to_ar_date, utc_now, to_utc, business_date_for
+)
 
 
 # =========================
@@ -54,6 +37,121 @@ def get_sale_by_id(sale_id):
     return Sale.query.get(sale_id)
 
 
+# =========================
+#   PAGINACIÓN (KEYSET)
+# =========================
+
+def encode_cursor(sale):
+    """Cursor opaco con la posición (created_at, id) de una venta"""
+    raw = json.dumps([sale.created_at.isoformat(), sale.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inversa de encode_cursor; ValueError si el cursor es inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, sale_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(sale_id)
+    except (TypeError, ValueError, json.JSONDecodeError):
+        raise ValueError("Cursor inválido")
+
+
+def sales_list_query(sales_channel=None, has_shipping=None):
+    """Listado de ventas (más nuevas primero) con filtros opcionales"""
+    query = Sale.query
+
+    if sales_channel:
+        query = query.filter(Sale.sales_channel == sales_channel)
+
+    if has_shipping is not None:
+        query = query.filter(
+            Sale.has_shipping == (has_shipping.lower() == "true")
+        )
+
+    return query.order_by(Sale.created_at.desc(), Sale.id.desc())
+
+
+def get_sales_page(query, limit=50, cursor=None, ascending=False):
+    """
+    Página keyset de una consulta ordenada por (created_at, id) desc
+    (o asc con ascending=True). El costo no depende de la profundidad
+    de la página.
+
+    Returns:
+        (SaleRecords, next_cursor) — next_cursor es None en la última página
+    """
+    if cursor:
+        created_at, sale_id = decode_cursor(cursor)
+        position = tuple_(Sale.created_at, Sale.id)
+        if ascending:
+            query = query.filter(position > (created_at, sale_id))
+        else:
+            query = query.filter(position < (created_at, sale_id))
+
+    sales = fetch_sale_records(project_sales(query).limit(limit + 1))
+
+    if len(sales) > limit:
+        sales = sales[:limit]
+        return sales, encode_cursor(sales[-1])
+
+    return sales, None
+
+
+# Tamaño de página por defecto de los listados de pendientes/vencidos
+BACKLOG_PAGE_SIZE = 50
+
+
+def get_backlog_list(query, limit=None, cursor=None):
+    """
+    Listado de pendientes/vencidos (más viejos primero): completo si no
+    hay limit, o una página keyset.
+
+    Returns:
+        (SaleRecords, next_cursor)
+    """
+    query = query.order_by(Sale.created_at.asc(), Sale.id.asc())
+
+    if limit is None:
+        if cursor:
+            raise ValueError("cursor requiere limit")
+        return sale_records(query), None
+
+    return get_sales_page(query, limit=limit, cursor=cursor, ascending=True)
+
+
+def parse_page_limit(value, max_limit=500):
+    """limit opcional de un listado (None = sin paginar); ValueError si es inválido"""
+    if value is None or value == "":
+        return None
+    try:
+        return min(max(int(value), 1), max_limit)
+    except ValueError:
+        raise ValueError("Parámetro limit inválido")
+
+
+def parse_backlog_page(args):
+    """
+    Paginación de los listados de pendientes/vencidos (query params):
+    - limit: tamaño de página (default BACKLOG_PAGE_SIZE)
+    - pending_cursor / overdue_cursor: next_cursor de la página anterior
+      ("cargar más" de una lista: sólo uno por request)
+    """
+    if args.get('pending_cursor') and args.get('overdue_cursor'):
+        raise ValueError("Indicar pending_cursor u overdue_cursor, no ambos")
+
+    return {
+        'limit': parse_page_limit(args.get('limit')) or BACKLOG_PAGE_SIZE,
+        'pending_cursor': args.get('pending_cursor'),
+        'overdue_cursor': args.get('overdue_cursor'),
+    }
+
+
+def iter_sales(query, batch_size=500):
+    """Recorre la consulta como SaleRecords en lotes, sin cargarla completa"""
+    return iter_sale_records(query, batch_size=batch_size)
+
+
 # =========================
 #   PARSEO / VALIDACIONES
 # =========================
@@ -112,124 +210,255 @@ def parse_sale_data(data, is_update=False):
 def create_sale(data):
     parsed = parse_sale_data(data)
 
-    # 🔹 Usar fecha y hora de Argentina
+    # 🔹 Timestamps en UTC; el día de negocio es el de Argentina
+    now = utc_now()
     sale = Sale(
         **parsed,
-        sale_date=now_ar(),
-        created_at=now_ar()
+        sale_date=now,
+        created_at=now,
+        business_date=business_date_for(now)
     )
 
     db.session.add(sale)
+    rollup_service.record_sale_created(sale)
     db.session.commit()
     return sale
 
 
 def update_sale(sale, data):
     parsed = parse_sale_data(data, is_update=True)
+    before = rollup_service.sale_snapshot(sale)
 
     for field, value in parsed.items():
         if value is not None:
             setattr(sale, field, value)
 
+    sale.refresh_fulfillment_status()
+    rollup_service.record_sale_changed(before, sale)
     db.session.commit()
     return sale
 
 
 def delete_sale(sale):
+    rollup_service.record_sale_deleted(sale)
     db.session.delete(sale)
     db.session.commit()
 
 
 def mark_sale_paid(sale_id):
-    sale = Sale.query.get(sale_id)
+    """
+    Marca una venta como pagada con un solo UPDATE condicional (ver
+    mark_many_paid): dos clicks simultáneos no pueden moverla dos veces
+    en el rollup.
 
-    if not sale:
-        return None, "Venta no encontrada"
+    Returns:
+        (id, mensaje) o (None, error)
+    """
+    (result,), _ = mark_many_paid([sale_id])
+
+    if not result['ok']:
+        return None, result['error']
+
+    return sale_id, "Venta marcada como pagada correctamente"
 
-    if sale.paid:
-        return None, "La venta ya estaba marcada como pagada"
 
-    sale.paid = True
+# Columnas de sale_snapshot (rollup) que devuelve el UPDATE de pagadas
+SNAPSHOT_COLUMNS = (
+    Sale.business_date,
+    Sale.created_at,
+    Sale.sales_channel,
+    Sale.delivery_type,
+    Sale.payment_method,
+    Sale.paid,
+    Sale.amount,
+    Sale.has_change,
+)
+
+
+def mark_many_paid(ids):
+    """
+    Marca varias ventas como pagadas con un solo UPDATE condicional y
+    mueve su aporte en el rollup (de impagas a pagadas).
+
+    Returns:
+        (resultado por id, cantidad marcada)
+    """
+    rows = apply_transition(
+        ids,
+        [Sale.paid.isnot(True)],
+        {
+            'paid': True,
+            # Entra a la cola de preparación si no fue entregada
+            'fulfillment_status': case((Sale.delivered_at.is_(None), READY), else_=DONE),
+        },
+        returning=SNAPSHOT_COLUMNS
+    )
+
+    changes = []
+    for row in rows:
+        after = rollup_service.sale_snapshot(row)
+        changes.append(({**after, 'paid': False}, after))
+    if changes:
+        rollup_service.record_sales_changed(changes)
+
+    results, updated = outcomes(
+        ids, [row.id for row in rows],
+        lambda row: "La venta ya estaba marcada como pagada" if row.paid else None
+    )
     db.session.commit()
 
-    return sale, "Venta marcada como pagada correctamente"
+    return results, updated
 
 
 # =========================
 #   FILTROS / LISTADOS
 # =========================
 
-def filter_sales(customer="", payment_method="", paid="", date_from="", date_to=""):
-    query = Sale.query.join(Customer)
+def _paid_filter_value(paid):
+    """'si'/'no' (y equivalentes) → True/False; None si no filtra"""
+    if paid.lower() in ("si", "yes", "true", "1"):
+        return True
+    if paid.lower() in ("no", "false", "0"):
+        return False
+    return None
+
 
+def apply_sale_filters(query, customer="", payment_method="", paid="", date_from="", date_to=""):
+    """Filtros comunes de listado de ventas"""
     if customer:
-        query = query.filter(
-            (Customer.first_name + " " + Customer.last_name).ilike(f"%{customer}%")
-        )
+        query = query.filter(Sale.customer_id.in_(matching_customer_ids(customer)))
 
     if payment_method:
         query = query.filter(Sale.payment_method.ilike(f"%{payment_method}%"))
 
-    if paid.lower() in ("si", "yes", "true", "1"):
-        query = query.filter(Sale.paid.is_(True))
-    elif paid.lower() in ("no", "false", "0"):
-        query = query.filter(Sale.paid.is_(False))
+    paid_value = _paid_filter_value(paid)
+    if paid_value is not None:
+        query = query.filter(Sale.paid.is_(paid_value))
 
     if date_from:
-        query = query.filter(Sale.created_at >= datetime.fromisoformat(date_from))
+        query = query.filter(Sale.business_date >= to_ar_date(date_from))
 
     if date_to:
-        query = query.filter(Sale.created_at <= datetime.fromisoformat(date_to))
+        query = query.filter(Sale.business_date <= to_ar_date(date_to))
+
+    return query
+
+
+def filter_sales(customer="", payment_method="", paid="", date_from="", date_to=""):
+    query = apply_sale_filters(
+        Sale.query.options(joinedload(Sale.customer)),
+        customer, payment_method, paid, date_from, date_to
+    )
 
     return query.order_by(Sale.created_at.desc()).all()
 
 
+def count_sales(customer="", payment_method="", paid="", date_from="", date_to=""):
+    """
+    Total de ventas para los filtros del explorador.
+
+    Sin filtro de cliente se resuelve sobre el rollup diario (costo por
+    días, no por ventas). Con cliente se cuenta sobre sales y el resultado
+    se cachea por combinación de filtros hasta la próxima escritura.
+    """
+    if not customer:
+        query = db.session.query(func.coalesce(func.sum(Rollup.sale_count), 0))
+
+        if payment_method:
+            query = query.filter(Rollup.payment_method.ilike(f"%{payment_method}%"))
+
+        paid_value = _paid_filter_value(paid)
+        if paid_value is not None:
+            query = query.filter(Rollup.paid.is_(paid_value))
+
+        if date_from:
+            query = query.filter(Rollup.business_date >= to_ar_date(date_from))
+
+        if date_to:
+            query = query.filter(Rollup.business_date <= to_ar_date(date_to))
+
+        return int(query.scalar())
+
+    def compute():
+        query = apply_sale_filters(
+            db.session.query(func.count(Sale.id)),
+            customer, payment_method, paid, date_from, date_to
+        )
+        return query.scalar()
+
+    return report_cache.get_or_compute(
+        cache_key(
+            'explore_count', customer=customer, payment_method=payment_method,
+            paid=paid, date_from=date_from, date_to=date_to
+        ),
+        compute,
+        # El filtro de cliente busca por nombre
+        depends=(CUSTOMERS,)
+    )
+
+
 def explore_sales(filters):
+    """
+    Página del explorador de ventas con navegación keyset.
+
+    filters puede traer 'after' (cursor para ir a ventas más viejas) o
+    'before' (cursor para volver a más nuevas); 'page' sólo se usa para
+    mostrar el número de página.
+    """
     customer = filters.get("customer", "")
     payment_method = filters.get("payment_method", "")
     paid = filters.get("paid", "")
     date_from = filters.get("date_from", "")
     date_to = filters.get("date_to", "")
-    page = int(filters.get("page", 1))
+    page = max(int(filters.get("page", 1)), 1)
+    after = filters.get("after")
+    before = filters.get("before")
     per_page = 10
 
-    query = Sale.query.join(Customer)
-
-    if customer:
-        query = query.filter(
-            (Customer.first_name + " " + Customer.last_name).ilike(f"%{customer}%")
+    query = apply_sale_filters(
+        Sale.query.options(joinedload(Sale.customer)),
+        customer, payment_method, paid, date_from, date_to
+    )
+    position = tuple_(Sale.created_at, Sale.id)
+
+    if before:
+        # Página anterior: las más cercanas por arriba, luego se invierten
+        sales = (
+            query
+            .filter(position > decode_cursor(before))
+            .order_by(Sale.created_at.asc(), Sale.id.asc())
+            .limit(per_page + 1)
+            .all()
         )
+        has_newer = len(sales) > per_page
+        sales = list(reversed(sales[:per_page]))
+        has_older = True
+    else:
+        if after:
+            query = query.filter(position < decode_cursor(after))
+        sales = (
+            query
+            .order_by(Sale.created_at.desc(), Sale.id.desc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_older = len(sales) > per_page
+        sales = sales[:per_page]
+        has_newer = bool(after)
 
-    if payment_method:
-        query = query.filter(Sale.payment_method.ilike(f"%{payment_method}%"))
-
-    if paid.lower() in ("si", "yes", "true", "1"):
-        query = query.filter(Sale.paid.is_(True))
-    elif paid.lower() in ("no", "false", "0"):
-        query = query.filter(Sale.paid.is_(False))
-
-    if date_from:
-        query = query.filter(Sale.created_at >= datetime.fromisoformat(date_from))
-
-    if date_to:
-        query = query.filter(Sale.created_at <= datetime.fromisoformat(date_to))
-
-    total = query.count()
+    if not sales:
+        has_newer = has_older = False
 
-    sales = (
-        query
-        .order_by(Sale.created_at.desc())
-        .offset((page - 1) * per_page)
-        .limit(per_page)
-        .all()
-    )
+    total = count_sales(customer, payment_method, paid, date_from, date_to)
 
     return {
         "sales": sales,
         "page": page,
         "per_page": per_page,
         "total_sales": total,
-        "total_pages": (total + per_page - 1) // per_page
+        "total_pages": max((total + per_page - 1) // per_page, 1),
+        "next_cursor": encode_cursor(sales[-1]) if has_older else None,
+        "prev_cursor": encode_cursor(sales[0]) if has_newer else None
     }
 
 
@@ -238,25 +467,45 @@ def explore_sales(filters):
 # =========================
 
 def get_sales_by_turn(start_time: datetime, end_time: datetime):
-    return (
+    """Ventas del turno; los límites naive se toman como hora de Argentina"""
+    return sale_records(
         Sale.query
-        .filter(Sale.sale_date.between(start_time, end_time))
+        .filter(Sale.sale_date.between(to_utc(start_time), to_utc(end_time)))
         .order_by(Sale.sale_date.asc())
-        .all()
     )
 
 
-def update_shipment(sale, data):
-    if not sale:
-        return False
+def update_shipment(sale_id, data):
+    """
+    Cambia fecha de envío y/o notas en un solo UPDATE (sin leer la venta
+    antes). TypeError/ValueError si la fecha es inválida.
+
+    Returns:
+        False si la venta no existe
+    """
+    values = {}
 
     if data.get("shipping_date"):
         # 🔹 Parsear fecha sin conversión de zona horaria
-        sale.shipping_date = date.fromisoformat(data["shipping_date"])
+        values["shipping_date"] = date.fromisoformat(data["shipping_date"])
 
     if "notes" in data:
-        sale.notes = data["notes"]
+        values["notes"] = data["notes"]
+
+    if not values:
+        return db.session.get(Sale, sale_id) is not None
+
+    result = db.session.execute(
+        update(Sale)
+        .where(Sale.id == sale_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        return False
 
+    touch_sales()
     db.session.commit()
     return True
 
@@ -307,17 +556,16 @@ def get_shipments_by_day(shipping_date_str: str):
         shipping_date_str: Fecha en formato ISO (YYYY-MM-DD)
     
     Returns:
-        Lista de Sales
+        Lista de SaleRecords
     """
     # 🔹 Parsear fecha sin conversión de zona horaria
     target_date = date.fromisoformat(shipping_date_str)
     
-    return (
+    return sale_records(
         Sale.query
         .filter(
             Sale.has_shipping.is_(True),
             Sale.shipping_date == target_date
         )
         .order_by(Sale.id.asc())
-        .all()
     )
\ No newline at end of file
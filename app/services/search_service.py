@@ -0,0 +1,127 @@
+# app/services/search_service.py
+from sqlalchemy import func, select, text, table, column, literal_column, String
+from app.models.customer import Customer
+from app.models.sale import Sale
+from app.extensions import db
+
+
+# Índice de búsqueda de SQLite (FTS5 con tokenizer trigram), mantenido por
+# triggers desde la migración. En PostgreSQL se usa un índice GIN pg_trgm
+# sobre la misma expresión de nombre completo.
+customers_fts = table(
+    "customers_fts",
+    column("rowid"),
+    column("full_name"),
+    column("rank")
+)
+
+# Los trigramas necesitan al menos 3 caracteres para usar el índice
+MIN_INDEXED_LENGTH = 3
+
+_fts_available = {}
+
+
+def full_name_expression():
+    """
+    Nombre completo tal cual está indexado en PostgreSQL.
+    El separador va como literal para que coincida con la expresión del índice.
+    """
+    return Customer.first_name + literal_column("' '", String) + Customer.last_name
+
+
+def _like_pattern(query):
+    """'%query%' con los comodines del usuario escapados"""
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def _use_fts(query):
+    """True si en SQLite existe customers_fts y la búsqueda es indexable"""
+    if _dialect() != "sqlite" or len(query) < MIN_INDEXED_LENGTH:
+        return False
+
+    bind = db.session.get_bind()
+    if bind.url not in _fts_available:
+        _fts_available[bind.url] = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers_fts'"
+        )).first() is not None
+    return _fts_available[bind.url]
+
+
+def _fts_phrase(query):
+    """Frase FTS5: con trigram equivale a buscar la subcadena"""
+    return '"' + query.replace('"', '""') + '"'
+
+
+def matching_customer_ids(query):
+    """
+    SELECT de ids de clientes cuyo nombre completo contiene query.
+    Pensado para filtros tipo Sale.customer_id.in_(...).
+    """
+    query = query.strip()
+
+    if _use_fts(query):
+        return (
+            select(customers_fts.c.rowid)
+            .where(customers_fts.c.full_name.op("MATCH")(_fts_phrase(query)))
+        )
+
+    return (
+        select(Customer.id)
+        .where(full_name_expression().ilike(_like_pattern(query), escape="\\"))
+    )
+
+
+def last_purchase_expression():
+    """Fecha de la última compra del cliente (subconsulta correlacionada)"""
+    return (
+        select(func.max(Sale.created_at))
+        .where(Sale.customer_id == Customer.id)
+        .correlate(Customer)
+        .scalar_subquery()
+    )
+
+
+def customer_search_query(query):
+    """
+    Query de clientes que coinciden con query, ordenados por similitud
+    del nombre y, a igual similitud, por compra más reciente.
+    """
+    query = query.strip()
+    last_purchase = last_purchase_expression()
+
+    if _use_fts(query):
+        # rank de FTS5 (bm25): más negativo = mejor coincidencia
+        return (
+            Customer.query
+            .join(customers_fts, customers_fts.c.rowid == Customer.id)
+            .filter(customers_fts.c.full_name.op("MATCH")(_fts_phrase(query)))
+            .order_by(
+                customers_fts.c.rank,
+                last_purchase.desc().nulls_last(),
+                Customer.id
+            )
+        )
+
+    full_name = full_name_expression()
+    base_query = Customer.query.filter(
+        full_name.ilike(_like_pattern(query), escape="\\")
+    )
+
+    if _dialect() == "postgresql":
+        return base_query.order_by(
+            func.similarity(full_name, query).desc(),
+            last_purchase.desc().nulls_last(),
+            Customer.id
+        )
+
+    # Sin índice: primero los que empiezan con query
+    return base_query.order_by(
+        full_name.ilike(_like_pattern(query)[1:], escape="\\").desc(),
+        last_purchase.desc().nulls_last(),
+        Customer.id
+    )
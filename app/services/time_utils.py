@@ -0,0 +1,92 @@
+# app/services/time_utils.py
+from datetime import datetime, date, timezone
+from zoneinfo import ZoneInfo
+from flask import g, has_request_context
+
+
+# 🔹 Zona horaria de Argentina
+TIMEZONE = ZoneInfo("America/Argentina/Buenos_Aires")
+
+# Convención de almacenamiento: todos los timestamps se guardan como
+# datetime naive en UTC. Las fechas de negocio (business_date) son
+# días de Argentina y se calculan al escribir.
+
+
+def utc_now():
+    """Datetime actual naive en UTC (formato de almacenamiento)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def request_now():
+    """
+    utc_now() fijo durante todo el request, para que los campos derivados
+    (días desde creación, vencidos) de un listado usen el mismo instante.
+    """
+    if not has_request_context():
+        return utc_now()
+    if '_now' not in g:
+        g._now = utc_now()
+    return g._now
+
+
+def to_utc(dt):
+    """
+    Normaliza un datetime al formato de almacenamiento (naive UTC).
+    Los valores naive se interpretan como hora local de Argentina
+    (es lo que envía el frontend).
+    """
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=TIMEZONE)
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def to_ar(dt):
+    """Convierte un timestamp almacenado (naive UTC) a hora de Argentina"""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(TIMEZONE)
+
+
+def iso_utc(dt):
+    """ISO 8601 con zona explícita de un timestamp almacenado"""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        # Caso común (valor almacenado): ya está en UTC
+        return dt.isoformat(timespec='seconds') + 'Z'
+    return dt.astimezone(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+
+def now_ar():
+    """Retorna datetime actual en zona horaria de Argentina"""
+    return datetime.now(TIMEZONE)
+
+
+def today_ar():
+    """Retorna date de hoy en Argentina (sin hora)"""
+    return now_ar().date()
+
+
+def to_ar_date(iso_string):
+    """Convierte string ISO a date de Argentina"""
+    if not iso_string:
+        return None
+    
+    # Si es solo fecha (YYYY-MM-DD), parsearlo directamente
+    if len(iso_string) == 10:
+        return date.fromisoformat(iso_string)
+    
+    # Si tiene timestamp, convertir a zona horaria
+    dt = datetime.fromisoformat(iso_string.replace('Z', '+00:00'))
+    return dt.astimezone(TIMEZONE).date()
+
+
+def business_date_for(dt):
+    """Día de negocio (Argentina) de un timestamp almacenado (naive UTC)"""
+    if dt is None:
+        return today_ar()
+    return to_ar(dt).date()
@@ -0,0 +1,105 @@
+# app/services/timeseries_service.py
+from datetime import timedelta
+from sqlalchemy import func, cast, type_coerce, Date
+from app.models.sales_daily_rollup import SalesDailyRollup as Rollup
+from app.extensions import db
+
+
+GRAINS = ('day', 'week', 'month')
+
+
+def bucket_start(d, grain):
+    """Primer día del bucket (día, semana ISO o mes calendario) que contiene a d"""
+    if grain == 'day':
+        return d
+    if grain == 'week':
+        return d - timedelta(days=d.weekday())  # Lunes
+    if grain == 'month':
+        return d.replace(day=1)
+    raise ValueError(f"Granularidad inválida: {grain}")
+
+
+def next_bucket(d, grain):
+    """Inicio del bucket siguiente a d (d debe ser inicio de bucket)"""
+    if grain == 'day':
+        return d + timedelta(days=1)
+    if grain == 'week':
+        return d + timedelta(days=7)
+    if d.month == 12:
+        return d.replace(year=d.year + 1, month=1)
+    return d.replace(month=d.month + 1)
+
+
+def iter_buckets(start_date, end_date, grain):
+    """Todos los inicios de bucket entre start_date y end_date (inclusive)"""
+    current = bucket_start(start_date, grain)
+    while current <= end_date:
+        yield current
+        current = next_bucket(current, grain)
+
+
+def bucket_expression(date_column, grain):
+    """
+    Expresión SQL que lleva una columna Date al inicio de su bucket.
+    Funciona en PostgreSQL (date_trunc) y SQLite (modificadores de date()).
+    """
+    if grain not in GRAINS:
+        raise ValueError(f"Granularidad inválida: {grain}")
+
+    if db.session.get_bind().dialect.name == 'sqlite':
+        if grain == 'day':
+            expr = func.date(date_column)
+        elif grain == 'week':
+            # Avanza al domingo y retrocede 6 días → lunes de la semana ISO
+            expr = func.date(date_column, 'weekday 0', '-6 days')
+        else:
+            expr = func.date(date_column, 'start of month')
+        return type_coerce(expr, Date)
+
+    if grain == 'day':
+        return cast(date_column, Date)
+    return cast(func.date_trunc(grain, date_column), Date)
+
+
+def time_series(measures, start_date, end_date, grain='day',
+                date_column=Rollup.business_date, filters=()):
+    """
+    Serie temporal densa (sin huecos) en una sola consulta agrupada.
+
+    Las fechas son días de negocio de Argentina: por defecto se agrupa
+    el rollup diario, cuyo business_date ya está en esa zona.
+
+    Args:
+        measures: dict {nombre: expresión agregada} (ej: func.sum(...))
+        start_date, end_date: rango de días (inclusive)
+        grain: 'day', 'week' (ISO, lunes) o 'month'
+        date_column: columna Date a agrupar
+        filters: condiciones adicionales
+
+    Returns:
+        Lista ordenada de dicts {'bucket': date, <medida>: valor}; los
+        buckets sin datos vienen con 0
+    """
+    bucket = bucket_expression(date_column, grain).label('bucket')
+
+    rows = (
+        db.session.query(
+            bucket,
+            *[expr.label(name) for name, expr in measures.items()]
+        )
+        .filter(date_column.between(start_date, end_date), *filters)
+        .group_by(bucket)
+        .all()
+    )
+
+    by_bucket = {r.bucket: r for r in rows}
+
+    series = []
+    for start in iter_buckets(start_date, end_date, grain):
+        row = by_bucket.get(start)
+        point = {'bucket': start}
+        for name in measures:
+            point[name] = (getattr(row, name) or 0) if row else 0
+        series.append(point)
+
+    return series
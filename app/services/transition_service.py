@@ -0,0 +1,104 @@
+# app/services/transition_service.py
+from datetime import timedelta
+from sqlalchemy import select, update, or_, true
+from app.models.sale import Sale, CLAIMED
+from app.extensions import db
+from app.services.time_utils import utc_now
+
+
+# Columnas para explicar por qué una venta no pasó la precondición
+STATE_COLUMNS = (
+    Sale.id,
+    Sale.paid,
+    Sale.delivered_at,
+    Sale.delivery_type,
+    Sale.has_change,
+    Sale.fulfillment_status,
+    Sale.claimed_by,
+)
+
+NOT_FOUND = "Venta no encontrada"
+CHANGED = "La venta cambió mientras se procesaba, reintentar"
+
+
+def parse_sale_ids(ids, max_count):
+    """Lista de ids de venta de un body JSON; ValueError si es inválida"""
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("No se proporcionaron IDs")
+    try:
+        ids = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        raise ValueError("IDs inválidos")
+    if len(ids) > max_count:
+        raise ValueError(f"Máximo {max_count} pedidos por operación")
+    # Sin repetidos, en el orden recibido
+    return list(dict.fromkeys(ids))
+
+
+def not_claimed_by_other(user_id, ttl_minutes=None):
+    """
+    Precondición: el pedido no está tomado por otro operador. Una toma de
+    más de ttl_minutes está abandonada y no bloquea el pedido (aunque
+    nadie haya llamado a release_stale_claims todavía).
+    """
+    if user_id is None:
+        return true()
+
+    conditions = [Sale.fulfillment_status != CLAIMED, Sale.claimed_by == user_id]
+    if ttl_minutes is not None:
+        conditions.append(Sale.claimed_at < utc_now() - timedelta(minutes=ttl_minutes))
+    return or_(*conditions)
+
+
+def apply_transition(ids, preconditions, values, returning=()):
+    """
+    UPDATE sales SET values WHERE id IN ids AND preconditions RETURNING id, ...
+
+    La precondición se evalúa en la misma sentencia que escribe, así dos
+    operadores que aplican la misma transición a la vez no pueden pasar
+    ambos el chequeo.
+
+    Returns:
+        filas RETURNING (id y las columnas de returning) de las ventas actualizadas
+    """
+    return db.session.execute(
+        update(Sale)
+        .where(Sale.id.in_(ids), *preconditions)
+        .values(**values)
+        .returning(Sale.id, *returning)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def failure_reasons(ids, reason):
+    """
+    Motivo de cada venta que no pasó la precondición (una consulta).
+
+    Args:
+        reason: función(fila de STATE_COLUMNS) → mensaje, o None si ahora
+            la pasaría (cambió entre el UPDATE y esta consulta)
+    """
+    if not ids:
+        return {}
+
+    rows = db.session.execute(select(*STATE_COLUMNS).where(Sale.id.in_(ids)))
+    found = {row.id: reason(row) or CHANGED for row in rows}
+    return {sale_id: found.get(sale_id, NOT_FOUND) for sale_id in ids}
+
+
+def outcomes(ids, updated_ids, reason):
+    """
+    Resultado por id, en el orden pedido.
+
+    Returns:
+        (lista de {'id', 'ok', 'error'}, cantidad actualizada)
+    """
+    updated_ids = set(updated_ids)
+    errors = failure_reasons([i for i in ids if i not in updated_ids], reason)
+
+    results = [
+        {'id': sale_id, 'ok': True} if sale_id in updated_ids
+        else {'id': sale_id, 'ok': False, 'error': errors[sale_id]}
+        for sale_id in ids
+    ]
+    return results, len(updated_ids)
@@ -0,0 +1,127 @@
+"""
+Benchmark: latencia de POST /sales (mostrador) con impresión masiva de etiquetas.
+
+Simula un worker de gunicorn con 4 hilos (ThreadPoolExecutor de 4) sobre
+una base SQLite temporal: se lanzan varios /pdf/batch-labels pesados (sin
+cache de etiquetas) y, mientras tanto, ventas del mostrador cada 100 ms.
+La latencia de cada venta incluye la espera por un hilo libre. Se corre
+con y sin control de admisión.
+
+Uso (desde la raíz del repo):
+    python benchmarks/admission_lanes.py [--pdf-requests 8] [--labels 100] [--sales 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+DB_PATH = os.path.join(tempfile.mkdtemp(), "admission.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ["DATABASE_URL"] = "sqlite:///" + DB_PATH
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models.customer import Customer
+from app.models.sale import Sale
+from app.models.user import User
+from app.services.admission import admission_stats
+from app.services.explain_service import seed_sample_data
+from app.services.label_service import label_cache
+
+THREADS = 4
+
+
+def create_app_with(**config):
+    """create_app con valores de Config cambiados (create_app no recibe config)"""
+    for key, value in config.items():
+        setattr(Config, key, value)
+    return create_app()
+
+
+def run(admission, args, ids):
+    app = create_app_with(ADMISSION_ENABLED=admission, ADMISSION_THREADS=THREADS, LABEL_RENDER_PROCESSES=0)
+    # Sin cache: cada lote se renderiza completo
+    label_cache.max_bytes = 0
+
+    with app.app_context():
+        customer_id = db.session.query(Customer.id).first()[0]
+
+    def pdf_request():
+        client = app.test_client()
+        response = client.get("/pdf/batch-labels?ids=" + ",".join(map(str, ids[:args.labels])))
+        return response.status_code
+
+    # El login (hash de la contraseña) queda fuera de la latencia medida
+    clients = []
+    for _ in range(args.sales):
+        client = app.test_client()
+        client.post("/login", data={"username": "bench", "password": "bench"})
+        clients.append(client)
+
+    def sale_request(client, submitted):
+        response = client.post("/sales", json={
+            "customer_id": customer_id,
+            "amount": 1000,
+            "payment_method": "efectivo",
+            "sales_channel": "local",
+            "delivery_type": "retiro",
+        })
+        return response.status_code, time.perf_counter() - submitted
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        pdf_futures = [pool.submit(pdf_request) for _ in range(args.pdf_requests)]
+        sale_futures = []
+        for client in clients:
+            time.sleep(0.1)
+            sale_futures.append(pool.submit(sale_request, client, time.perf_counter()))
+
+        latencies = [f.result()[1] * 1000 for f in sale_futures]
+        sale_codes = [f.result()[0] for f in sale_futures]
+        pdf_codes = [f.result() for f in pdf_futures]
+
+    label = "con admisión" if admission else "sin admisión"
+    print(
+        f"{label:>13}: ventas p50 {statistics.median(latencies):7.0f} ms  "
+        f"max {max(latencies):7.0f} ms  ({sale_codes.count(201)}/{len(sale_codes)} ok)  "
+        f"pdf 200={pdf_codes.count(200)} 503={pdf_codes.count(503)}"
+    )
+    if admission:
+        stats = admission_stats(app)["pdf"]
+        print(
+            f"{'':>13}  carril pdf: en cola {stats['queued']}, rechazados {stats['rejected']}, "
+            f"vencidos {stats['timed_out']}, espera media {stats['wait_avg'] * 1000:.0f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pdf-requests", type=int, default=8)
+    parser.add_argument("--labels", type=int, default=100)
+    parser.add_argument("--sales", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app_with(LABEL_BATCH_MAX=args.labels)
+    with app.app_context():
+        db.create_all()
+        seed_sample_data(customers=100, sales=args.labels)
+        user = User(username="bench")
+        user.set_password("bench")
+        db.session.add(user)
+        db.session.commit()
+        ids = [sale_id for (sale_id,) in db.session.query(Sale.id).order_by(Sale.id)]
+        db.session.remove()
+
+    print(f"{THREADS} hilos, {args.pdf_requests} lotes de {args.labels} etiquetas, {args.sales} ventas\n")
+    run(False, args, ids)
+    run(True, args, ids)
+
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
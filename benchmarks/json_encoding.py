@@ -0,0 +1,117 @@
+"""
+Benchmark: encoder JSON stdlib vs orjson sobre payloads de ventas.
+
+No necesita base de datos: arma SaleRecords sintéticos con la misma forma
+que devuelven los listados (/sales, /delivery/*/stats) y mide
+provider.response() de cada encoder, que es lo que hace jsonify.
+
+Uso (desde la raíz del repo):
+    python benchmarks/json_encoding.py [--rows 1000 5000 20000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# app.config exige estas variables aunque el benchmark no use la base
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask import Flask
+
+from app.json_provider import PROVIDERS, orjson
+from app.serializers.sales_serializer import sale_record_to_dict
+from app.services.read_models import SaleRecord
+from app.services.time_utils import utc_now, business_date_for
+
+
+def make_records(n, seed=42):
+    rng = random.Random(seed)
+    now = utc_now()
+    records = []
+
+    for i in range(n):
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 60))
+        delivered = rng.random() < 0.5
+        records.append(SaleRecord(
+            id=i + 1,
+            customer_id=rng.randint(1, 2000),
+            customer_first_name=rng.choice(["Ana", "Juan", "Lucía", "Pedro", "María"]),
+            customer_last_name=rng.choice(["Gómez", "Pérez", "López", "Díaz"]),
+            customer_address="Av. Siempre Viva 742",
+            customer_city="Buenos Aires",
+            customer_phone="1132651073",
+            sale_date=created_at,
+            created_at=created_at,
+            business_date=business_date_for(created_at),
+            amount=Decimal(rng.randint(1000, 90000)) / 100,
+            payment_method=rng.choice(["efectivo", "transferencia"]),
+            paid=rng.random() < 0.8,
+            notes="Talle M, color negro" if rng.random() < 0.3 else None,
+            has_shipping=False,
+            shipping_date=None,
+            sales_channel=rng.choice(["local", "web", "instagram"]),
+            is_cash=False,
+            has_change=rng.random() < 0.1,
+            delivery_type=rng.choice(["retiro", "correo", "cadeteria"]),
+            completed_at=created_at if delivered else None,
+            delivered_at=created_at if delivered else None,
+            shipped_at=None,
+        ))
+
+    return records, now
+
+
+def bench(fn, repeat):
+    """Mejor tiempo (segundos) de repeat corridas"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    names = ["stdlib"] + (["orjson"] if orjson is not None else [])
+    providers = {name: PROVIDERS[name](app) for name in names}
+
+    if orjson is None:
+        print("orjson no está instalado: sólo se mide stdlib\n")
+
+    print(f"{'filas':>7} {'encoder':>8} {'ms':>9} {'MB':>7} {'vs stdlib':>10}")
+
+    with app.app_context():
+        for n in args.rows:
+            records, now = make_records(n)
+            payload = {
+                "total_pending": n,
+                "pending": [sale_record_to_dict(r, now) for r in records],
+            }
+
+            bodies = {name: p.response(payload).get_data() for name, p in providers.items()}
+            # Mismo contenido con cualquier encoder
+            assert len({repr(app.json.loads(b)) for b in bodies.values()}) == 1
+
+            baseline = None
+            for name, provider in providers.items():
+                seconds = bench(lambda: provider.response(payload), args.repeat)
+                baseline = baseline or seconds
+                print(
+                    f"{n:>7} {name:>8} {seconds * 1000:>9.1f} "
+                    f"{len(bodies[name]) / 1e6:>7.2f} {baseline / seconds:>9.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: renderizado de etiquetas PDF (/pdf/batch-labels).
+
+No necesita base de datos: arma etiquetas sintéticas (mezcla de cadetería,
+retiro y correo) y mide el render en frío (cache vacío, cada etiqueta pasa
+por ReportLab), el merge de las páginas y la reimpresión con cache.
+
+Uso (desde la raíz del repo):
+    python benchmarks/label_rendering.py [--labels 1 10 100] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# app.config exige estas variables aunque el benchmark no use la base
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services.label_service import (
+    LabelSale, LabelCustomer, label_cache, build_labels_pdf
+)
+from app.services.time_utils import today_ar
+
+
+def make_labels(n, seed=42):
+    rng = random.Random(seed)
+    today = today_ar()
+    labels = []
+
+    for i in range(n):
+        labels.append((
+            LabelSale(
+                id=i + 1,
+                delivery_type=rng.choice(["cadeteria", "retiro", "correo"]),
+                has_change=rng.random() < 0.1,
+                business_date=today - timedelta(days=rng.randint(0, 30)),
+                amount=Decimal(rng.randint(1000, 90000)),
+                paid=rng.random() < 0.8,
+                notes="Talle M, color negro\nTocar timbre" if rng.random() < 0.3 else None,
+            ),
+            LabelCustomer(
+                first_name=rng.choice(["Ana", "Juan", "Lucía", "Pedro", "María"]),
+                last_name=rng.choice(["Gómez", "Pérez", "López", "Díaz"]),
+                city="Buenos Aires",
+                address=f"Av. Siempre Viva {rng.randint(1, 5000)}",
+                phone="1132651073",
+                description=None,
+            ),
+        ))
+
+    return labels
+
+
+def bench(fn, repeat, before=None):
+    """Mejor tiempo (segundos) de repeat corridas; before() corre fuera de la medición"""
+    best = float("inf")
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--labels", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'etiquetas':>9} {'frío ms':>9} {'cache ms':>9} {'KB':>8} {'KB/etiq':>8}")
+
+    for n in args.labels:
+        labels = make_labels(n)
+
+        cold = bench(lambda: build_labels_pdf(labels), args.repeat, before=label_cache.clear)
+        warm = bench(lambda: build_labels_pdf(labels), args.repeat)
+        size = len(build_labels_pdf(labels)) / 1024
+
+        print(f"{n:>9} {cold * 1000:>9.1f} {warm * 1000:>9.1f} {size:>8.1f} {size / n:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: throughput del render de lotes de etiquetas en serie vs pool de procesos.
+
+Render en frío (cache vacío) de lotes sintéticos con build_labels_pdf, igual
+que /pdf/batch-labels y /pdf/shipments/day/<fecha>/labels. Además del
+tiempo total muestra cuánto es el merge final, que sigue siendo en serie.
+
+Uso (desde la raíz del repo):
+    python benchmarks/label_throughput.py [--labels 100 500 2000] [--processes 0 2 4]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# label_rendering está al lado de este archivo
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# app.config exige estas variables aunque el benchmark no use la base
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from label_rendering import make_labels
+
+from app.services.label_service import (
+    label_cache, label_digest, build_labels_pdf, merge_pdfs, render_labels, get_render_pool,
+    shutdown_render_pool
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--labels", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--processes", type=int, nargs="+", default=[0, 2, 4])
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}\n")
+    print(f"{'etiquetas':>9} {'procesos':>8} {'total s':>8} {'merge s':>8} {'etiq/s':>8} {'MB':>6}")
+
+    for n in args.labels:
+        labels = make_labels(n)
+
+        for processes in args.processes:
+            if processes > 1:
+                # Arranque del pool fuera de la medición (en la app se paga una vez)
+                get_render_pool(processes)
+                render_labels(labels[:processes * 20], processes)
+
+            label_cache.clear()
+            start = time.perf_counter()
+            pdf = build_labels_pdf(labels, processes)
+            total = time.perf_counter() - start
+
+            pages = [label_cache.get(sale.id, label_digest(sale, customer)) for sale, customer in labels]
+            start = time.perf_counter()
+            merge_pdfs(pages)
+            merge = time.perf_counter() - start
+
+            print(
+                f"{n:>9} {processes:>8} {total:>8.2f} {merge:>8.2f} "
+                f"{n / total:>8.0f} {len(pdf) / 1e6:>6.2f}"
+            )
+
+    shutdown_render_pool()
+
+
+if __name__ == "__main__":
+    main()
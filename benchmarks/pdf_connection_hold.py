@@ -0,0 +1,87 @@
+"""
+Benchmark: retención de conexiones del pool en las descargas de etiquetas.
+
+Levanta la app sobre una base SQLite temporal con datos sintéticos y pide
+/pdf/batch-labels con el cache de etiquetas vacío (render completo). Mide
+con init_pool_metrics cuánto tiempo retiene el request su conexión, y
+muestrea pool.checkedout() desde otro hilo mientras corre el request.
+
+Uso (desde la raíz del repo):
+    python benchmarks/pdf_connection_hold.py [--labels 10 100 300]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+DB_PATH = os.path.join(tempfile.mkdtemp(), "pdf_hold.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ["DATABASE_URL"] = "sqlite:///" + DB_PATH
+
+from app import create_app
+from app.extensions import db
+from app.models.sale import Sale
+from app.services.explain_service import seed_sample_data
+from app.services.label_service import label_cache
+from app.services.pool_metrics import hold_stats, reset_hold_stats
+
+
+def sample_occupancy(pool, stop, samples):
+    while not stop.is_set():
+        samples.append(pool.checkedout())
+        time.sleep(0.002)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--labels", type=int, nargs="+", default=[10, 100, 300])
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config["LABEL_RENDER_PROCESSES"] = 0
+    app.config["LABEL_BATCH_MAX"] = max(args.labels)
+
+    with app.app_context():
+        db.create_all()
+        seed_sample_data(customers=200, sales=max(args.labels))
+        db.session.commit()
+        ids = [sale_id for (sale_id,) in db.session.query(Sale.id).order_by(Sale.id)]
+        pool = db.engine.pool
+        db.session.remove()
+
+    client = app.test_client()
+
+    print(f"{'etiquetas':>9} {'request ms':>10} {'conexión ms':>11} {'% retenido':>10} {'ocupación media':>15}")
+
+    for n in args.labels:
+        label_cache.clear()
+        reset_hold_stats()
+
+        samples, stop = [], threading.Event()
+        sampler = threading.Thread(target=sample_occupancy, args=(pool, stop, samples))
+        sampler.start()
+
+        start = time.perf_counter()
+        response = client.get("/pdf/batch-labels?ids=" + ",".join(map(str, ids[:n])))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        sampler.join()
+        assert response.status_code == 200, response.status_code
+
+        held = hold_stats().get("pdf.download_batch_labels", {"total": 0.0})["total"]
+        occupancy = sum(samples) / len(samples) if samples else 0
+
+        print(
+            f"{n:>9} {elapsed * 1000:>10.1f} {held * 1000:>11.1f} "
+            f"{held / elapsed * 100:>9.1f}% {occupancy:>15.2f}"
+        )
+
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Chequeo: editar un cliente invalida el ETag y el cache de los reportes.
+
+Levanta la app sobre una base SQLite temporal con datos sintéticos, pide
+/reports/dashboard y /reports/top-customers, renombra el primer cliente
+del ranking con PUT /customers/<id> y vuelve a pedirlos con el ETag
+anterior. Ambos tienen que responder 200 con un ETag nuevo y el nombre
+nuevo en el cuerpo (no el reporte viejo del cache).
+
+Uso (desde la raíz del repo):
+    python benchmarks/report_cache_consistency.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+DB_PATH = os.path.join(tempfile.mkdtemp(), "report_cache.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ["DATABASE_URL"] = "sqlite:///" + DB_PATH
+
+from app import create_app
+from app.extensions import db
+from app.models.user import User
+from app.services.cache_service import report_cache
+from app.services.explain_service import seed_sample_data
+
+NEW_NAME = "Renombrado"
+
+
+def top_names(url, data):
+    """Nombres del ranking según la forma de cada endpoint"""
+    customers = data["top_customers"] if url == "/reports/dashboard" else data
+    return {c["id"]: c["name"] for c in customers}
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed_sample_data(customers=20, sales=2000)
+        user = User(username="check")
+        user.set_password("check")
+        db.session.add(user)
+        db.session.commit()
+        db.session.remove()
+
+    report_cache.clear()
+    client = app.test_client()
+    client.post("/login", data={"username": "check", "password": "check"})
+
+    urls = ["/reports/dashboard", "/reports/top-customers"]
+    before = {}
+    for url in urls:
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        before[url] = (response.headers["ETag"], top_names(url, response.get_json()))
+
+    customer_id = next(iter(before["/reports/top-customers"][1]))
+    response = client.put(f"/customers/{customer_id}", json={"first_name": NEW_NAME})
+    assert response.status_code == 200, response.status_code
+
+    failed = False
+    for url in urls:
+        etag, _ = before[url]
+        response = client.get(url, headers={"If-None-Match": etag})
+        names = top_names(url, response.get_json()) if response.status_code == 200 else {}
+        checks = {
+            "ETag nuevo": response.status_code == 200 and response.headers["ETag"] != etag,
+            "nombre nuevo": names.get(customer_id, "").startswith(NEW_NAME),
+        }
+        for label, ok in checks.items():
+            print(f"{url:<24} {label:<13} {'ok' if ok else 'FALLA'}")
+            failed = failed or not ok
+
+    os.remove(DB_PATH)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""add sales daily rollup
+
+Revision ID: 3b7c1d9e4a20
+Revises: 22dbb818998e
+Create Date: 2026-10-17 10:12:44.218301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7c1d9e4a20'
+down_revision = '22dbb818998e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sales_daily_rollup',
+    sa.Column('business_date', sa.Date(), nullable=False),
+    sa.Column('sales_channel', sa.String(length=20), nullable=False),
+    sa.Column('delivery_type', sa.String(length=20), nullable=False),
+    sa.Column('payment_method', sa.String(length=20), nullable=False),
+    sa.Column('paid', sa.Boolean(), nullable=False),
+    sa.Column('sale_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('change_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('business_date', 'sales_channel', 'delivery_type', 'payment_method', 'paid')
+    )
+
+    # Backfill inicial (equivale a `flask rollup rebuild`)
+    op.execute("""
+        INSERT INTO sales_daily_rollup (
+            business_date, sales_channel, delivery_type, payment_method, paid,
+            sale_count, total_amount, change_count
+        )
+        SELECT
+            date(created_at), sales_channel, delivery_type, payment_method,
+            coalesce(paid, false),
+            count(id), sum(amount),
+            sum(CASE WHEN has_change THEN 1 ELSE 0 END)
+        FROM sales
+        GROUP BY date(created_at), sales_channel, delivery_type, payment_method,
+                 coalesce(paid, false)
+    """)
+
+
+def downgrade():
+    op.drop_table('sales_daily_rollup')
@@ -0,0 +1,77 @@
+"""add sales business_date (utc storage)
+
+Revision ID: 5d1a7c3e9f42
+Revises: 8e2f4a6b1c35
+Create Date: 2026-10-17 12:25:51.403117
+
+Convención desde esta revisión: los timestamps de sales se guardan como
+UTC naive y business_date es el día de Argentina de created_at.
+
+- PostgreSQL: los valores existentes ya quedaron en UTC (el aware de
+  now_ar() se convertía con la zona de la sesión, UTC), sólo se calcula
+  business_date.
+- SQLite (desarrollo): now_ar() se guardaba como hora local, así que se
+  corren created_at/sale_date a UTC (Argentina es UTC-3 fijo).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1a7c3e9f42'
+down_revision = '8e2f4a6b1c35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('business_date', sa.Date(), nullable=True))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            UPDATE sales
+            SET business_date = (
+                coalesce(created_at, sale_date, now() AT TIME ZONE 'UTC')
+                AT TIME ZONE 'UTC' AT TIME ZONE 'America/Argentina/Buenos_Aires'
+            )::date
+        """)
+    else:
+        # datetime() redondea y descarta los microsegundos: se corren sólo
+        # los segundos enteros (19 caracteres) y se reagrega la fracción
+        # original, para no alterar el orden del cursor (created_at, id)
+        op.execute("""
+            UPDATE sales
+            SET business_date = date(coalesce(created_at, sale_date, datetime('now', '-3 hours'))),
+                created_at = datetime(substr(created_at, 1, 19), '+3 hours') || substr(created_at, 20),
+                sale_date = datetime(substr(sale_date, 1, 19), '+3 hours') || substr(sale_date, 20)
+        """)
+
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.alter_column('business_date', existing_type=sa.Date(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_sales_business_date'), ['business_date'], unique=False)
+
+    # El rollup pasa a agruparse por business_date
+    op.execute("DELETE FROM sales_daily_rollup")
+    op.execute("""
+        INSERT INTO sales_daily_rollup (
+            business_date, sales_channel, delivery_type, payment_method, paid,
+            sale_count, total_amount, change_count
+        )
+        SELECT
+            business_date, sales_channel, delivery_type, payment_method,
+            coalesce(paid, false),
+            count(id), sum(amount),
+            sum(CASE WHEN has_change THEN 1 ELSE 0 END)
+        FROM sales
+        GROUP BY business_date, sales_channel, delivery_type, payment_method,
+                 coalesce(paid, false)
+    """)
+
+
+def downgrade():
+    # Los timestamps quedan en UTC
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sales_business_date'))
+        batch_op.drop_column('business_date')
@@ -0,0 +1,34 @@
+"""add data versions
+
+Revision ID: 8e2f4a6b1c35
+Revises: 3b7c1d9e4a20
+Create Date: 2026-10-17 11:02:09.551820
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2f4a6b1c35'
+down_revision = '3b7c1d9e4a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    data_versions = op.create_table('data_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    op.bulk_insert(data_versions, [
+        {'name': 'sales', 'version': 0},
+        {'name': 'sales_history', 'version': 0},
+    ])
+
+
+def downgrade():
+    op.drop_table('data_versions')
@@ -0,0 +1,79 @@
+"""add customer name search index
+
+Revision ID: a4c8e1f0b7d2
+Revises: 5d1a7c3e9f42
+Create Date: 2026-10-17 15:02:11.271984
+
+- PostgreSQL: extensión pg_trgm e índice GIN sobre
+  first_name || ' ' || last_name (sirve para ILIKE '%q%' y similarity()).
+- SQLite (desarrollo): tabla FTS5 customers_fts con tokenizer trigram,
+  mantenida por triggers. Requiere SQLite >= 3.34; en versiones anteriores
+  no se crea y la búsqueda sigue con LIKE.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e1f0b7d2'
+down_revision = '5d1a7c3e9f42'
+branch_labels = None
+depends_on = None
+
+
+def _sqlite_has_trigram():
+    version = op.get_bind().execute(sa.text("SELECT sqlite_version()")).scalar()
+    return tuple(int(p) for p in version.split('.')) >= (3, 34)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("""
+            CREATE INDEX ix_customers_full_name_trgm ON customers
+            USING gin ((first_name || ' ' || last_name) gin_trgm_ops)
+        """)
+
+    elif dialect == 'sqlite' and _sqlite_has_trigram():
+        op.execute("""
+            CREATE VIRTUAL TABLE customers_fts
+            USING fts5(full_name, tokenize = 'trigram')
+        """)
+        op.execute("""
+            INSERT INTO customers_fts (rowid, full_name)
+            SELECT id, first_name || ' ' || last_name FROM customers
+        """)
+        op.execute("""
+            CREATE TRIGGER customers_fts_ai AFTER INSERT ON customers BEGIN
+                INSERT INTO customers_fts (rowid, full_name)
+                VALUES (new.id, new.first_name || ' ' || new.last_name);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER customers_fts_ad AFTER DELETE ON customers BEGIN
+                DELETE FROM customers_fts WHERE rowid = old.id;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER customers_fts_au AFTER UPDATE OF first_name, last_name ON customers BEGIN
+                UPDATE customers_fts
+                SET full_name = new.first_name || ' ' || new.last_name
+                WHERE rowid = old.id;
+            END
+        """)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_customers_full_name_trgm")
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS customers_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS customers_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS customers_fts_ai")
+        op.execute("DROP TABLE IF EXISTS customers_fts")
@@ -0,0 +1,86 @@
+"""add sales fulfillment status
+
+Revision ID: b3d8f2a6c190
+Revises: e5b1c9d7a3f8
+Create Date: 2026-10-17 16:20:14.518302
+
+Cola de preparación: fulfillment_status (awaiting_payment, ready, claimed,
+done) desnormaliza paid/delivered_at, y claimed_by/claimed_at registran
+qué operador tomó cada pedido. Los índices parciales cubren sólo los
+pedidos en cola, así que quedan chicos aunque sales crezca.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d8f2a6c190'
+down_revision = 'e5b1c9d7a3f8'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_sales_fulfillment_ready', ['delivery_type', 'created_at', 'id'], "fulfillment_status = 'ready'"),
+    ('ix_sales_fulfillment_claimed', ['claimed_by', 'claimed_at'], "fulfillment_status = 'claimed'"),
+]
+
+
+def upgrade():
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.add_column(sa.Column(
+            'fulfillment_status', sa.String(length=20), nullable=False,
+            server_default='awaiting_payment'
+        ))
+        batch_op.add_column(sa.Column('claimed_by', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_foreign_key(
+            'fk_sales_claimed_by_users', 'sales', 'users', ['claimed_by'], ['id']
+        )
+        paid = "paid IS true"
+    else:
+        # SQLite: la FK queda sólo en el modelo (agregarla recrearía la tabla)
+        paid = "paid IS 1"
+
+    op.execute(f"""
+        UPDATE sales
+        SET fulfillment_status = CASE
+            WHEN delivered_at IS NOT NULL THEN 'done'
+            WHEN {paid} THEN 'ready'
+            ELSE 'awaiting_payment'
+        END
+    """)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, columns, where in INDEXES:
+                op.create_index(
+                    name, 'sales', columns,
+                    postgresql_where=sa.text(where),
+                    postgresql_concurrently=True, if_not_exists=True
+                )
+    else:
+        for name, columns, where in INDEXES:
+            op.create_index(name, 'sales', columns, sqlite_where=sa.text(where))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, _, _ in reversed(INDEXES):
+                op.drop_index(
+                    name, table_name='sales',
+                    postgresql_concurrently=True, if_exists=True
+                )
+        op.drop_constraint('fk_sales_claimed_by_users', 'sales', type_='foreignkey')
+    else:
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='sales')
+
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('claimed_by')
+        batch_op.drop_column('fulfillment_status')
@@ -0,0 +1,77 @@
+"""add hot path indexes
+
+Revision ID: c7e2b9d4f1a6
+Revises: a4c8e1f0b7d2
+Create Date: 2026-10-17 15:48:37.904215
+
+Índices para los filtros más usados. En PostgreSQL se crean con
+CREATE INDEX CONCURRENTLY (fuera de la transacción de la migración) para
+no bloquear escrituras sobre sales mientras se construyen.
+
+Las condiciones de los índices parciales tienen que coincidir con las que
+generan los servicios (ej: paid IS true, has_change = true).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2b9d4f1a6'
+down_revision = 'a4c8e1f0b7d2'
+branch_labels = None
+depends_on = None
+
+
+def _partial(postgresql_where, sqlite_where):
+    """Opciones de índice parcial para ambos dialectos"""
+    return {
+        'postgresql_where': sa.text(postgresql_where),
+        'sqlite_where': sa.text(sqlite_where),
+    }
+
+
+INDEXES = [
+    ('ix_sales_customer_id_created_at', 'sales', ['customer_id', 'created_at'], {}),
+    ('ix_sales_created_at_id', 'sales', ['created_at', 'id'], {}),
+    ('ix_sales_sale_date', 'sales', ['sale_date'], {}),
+    ('ix_sales_pending_delivery', 'sales', ['delivery_type', 'created_at'], _partial(
+        'delivered_at IS NULL AND paid IS true',
+        'delivered_at IS NULL AND paid IS 1'
+    )),
+    ('ix_sales_shipping_date', 'sales', ['shipping_date'], _partial(
+        'has_shipping IS true',
+        'has_shipping IS 1'
+    )),
+    ('ix_sales_changes', 'sales', ['business_date', 'delivered_at'], _partial(
+        'has_change = true',
+        'has_change = 1'
+    )),
+    ('ix_customers_phone', 'customers', ['phone'], {}),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns, kwargs in INDEXES:
+                op.create_index(
+                    name, table, columns,
+                    postgresql_concurrently=True, if_not_exists=True, **kwargs
+                )
+    else:
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(name, table, columns, **kwargs)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, _, _ in reversed(INDEXES):
+                op.drop_index(
+                    name, table_name=table,
+                    postgresql_concurrently=True, if_exists=True
+                )
+    else:
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
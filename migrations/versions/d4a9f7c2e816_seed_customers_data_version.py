@@ -0,0 +1,33 @@
+"""seed customers data version
+
+Revision ID: d4a9f7c2e816
+Revises: b3d8f2a6c190
+Create Date: 2026-10-17 18:12:37.204118
+
+La versión 'customers' no tenía fila inicial: la primera escritura de
+clientes la creaba y dos workers podían chocar en la clave primaria.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a9f7c2e816'
+down_revision = 'b3d8f2a6c190'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Puede existir si ya hubo escrituras de clientes
+    op.execute(sa.text(
+        "INSERT INTO data_versions (name, version) "
+        "SELECT 'customers', 0 "
+        "WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = 'customers')"
+    ))
+
+
+def downgrade():
+    # La fila se vuelve a crear sola en la próxima escritura de clientes
+    pass
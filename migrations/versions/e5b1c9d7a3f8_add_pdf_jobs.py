@@ -0,0 +1,49 @@
+"""add pdf jobs
+
+Revision ID: e5b1c9d7a3f8
+Revises: c7e2b9d4f1a6
+Create Date: 2026-10-17 12:40:31.104262
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1c9d7a3f8'
+down_revision = 'c7e2b9d4f1a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pdf_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('progress', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('worker', sa.String(length=100), nullable=True),
+    sa.Column('result', sa.LargeBinary(), nullable=True),
+    sa.Column('result_size', sa.Integer(), nullable=True),
+    sa.Column('result_name', sa.String(length=100), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('pdf_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_pdf_jobs_status_created_at', ['status', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pdf_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_pdf_jobs_status_created_at')
+
+    op.drop_table('pdf_jobs')
@@ -0,0 +1,64 @@
+// ----------------------------
+// Listados de pendientes / vencidos paginados
+// ----------------------------
+// Los endpoints de stats (retiro, correo, cambios) devuelven una página
+// de cada lista y su next_cursor. "Cargar más" pide la página siguiente
+// de esa lista (con {lista}_cursor el servidor trae sólo esa) y la
+// agrega a lo que ya está en pantalla.
+
+const BACKLOG_LISTS = ['pending', 'overdue'];
+
+function createBacklog(statsUrl) {
+    return {
+        statsUrl,
+        rows: { pending: [], overdue: [] },
+        cursors: { pending: null, overdue: null }
+    };
+}
+
+// Primera página de ambas listas (reemplaza lo cargado)
+function setBacklog(backlog, data) {
+    BACKLOG_LISTS.forEach(list => {
+        backlog.rows[list] = data[list];
+        backlog.cursors[list] = data[`${list}_next_cursor`];
+    });
+}
+
+/**
+ * Trae la página siguiente de una lista.
+ * Retorna true si agregó filas.
+ */
+async function loadMoreBacklog(backlog, list) {
+    const cursor = backlog.cursors[list];
+    if (!cursor) return false;
+
+    try {
+        const res = await fetch(`${backlog.statsUrl}?${list}_cursor=${encodeURIComponent(cursor)}`);
+        const data = await res.json();
+
+        if (!res.ok) {
+            showToast(data.error || 'Error al cargar más pedidos', 'error');
+            return false;
+        }
+
+        backlog.rows[list] = backlog.rows[list].concat(data[list]);
+        backlog.cursors[list] = data[`${list}_next_cursor`];
+        return true;
+    } catch (error) {
+        console.error('Error:', error);
+        showToast('Error al cargar más pedidos', 'error');
+        return false;
+    }
+}
+
+function backlogRows(backlog) {
+    return backlog.rows.pending.concat(backlog.rows.overdue);
+}
+
+// Muestra "Cargar más" sólo en las listas que tienen página siguiente
+function updateLoadMore(backlog) {
+    BACKLOG_LISTS.forEach(list => {
+        const btn = document.querySelector(`[data-load-more="${list}"]`);
+        if (btn) btn.style.display = backlog.cursors[list] ? '' : 'none';
+    });
+}
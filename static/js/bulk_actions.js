@@ -0,0 +1,102 @@
+// ----------------------------
+// Selección múltiple y acciones en bloque
+// ----------------------------
+// Las tablas de retiro, correo y cambios agregan un checkbox por fila
+// (selectionCell) y un botón de acción en bloque: los ids elegidos se
+// mandan en un solo POST y el servidor responde el resultado de cada uno.
+// Un mismo pedido puede aparecer en dos tablas (vencidos y pendientes):
+// la selección se guarda por id y se sincroniza en ambas.
+
+const selectedIds = new Set();
+
+function selectionCell(saleId) {
+    const checked = selectedIds.has(saleId) ? 'checked' : '';
+    return `<td class="col-select">
+        <input type="checkbox" class="row-select" data-id="${saleId}" ${checked}
+               onchange="toggleSelection(${saleId}, this.checked)">
+    </td>`;
+}
+
+function toggleSelection(saleId, checked) {
+    if (checked) {
+        selectedIds.add(saleId);
+    } else {
+        selectedIds.delete(saleId);
+    }
+
+    document.querySelectorAll(`.row-select[data-id="${saleId}"]`).forEach(box => {
+        box.checked = checked;
+    });
+    updateBulkBar();
+}
+
+function toggleAll(tableId, checked) {
+    document.querySelectorAll(`#${tableId} .row-select`).forEach(box => {
+        toggleSelection(Number(box.dataset.id), checked);
+    });
+}
+
+// Después de recargar: se descartan los ids que ya no están en pantalla
+function pruneSelection(sales) {
+    const visible = new Set(sales.map(s => s.id));
+    [...selectedIds].forEach(id => {
+        if (!visible.has(id)) selectedIds.delete(id);
+    });
+    document.querySelectorAll('.select-all').forEach(box => { box.checked = false; });
+    updateBulkBar();
+}
+
+function updateBulkBar() {
+    document.querySelectorAll('[data-bulk-count]').forEach(el => {
+        el.textContent = selectedIds.size;
+    });
+    document.querySelectorAll('[data-bulk-action]').forEach(btn => {
+        btn.disabled = selectedIds.size === 0;
+    });
+}
+
+/**
+ * Aplica una transición a los pedidos seleccionados.
+ * Retorna la respuesta del servidor o null si no se hizo nada.
+ */
+async function runBulkAction(url, question) {
+    const ids = [...selectedIds];
+    if (!ids.length) return null;
+    if (!confirm(`${question} (${ids.length} seleccionados)`)) return null;
+
+    try {
+        const res = await fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ids })
+        });
+        const data = await res.json();
+
+        if (!res.ok) {
+            showToast(data.error || 'Error al procesar solicitud', 'error');
+            return null;
+        }
+
+        data.results.forEach(r => {
+            if (r.ok) selectedIds.delete(r.id);
+        });
+        updateBulkBar();
+
+        if (data.failed) {
+            const errors = data.results
+                .filter(r => !r.ok)
+                .slice(0, 3)
+                .map(r => `#${r.id}: ${r.error}`)
+                .join(' · ');
+            showToast(`${data.message}. Con error: ${errors}`, 'error');
+        } else {
+            showToast(data.message);
+        }
+
+        return data;
+    } catch (error) {
+        console.error('Error:', error);
+        showToast('Error al procesar solicitud', 'error');
+        return null;
+    }
+}
@@ -56,9 +56,11 @@ function getHoursSince(isoString) {
 // ======================
 // CARGAR CAMBIOS
 // ======================
+const backlog = createBacklog('/changes/stats');
+
 async function loadChanges() {
     try {
-        const res = await fetch('/changes/stats');
+        const res = await fetchWithETag('/changes/stats');
         const data = await res.json();
         
         // Actualizar dashboard
@@ -66,16 +68,11 @@ async function loadChanges() {
         document.getElementById('totalOverdue').textContent = data.total_overdue;
         
         // Mostrar/ocultar sección de vencidos
-        const overdueSection = document.getElementById('overdueSection');
-        if (data.total_overdue > 0) {
-            overdueSection.style.display = 'block';
-            renderTable('overdueTable', data.overdue, true);
-        } else {
-            overdueSection.style.display = 'none';
-        }
+        document.getElementById('overdueSection').style.display =
+            data.total_overdue > 0 ? 'block' : 'none';
         
-        // Renderizar tabla de pendientes
-        renderTable('pendingTable', data.pending, false);
+        setBacklog(backlog, data);
+        renderChanges();
         
     } catch (error) {
         console.error('Error cargando cambios:', error);
@@ -83,6 +80,20 @@ async function loadChanges() {
     }
 }
 
+function renderChanges() {
+    renderTable('overdueTable', backlog.rows.overdue, true);
+    renderTable('pendingTable', backlog.rows.pending, false);
+    pruneSelection(backlogRows(backlog));
+    updateLoadMore(backlog);
+}
+
+// ======================
+// CARGAR MÁS
+// ======================
+async function loadMore(list) {
+    if (await loadMoreBacklog(backlog, list)) renderChanges();
+}
+
 // ======================
 // RENDERIZAR TABLA
 // ======================
@@ -91,7 +102,7 @@ function renderTable(tableId, sales, isOverdue) {
     tbody.innerHTML = '';
     
     if (!sales.length) {
-        tbody.innerHTML = '<tr><td colspan="8" style="text-align:center;">No hay cambios</td></tr>';
+        tbody.innerHTML = '<tr><td colspan="9" style="text-align:center;">No hay cambios</td></tr>';
         return;
     }
     
@@ -103,6 +114,7 @@ function renderTable(tableId, sales, isOverdue) {
         row.className = isExpired ? 'row-overdue' : '';
         
         row.innerHTML = `
+            ${selectionCell(sale.id)}
             <td><strong>#${sale.id}</strong></td>
             <td>${sale.customer_first_name} ${sale.customer_last_name}</td>
             <td>${sale.customer_phone || '-'}</td>
@@ -147,6 +159,14 @@ async function markAsReceived(saleId) {
     }
 }
 
+// ======================
+// MARCAR SELECCIONADOS COMO RECIBIDOS
+// ======================
+async function markSelectedReceived() {
+    const data = await runBulkAction('/changes/mark-received', '¿Marcar cambios como recibidos?');
+    if (data && data.updated) loadChanges();
+}
+
 // ======================
 // INIT
 // ======================
@@ -0,0 +1,75 @@
+// ----------------------------
+// Toma de pedidos (retiro, correo)
+// ----------------------------
+// Cada operador toma los próximos pedidos listos de la cola y trabaja
+// sobre esos ("Mis pedidos"): dos operadores con la misma pantalla
+// abierta no preparan el mismo pedido. Los que tomó otro operador se
+// muestran marcados y sin acciones. Una toma abandonada vence sola en
+// el servidor (FULFILLMENT_CLAIM_TTL_MINUTES).
+
+const CLAIM_COUNT = 10;
+
+const myClaimIds = new Set();
+
+async function loadClaims(queue) {
+    const res = await fetch(`/delivery/${queue}/claims`);
+    const data = await res.json();
+
+    myClaimIds.clear();
+    data.claims.forEach(sale => myClaimIds.add(sale.id));
+    return data.claims;
+}
+
+function claimedByOther(sale) {
+    return sale.fulfillment_status === 'claimed' && !myClaimIds.has(sale.id);
+}
+
+async function postClaims(url, body) {
+    try {
+        const res = await fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        });
+        const data = await res.json();
+
+        if (!res.ok) {
+            showToast(data.error || 'Error al procesar solicitud', 'error');
+            return null;
+        }
+        return data;
+    } catch (error) {
+        console.error('Error:', error);
+        showToast('Error al procesar solicitud', 'error');
+        return null;
+    }
+}
+
+/**
+ * Toma los próximos pedidos listos de la cola.
+ * Retorna la respuesta del servidor o null si falló.
+ */
+async function claimOrders(queue) {
+    const data = await postClaims(`/delivery/${queue}/claim`, { count: CLAIM_COUNT });
+    if (!data) return null;
+
+    if (data.total_claimed) {
+        showToast(`${data.total_claimed} pedido(s) tomado(s)`);
+    } else {
+        showToast('No hay pedidos listos para tomar', 'error');
+    }
+    return data;
+}
+
+/**
+ * Devuelve a la cola todos los pedidos tomados por el operador.
+ */
+async function releaseMyClaims(queue) {
+    const ids = [...myClaimIds];
+    if (!ids.length) return null;
+    if (!confirm(`¿Devolver a la cola ${ids.length} pedido(s)?`)) return null;
+
+    const data = await postClaims(`/delivery/${queue}/release`, { ids });
+    if (data) showToast(`${data.released.length} pedido(s) devuelto(s) a la cola`);
+    return data;
+}
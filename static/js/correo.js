@@ -44,9 +44,15 @@ function formatMoney(amount) {
 // ======================
 // CARGAR CORREOS
 // ======================
+const backlog = createBacklog('/delivery/correo/stats');
+let myClaims = [];
+
 async function loadCorreos() {
     try {
-        const res = await fetch('/delivery/correo/stats');
+        const [claims, res] = await Promise.all([
+            loadClaims('correo'),
+            fetchWithETag('/delivery/correo/stats')
+        ]);
         const data = await res.json();
         
         // Actualizar dashboard
@@ -54,16 +60,12 @@ async function loadCorreos() {
         document.getElementById('totalOverdue').textContent = data.total_overdue;
         
         // Mostrar/ocultar sección de demorados
-        const overdueSection = document.getElementById('overdueSection');
-        if (data.total_overdue > 0) {
-            overdueSection.style.display = 'block';
-            renderTable('overdueTable', data.overdue, true);
-        } else {
-            overdueSection.style.display = 'none';
-        }
+        document.getElementById('overdueSection').style.display =
+            data.total_overdue > 0 ? 'block' : 'none';
         
-        // Renderizar tabla de pendientes
-        renderTable('pendingTable', data.pending, false);
+        myClaims = claims;
+        setBacklog(backlog, data);
+        renderCorreos();
         
     } catch (error) {
         console.error('Error cargando correos:', error);
@@ -71,6 +73,22 @@ async function loadCorreos() {
     }
 }
 
+// Mis pedidos tomados, los demorados y el resto de los pendientes
+function renderCorreos() {
+    renderTable('overdueTable', backlog.rows.overdue, true);
+    renderTable('claimedTable', myClaims, false);
+    renderTable('pendingTable', backlog.rows.pending.filter(sale => !myClaimIds.has(sale.id)), false);
+    pruneSelection(backlogRows(backlog).concat(myClaims));
+    updateLoadMore(backlog);
+}
+
+// ======================
+// CARGAR MÁS
+// ======================
+async function loadMore(list) {
+    if (await loadMoreBacklog(backlog, list)) renderCorreos();
+}
+
 // ======================
 // RENDERIZAR TABLA
 // ======================
@@ -79,7 +97,7 @@ function renderTable(tableId, sales, isOverdue) {
     tbody.innerHTML = '';
     
     if (!sales.length) {
-        tbody.innerHTML = '<tr><td colspan="9" style="text-align:center;">No hay pedidos</td></tr>';
+        tbody.innerHTML = '<tr><td colspan="10" style="text-align:center;">No hay pedidos</td></tr>';
         return;
     }
     
@@ -87,10 +105,13 @@ function renderTable(tableId, sales, isOverdue) {
         const days = sale.days_since_creation || 0;
         const isDemorado = days > 10;
         
+        const takenByOther = claimedByOther(sale);
+
         const row = document.createElement('tr');
         row.className = isDemorado ? 'row-overdue' : '';
         
         row.innerHTML = `
+            ${takenByOther ? '<td class="col-select"></td>' : selectionCell(sale.id)}
             <td><strong>#${sale.id}</strong></td>
             <td>${sale.customer_first_name} ${sale.customer_last_name}</td>
             <td>${sale.customer_address || '-'}</td>
@@ -100,9 +121,10 @@ function renderTable(tableId, sales, isOverdue) {
             <td>${formatDate(sale.created_at)}</td>
             <td>${sale.notes || '-'}</td>
             <td>
+                ${takenByOther ? '<span class="claimed-tag">Tomado por otro operador</span>' : `
                 <button class="btn btn-ship" onclick="markAsShipped(${sale.id})">
                      Enviado
-                </button>
+                </button>`}
             </td>
         `;
         
@@ -136,6 +158,27 @@ async function markAsShipped(saleId) {
     }
 }
 
+// ======================
+// MARCAR SELECCIONADOS COMO ENVIADOS
+// ======================
+async function markSelectedShipped() {
+    const data = await runBulkAction('/delivery/correo/mark-shipped', '¿Marcar pedidos como enviados?');
+    if (data && data.updated) loadCorreos();
+}
+
+// ======================
+// TOMAR / DEVOLVER PEDIDOS
+// ======================
+async function claimNext() {
+    const data = await claimOrders('correo');
+    if (data && data.total_claimed) loadCorreos();
+}
+
+async function releaseClaims() {
+    const data = await releaseMyClaims('correo');
+    if (data) loadCorreos();
+}
+
 // ======================
 // INIT
 // ======================
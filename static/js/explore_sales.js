@@ -78,7 +78,7 @@ document.addEventListener('DOMContentLoaded', () => {
 // ----------------------------
 // Ir a página manteniendo filtros
 // ----------------------------
-function goToPage(pageNum) {
+function filterParams() {
     const form = document.getElementById('filterForm');
     const formData = new FormData(form);
     
@@ -86,6 +86,21 @@ function goToPage(pageNum) {
     for (let [key, value] of formData.entries()) {
         if (value) params.append(key, value);
     }
+    return params;
+}
+
+function goToPage(pageNum) {
+    // Sin cursor sólo se puede volver a la primera página
+    const params = filterParams();
+    params.set('page', pageNum);
+    
+    window.location.href = '/sales/explore?' + params.toString();
+}
+
+// 🔹 Navegación por cursor: 'after' → más viejas, 'before' → más nuevas
+function goToCursor(direction, cursor, pageNum) {
+    const params = filterParams();
+    params.set(direction, cursor);
     params.set('page', pageNum);
     
     window.location.href = '/sales/explore?' + params.toString();
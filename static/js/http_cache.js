@@ -0,0 +1,53 @@
+// ----------------------------
+// Cache de respuestas GET con revalidación por ETag
+// ----------------------------
+// Guarda el último cuerpo y su ETag en sessionStorage y manda
+// If-None-Match: si el servidor responde 304 se reutiliza el cuerpo
+// guardado, así una recarga sin cambios casi no transfiere datos.
+// Devuelve un Response normal (res.ok, res.json()) para no cambiar
+// el código que lo usa.
+
+const ETAG_CACHE_PREFIX = 'etag-cache:';
+
+async function fetchWithETag(url, options = {}) {
+    const key = ETAG_CACHE_PREFIX + url;
+
+    let cached = null;
+    try {
+        cached = JSON.parse(sessionStorage.getItem(key));
+    } catch (e) {
+        cached = null;
+    }
+
+    const headers = new Headers(options.headers || {});
+    if (cached && cached.etag) {
+        headers.set('If-None-Match', cached.etag);
+    }
+
+    // no-store: la revalidación la maneja este helper, no el cache del navegador
+    const res = await fetch(url, { ...options, headers, cache: 'no-store' });
+
+    if (res.status === 304 && cached) {
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': cached.contentType || 'application/json' }
+        });
+    }
+
+    const etag = res.headers.get('ETag');
+    if (res.ok && etag) {
+        const body = await res.clone().text();
+        try {
+            sessionStorage.setItem(key, JSON.stringify({
+                etag,
+                body,
+                contentType: res.headers.get('Content-Type')
+            }));
+        } catch (e) {
+            // Sin espacio en sessionStorage: se sigue sin cache
+            sessionStorage.removeItem(key);
+        }
+    }
+
+    return res;
+}
@@ -77,7 +77,7 @@ let charts = {};
 
 async function loadDashboard() {
     try {
-        const res = await fetch('/reports/dashboard');
+        const res = await fetchWithETag('/reports/dashboard');
         const data = await res.json();
         
         console.log('📊 Dashboard data:', data);
@@ -133,7 +133,7 @@ function updateStatsCards(comparison) {
 // ======================
 async function loadChangesStats() {
     try {
-        const res = await fetch('/reports/changes-stats');
+        const res = await fetchWithETag('/reports/changes-stats');
         const data = await res.json();
         
         document.getElementById('changesCount').textContent = data.stats.changes_this_month;
@@ -271,12 +271,42 @@ function renderTopCustomers(customers) {
     });
 }
 
+// ======================
+// 🔹 REPORTES POR PERÍODO (un solo request para varios rangos)
+// ======================
+// Sin memo en el cliente: el servidor cachea cada rango hasta la
+// próxima venta, así que una venta nueva aparece en el próximo reporte.
+
+/**
+ * Pide todos los rangos que necesita una pantalla en un solo request.
+ * periods: { nombre: [start_date, end_date], ... }
+ * Retorna { nombre: reporte, ... }
+ */
+async function loadPeriodReports(periods) {
+    const res = await fetch('/reports/periods', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            periods: Object.entries(periods).map(([name, [start_date, end_date]]) => ({
+                name, start_date, end_date
+            }))
+        })
+    });
+    
+    if (!res.ok) throw new Error('Error cargando períodos');
+    
+    return res.json();
+}
+
 // ======================
 // 🔹 REPORTES PERSONALIZADOS
 // ======================
 const customReportForm = document.getElementById('customReportForm');
 const customReportResult = document.getElementById('customReportResult');
 
+// Tipos de reporte que salen de /reports/periods
+const PERIOD_REPORTS = ['general', 'delivery', 'channel', 'payment'];
+
 // Setear fechas por defecto (mes actual)
 document.addEventListener('DOMContentLoaded', () => {
     const today = new Date();
@@ -303,18 +333,23 @@ customReportForm.addEventListener('submit', async (e) => {
     document.getElementById('reportContent').innerHTML = '<p>Cargando reporte...</p>';
     
     try {
+        // Los reportes por período comparten un único request
+        const reports = PERIOD_REPORTS.includes(reportType)
+            ? await loadPeriodReports({ period: [startDate, endDate] })
+            : null;
+        
         switch(reportType) {
             case 'general':
-                await generateGeneralReport(startDate, endDate);
+                generateGeneralReport(reports.period);
                 break;
             case 'delivery':
-                await generateDeliveryReport(startDate, endDate);
+                generateDeliveryReport(reports.period);
                 break;
             case 'channel':
-                await generateChannelReport(startDate, endDate);
+                generateChannelReport(reports.period);
                 break;
             case 'payment':
-                await generatePaymentReport(startDate, endDate);
+                generatePaymentReport(reports.period);
                 break;
             case 'changes':
                 await generateChangesReport(startDate, endDate);
@@ -333,10 +368,7 @@ customReportForm.addEventListener('submit', async (e) => {
 // ======================
 // REPORTE GENERAL
 // ======================
-async function generateGeneralReport(startDate, endDate) {
-    const res = await fetch(`/reports/sales-summary?start_date=${startDate}&end_date=${endDate}`);
-    const data = await res.json();
-    
+function generateGeneralReport(data) {
     const { summary, by_channel, by_delivery } = data;
     
     document.getElementById('reportTitle').textContent = '📊 Reporte General de Ventas';
@@ -371,10 +403,7 @@ async function generateGeneralReport(startDate, endDate) {
 // ======================
 // REPORTE POR ENTREGA
 // ======================
-async function generateDeliveryReport(startDate, endDate) {
-    const res = await fetch(`/reports/sales-summary?start_date=${startDate}&end_date=${endDate}`);
-    const data = await res.json();
-    
+function generateDeliveryReport(data) {
     document.getElementById('reportTitle').textContent = '📦 Reporte por Tipo de Entrega';
     document.getElementById('reportContent').innerHTML = `
         <div class="table-wrapper">
@@ -408,10 +437,7 @@ async function generateDeliveryReport(startDate, endDate) {
 // ======================
 // REPORTE POR CANAL
 // ======================
-async function generateChannelReport(startDate, endDate) {
-    const res = await fetch(`/reports/sales-summary?start_date=${startDate}&end_date=${endDate}`);
-    const data = await res.json();
-    
+function generateChannelReport(data) {
     document.getElementById('reportTitle').textContent = '📍 Reporte por Canal de Venta';
     document.getElementById('reportContent').innerHTML = `
         <div class="table-wrapper">
@@ -448,10 +474,7 @@ async function generateChannelReport(startDate, endDate) {
 // ======================
 // REPORTE DE PAGOS
 // ======================
-async function generatePaymentReport(startDate, endDate) {
-    const res = await fetch(`/reports/sales-summary?start_date=${startDate}&end_date=${endDate}`);
-    const data = await res.json();
-    
+function generatePaymentReport(data) {
     const { summary } = data;
     const paidPercentage = (summary.paid_sales / summary.total_sales * 100).toFixed(1);
     const unpaidPercentage = (summary.unpaid_sales / summary.total_sales * 100).toFixed(1);
@@ -487,7 +510,7 @@ async function generatePaymentReport(startDate, endDate) {
 // REPORTE DE CAMBIOS
 // ======================
 async function generateChangesReport(startDate, endDate) {
-    const res = await fetch('/reports/changes-stats');
+    const res = await fetchWithETag('/reports/changes-stats');
     const data = await res.json();
     
     document.getElementById('reportTitle').textContent = '🔄 Reporte de Cambios';
@@ -535,7 +558,7 @@ async function generateChangesReport(startDate, endDate) {
 // TOP CLIENTES PERSONALIZADO
 // ======================
 async function generateTopCustomersReport(startDate, endDate) {
-    const res = await fetch(`/reports/top-customers?start_date=${startDate}&end_date=${endDate}&limit=20`);
+    const res = await fetchWithETag(`/reports/top-customers?start_date=${startDate}&end_date=${endDate}&limit=20`);
     const customers = await res.json();
     
     document.getElementById('reportTitle').textContent = '⭐ Top 20 Clientes';
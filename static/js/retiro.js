@@ -44,9 +44,15 @@ function formatMoney(amount) {
 // ======================
 // CARGAR RETIROS
 // ======================
+const backlog = createBacklog('/delivery/retiro/stats');
+let myClaims = [];
+
 async function loadRetiros() {
     try {
-        const res = await fetch('/delivery/retiro/stats');
+        const [claims, res] = await Promise.all([
+            loadClaims('retiro'),
+            fetchWithETag('/delivery/retiro/stats')
+        ]);
         const data = await res.json();
         
         // Actualizar dashboard
@@ -54,16 +60,12 @@ async function loadRetiros() {
         document.getElementById('totalOverdue').textContent = data.total_overdue;
         
         // Mostrar/ocultar sección de vencidos
-        const overdueSection = document.getElementById('overdueSection');
-        if (data.total_overdue > 0) {
-            overdueSection.style.display = 'block';
-            renderTable('overdueTable', data.overdue, true);
-        } else {
-            overdueSection.style.display = 'none';
-        }
+        document.getElementById('overdueSection').style.display =
+            data.total_overdue > 0 ? 'block' : 'none';
         
-        // Renderizar tabla de pendientes
-        renderTable('pendingTable', data.pending, false);
+        myClaims = claims;
+        setBacklog(backlog, data);
+        renderRetiros();
         
     } catch (error) {
         console.error('Error cargando retiros:', error);
@@ -71,6 +73,22 @@ async function loadRetiros() {
     }
 }
 
+// Mis pedidos tomados, los vencidos y el resto de los pendientes
+function renderRetiros() {
+    renderTable('overdueTable', backlog.rows.overdue, true);
+    renderTable('claimedTable', myClaims, false);
+    renderTable('pendingTable', backlog.rows.pending.filter(sale => !myClaimIds.has(sale.id)), false);
+    pruneSelection(backlogRows(backlog).concat(myClaims));
+    updateLoadMore(backlog);
+}
+
+// ======================
+// CARGAR MÁS
+// ======================
+async function loadMore(list) {
+    if (await loadMoreBacklog(backlog, list)) renderRetiros();
+}
+
 // ======================
 // RENDERIZAR TABLA
 // ======================
@@ -79,7 +97,7 @@ function renderTable(tableId, sales, isOverdue) {
     tbody.innerHTML = '';
     
     if (!sales.length) {
-        tbody.innerHTML = '<tr><td colspan="8" style="text-align:center;">No hay pedidos</td></tr>';
+        tbody.innerHTML = '<tr><td colspan="9" style="text-align:center;">No hay pedidos</td></tr>';
         return;
     }
     
@@ -87,10 +105,13 @@ function renderTable(tableId, sales, isOverdue) {
         const days = sale.days_since_creation || 0;
         const isVencido = days > 15;
         
+        const takenByOther = claimedByOther(sale);
+
         const row = document.createElement('tr');
         row.className = isVencido ? 'row-overdue' : '';
         
         row.innerHTML = `
+            ${takenByOther ? '<td class="col-select"></td>' : selectionCell(sale.id)}
             <td><strong>#${sale.id}</strong></td>
             <td>${sale.customer_first_name} ${sale.customer_last_name}</td>
             <td>${sale.customer_phone || '-'}</td>
@@ -99,9 +120,10 @@ function renderTable(tableId, sales, isOverdue) {
             <td>${formatDate(sale.created_at)}</td>
             <td>${sale.notes || '-'}</td>
             <td>
+                ${takenByOther ? '<span class="claimed-tag">Tomado por otro operador</span>' : `
                 <button class="btn btn-deliver" onclick="markAsDelivered(${sale.id})">
                      Entregado
-                </button>
+                </button>`}
             </td>
         `;
         
@@ -135,6 +157,27 @@ async function markAsDelivered(saleId) {
     }
 }
 
+// ======================
+// MARCAR SELECCIONADOS COMO ENTREGADOS
+// ======================
+async function markSelectedDelivered() {
+    const data = await runBulkAction('/delivery/retiro/mark-delivered', '¿Marcar pedidos como entregados?');
+    if (data && data.updated) loadRetiros();
+}
+
+// ======================
+// TOMAR / DEVOLVER PEDIDOS
+// ======================
+async function claimNext() {
+    const data = await claimOrders('retiro');
+    if (data && data.total_claimed) loadRetiros();
+}
+
+async function releaseClaims() {
+    const data = await releaseMyClaims('retiro');
+    if (data) loadRetiros();
+}
+
 // ======================
 // INIT
 // ======================
@@ -49,7 +49,7 @@ async function loadCalendar() {
     
     const todayIso = formatDateToISO(today);
 
-    const res = await fetch("/sales/shipments/calendar");
+    const res = await fetchWithETag("/sales/shipments/calendar");
     const counts = await res.json();
 
     console.log("📅 Counts recibidos del servidor:", counts);
@@ -155,7 +155,7 @@ async function loadDay(date, el) {
         .forEach(d => d.classList.remove("active"));
     el.classList.add("active");
 
-    const res = await fetch(`/sales/shipments/day/${date}`);
+    const res = await fetchWithETag(`/sales/shipments/day/${date}`);
     const sales = await res.json();
 
     console.log(`📦 Envíos del ${date}:`, sales);